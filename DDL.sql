@@ -12,6 +12,8 @@ CREATE TABLE IF NOT EXISTS regulations (
     rtype_id INTEGER,
     summary TEXT,
     classification_id INTEGER,
+    -- md5 de las columnas mutables (write.MUTABLE_COLUMNS), usado por el modo upsert
+    content_hash CHAR(32),
     
     -- Restricción de unicidad del lambda.py original
     CONSTRAINT unique_regulation UNIQUE (title, created_at, external_link)
@@ -29,4 +31,168 @@ CREATE TABLE IF NOT EXISTS regulations_component (
     -- Unicidad para evitar duplicados
     UNIQUE(regulations_id, components_id)
 );
-);
\ No newline at end of file
+
+-- Migración para bases creadas antes de la columna content_hash
+ALTER TABLE regulations ADD COLUMN IF NOT EXISTS content_hash CHAR(32);
+-- Completa el hash de las filas anteriores (mismo md5 que write.compute_content_hash
+-- y write.CONTENT_HASH_SQL) para que el primer upsert no las reescriba todas
+UPDATE regulations
+SET content_hash = md5(COALESCE(summary, '') || '|' || COALESCE(rtype_id::text, '') || '|' || COALESCE(gtype, '')
+                       || '|' || COALESCE(classification_id::text, '') || '|' ||
+                       CASE WHEN is_active THEN 'True' WHEN NOT is_active THEN 'False' ELSE '' END)
+WHERE content_hash IS NULL;
+
+-- Búsqueda de texto completo (src/search.py): vector en español calculado por
+-- Postgres en cada INSERT/UPDATE (título con peso A, resumen con peso B)
+ALTER TABLE regulations ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(summary, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_regulations_search_vector ON regulations USING GIN (search_vector);
+-- Filtros por fecha y paginación por (created_at, id) sin búsqueda de texto
+CREATE INDEX IF NOT EXISTS idx_regulations_created_at_id ON regulations (created_at DESC, id DESC);
+
+-- 3. Métricas por etapa de cada corrida (src/metrics.py)
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(255) NOT NULL,
+    stage VARCHAR(50) NOT NULL,
+    started_at TIMESTAMP,
+    wall_seconds DOUBLE PRECISION,
+    rows_in INTEGER,
+    rows_out INTEGER,
+    rows_per_sec DOUBLE PRECISION,
+    http_requests INTEGER,
+    http_bytes BIGINT,
+    http_p50_ms DOUBLE PRECISION,
+    http_p95_ms DOUBLE PRECISION,
+    http_p99_ms DOUBLE PRECISION,
+    db_statements INTEGER,
+    db_seconds DOUBLE PRECISION,
+    recorded_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_run_id ON pipeline_runs (run_id);
+
+-- pipeline_runs tiene una fila por etapa y por tarea (las tareas mapeadas por
+-- página repiten run_id y stage); esta vista agrega por corrida. Los
+-- percentiles no se pueden combinar: se muestra el peor de las tareas.
+CREATE OR REPLACE VIEW pipeline_run_stages AS
+SELECT run_id,
+       stage,
+       count(*) AS tasks,
+       min(started_at) AS started_at,
+       sum(wall_seconds) AS task_seconds,
+       sum(rows_in) AS rows_in,
+       sum(rows_out) AS rows_out,
+       sum(http_requests) AS http_requests,
+       sum(http_bytes) AS http_bytes,
+       max(http_p95_ms) AS http_p95_ms_max,
+       max(http_p99_ms) AS http_p99_ms_max,
+       sum(db_statements) AS db_statements,
+       sum(db_seconds) AS db_seconds
+FROM pipeline_runs
+GROUP BY run_id, stage;
+
+-- 4. Documentos enlazados descargados (src/documents.py); el archivo está en
+-- DOCUMENTS_DIR/objects/<sha256[:2]>/<sha256>
+CREATE TABLE IF NOT EXISTS regulation_documents (
+    regulations_id INTEGER PRIMARY KEY REFERENCES regulations(id) ON DELETE CASCADE,
+    url TEXT NOT NULL,
+    sha256 CHAR(64),
+    size_bytes BIGINT,
+    content_type VARCHAR(255),
+    etag VARCHAR(255),
+    last_modified VARCHAR(100),
+    http_status INTEGER,
+    status VARCHAR(20) NOT NULL,
+    error TEXT,
+    fetch_seconds DOUBLE PRECISION,
+    fetched_at TIMESTAMP,
+    -- Fallos seguidos (0 tras una descarga correcta); limita los reintentos
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_regulation_documents_sha256 ON regulation_documents (sha256);
+
+-- Migración para bases creadas antes de la columna attempts
+ALTER TABLE regulation_documents ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+
+-- 5. Palabras clave para clasificar rtype_id (src/classifier.py). Gana una
+-- coincidencia en el título sobre el resumen y luego la mayor prioridad.
+CREATE TABLE IF NOT EXISTS rtype_keywords (
+    id SERIAL PRIMARY KEY,
+    keyword VARCHAR(100) NOT NULL UNIQUE,
+    rtype_id INTEGER NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- updated_at cambia en cada UPDATE para que el clasificador detecte cambios
+CREATE OR REPLACE FUNCTION touch_rtype_keywords() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_touch_rtype_keywords ON rtype_keywords;
+CREATE TRIGGER trg_touch_rtype_keywords BEFORE UPDATE ON rtype_keywords
+    FOR EACH ROW EXECUTE FUNCTION touch_rtype_keywords();
+
+INSERT INTO rtype_keywords (keyword, rtype_id, priority) VALUES
+    ('resolución', 15, 20),
+    ('resoluciones', 15, 20),
+    ('decreto', 14, 10),
+    ('decretos', 14, 10)
+ON CONFLICT (keyword) DO NOTHING;
+
+-- 6. Resúmenes para tableros (src/summary.py). write.py los actualiza con los
+-- deltas de cada lote en la misma transacción; reconstrucción completa con
+-- python src/summary.py --rebuild
+CREATE TABLE IF NOT EXISTS regulation_stats_yearly (
+    entity VARCHAR(255) NOT NULL,
+    year VARCHAR(4) NOT NULL,
+    rtype_id INTEGER NOT NULL,
+    regulation_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (entity, year, rtype_id)
+);
+
+CREATE TABLE IF NOT EXISTS regulation_stats_entity (
+    entity VARCHAR(255) PRIMARY KEY,
+    regulation_count BIGINT NOT NULL DEFAULT 0,
+    latest_created_at VARCHAR(100),
+    updated_at TIMESTAMP
+);
+
+-- 7. Perfil de calidad por corrida y columna (src/quality.py)
+CREATE TABLE IF NOT EXISTS data_quality_profiles (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(255) NOT NULL,
+    -- Se compara solo con corridas del mismo alcance (entidades) y tipo ('dag' o 'cli')
+    scope VARCHAR(255) NOT NULL DEFAULT '',
+    run_type VARCHAR(20) NOT NULL DEFAULT 'dag',
+    column_name VARCHAR(100) NOT NULL,
+    row_count INTEGER,
+    null_rate DOUBLE PRECISION,
+    empty_count INTEGER,
+    distinct_estimate INTEGER,
+    min_length INTEGER,
+    max_length INTEGER,
+    mean_length DOUBLE PRECISION,
+    length_histogram JSONB,
+    min_value VARCHAR(100),
+    max_value VARCHAR(100),
+    recorded_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Migración para bases creadas antes de scope/run_type
+ALTER TABLE data_quality_profiles ADD COLUMN IF NOT EXISTS scope VARCHAR(255) NOT NULL DEFAULT '';
+ALTER TABLE data_quality_profiles ADD COLUMN IF NOT EXISTS run_type VARCHAR(20) NOT NULL DEFAULT 'dag';
+
+CREATE INDEX IF NOT EXISTS idx_data_quality_profiles_run ON data_quality_profiles (recorded_at DESC, run_id);
+CREATE INDEX IF NOT EXISTS idx_data_quality_profiles_scope
+    ON data_quality_profiles (scope, run_type, recorded_at DESC);
@@ -1,6 +1,6 @@
 from datetime import datetime
 from airflow import DAG
-from airflow.operators.python import PythonOperator
+from airflow.operators.python import PythonOperator, ShortCircuitOperator
 import logging
 
 import sys
@@ -10,13 +10,22 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
 
 
-# Asegúrate de que estos módulos estén en /opt/airflow/src y PYTHONPATH lo incluya
-from extraction import extract
-from validation import validate
-from write import write
+# Asegúrate de que estos módulos estén en /opt/airflow/src y PYTHONPATH lo incluya.
+# etl_tasks es liviano: pandas, bs4, requests y psycopg2 solo se importan
+# dentro de las tareas, no cada vez que el scheduler parsea este archivo.
+from etl_tasks import (
+    run_probe, run_extract_page, run_merge_pages, run_validate, run_write, run_reconcile,
+    run_fetch_documents, push_records, pull_records, run_cleanup,
+)
+# Perfilado opcional por tarea (PIPELINE_PROFILE=1); sin costo si está apagado
+from profiling import profiled
 
 logger = logging.getLogger("dag_etl_ani")
 
+DEFAULT_NUM_PAGES = int(os.getenv("ANI_NUM_PAGES", "3"))
+# Máximo de páginas extrayéndose en paralelo
+EXTRACT_CONCURRENCY = int(os.getenv("EXTRACT_CONCURRENCY", "4"))
+
 default_args = {
     "owner": "airflow",
     "depends_on_past": False,
@@ -29,27 +38,51 @@ with DAG(
     start_date=datetime(2025, 1, 1),
     catchup=False,
     default_args=default_args,
+    params={"num_pages": DEFAULT_NUM_PAGES, "force_scrape": False, "reconcile": False},
     tags=["ANI", "ETL"]
 ) as dag:
 
-    # === 1️⃣ Extracción ===
-    def task_extract(**ctx):
+    # === Sonda de contenido nuevo ===
+    def task_probe(**ctx):
         """
-        Llama al módulo extraction.py para obtener las regulaciones y sus componentes.
+        Descarga solo la página 0; si no hay nada nuevo, omite el resto del DAG.
         """
-        logger.info("Iniciando extracción de datos de la ANI...")
-        data = extract(num_pages=3)
+        if ctx["params"].get("force_scrape"):
+            logger.info("force_scrape activo: se omite la sonda.")
+            return True
+        return run_probe()
 
-        # Verifica que extract() devuelva dict con ambas llaves
-        if not isinstance(data, dict) or "regulations" not in data:
-            raise ValueError("extract() debe retornar un dict con 'regulations' y 'components'.")
+    # === 0️⃣ Planificación ===
+    def task_plan(**ctx):
+        """
+        Define las páginas a extraer; cada una se procesa en una tarea mapeada.
+        """
+        num_pages = int(ctx["params"].get("num_pages", DEFAULT_NUM_PAGES))
+        logger.info(f"Planificando extracción de {num_pages} páginas.")
+        return [{"page_num": page_num} for page_num in range(num_pages)]
+
+    # === 1️⃣ Extracción (una tarea por página) ===
+    def task_extract_page(page_num, **ctx):
+        """
+        Extrae una página; si falla, el reintento solo repite esta página.
+        Si la página ya tiene checkpoint en esta corrida, no se vuelve a descargar.
+        """
+        logger.info(f"Extrayendo página {page_num} de la ANI...")
+        return run_extract_page(page_num, ctx["run_id"])
+
+    def task_merge(**ctx):
+        """
+        Reúne las páginas extraídas y genera los componentes asociados.
+        """
+        page_values = ctx["ti"].xcom_pull(task_ids="extract_page_task")
+        data = run_merge_pages(page_values)
 
         regulations = data.get("regulations", [])
         components = data.get("components", [])
 
-        # Enviar a XCom
-        ctx["ti"].xcom_push(key="regulations", value=regulations)
-        ctx["ti"].xcom_push(key="components", value=components)
+        # Enviar a XCom (o a archivo en el volumen compartido si HANDOFF_MODE=file)
+        push_records(ctx["ti"], "regulations", regulations, ctx["run_id"])
+        push_records(ctx["ti"], "components", components, ctx["run_id"])
 
         logger.info(
             f"Extracción completada: {len(regulations)} regulaciones y {len(components)} componentes obtenidos."
@@ -62,13 +95,13 @@ with DAG(
         """
         logger.info("Iniciando validación de datos...")
 
-        regulations = ctx["ti"].xcom_pull(key="regulations", task_ids="extract_task")
-        components = ctx["ti"].xcom_pull(key="components", task_ids="extract_task")
+        regulations = pull_records(ctx["ti"], "regulations", "merge_task")
+        components = pull_records(ctx["ti"], "components", "merge_task")
 
-        valid_regs, valid_comps = validate(regulations, components)
+        valid_regs, valid_comps = run_validate(regulations, components, ctx["run_id"])
 
-        ctx["ti"].xcom_push(key="validated_regs", value=valid_regs)
-        ctx["ti"].xcom_push(key="validated_comps", value=valid_comps)
+        push_records(ctx["ti"], "validated_regs", valid_regs, ctx["run_id"])
+        push_records(ctx["ti"], "validated_comps", valid_comps, ctx["run_id"])
 
         logger.info(
             f"Validación completada: {len(valid_regs)} regulaciones válidas y {len(valid_comps)} componentes válidos."
@@ -81,30 +114,83 @@ with DAG(
         """
         logger.info("Iniciando escritura en la base de datos...")
 
-        regs = ctx["ti"].xcom_pull(key="validated_regs", task_ids="validate_task") or []
-        comps = ctx["ti"].xcom_pull(key="validated_comps", task_ids="validate_task") or []
+        regs = pull_records(ctx["ti"], "validated_regs", "validate_task")
+        comps = pull_records(ctx["ti"], "validated_comps", "validate_task")
 
-        count_regs, count_comps = write(regs, comps)
+        counts = run_write(regs, comps, ctx["run_id"])
 
         logger.info(
-            f"Escritura completada: {count_regs} regulaciones insertadas y {count_comps} componentes insertados."
+            f"Escritura completada: {counts['inserted']} regulaciones insertadas (con sus componentes), "
+            f"{counts['updated']} actualizadas y {counts['unchanged']} sin cambios."
         )
 
+        # Solo tiene sentido si num_pages cubre todo el listado (rastreo completo)
+        if ctx["params"].get("reconcile"):
+            result = run_reconcile(regs, ctx["run_id"])
+            logger.info(f"Reconciliación de is_active: {result}")
+
+    # === 4️⃣ Documentos enlazados ===
+    def task_fetch_documents(**ctx):
+        """
+        Descarga los documentos de external_link pendientes al almacén por contenido.
+        """
+        counts = run_fetch_documents(ctx["run_id"])
+        logger.info(f"Documentos procesados: {counts}")
+
+    # === 5️⃣ Limpieza ===
+    def task_cleanup(**ctx):
+        """
+        Elimina los archivos de handoff de la corrida (se ejecuta aunque fallen tareas previas).
+        Los checkpoints de extracción se conservan si la escritura no terminó bien,
+        para que al reanudar la corrida solo se descarguen las páginas faltantes.
+        """
+        write_ti = ctx["dag_run"].get_task_instance("write_task")
+        succeeded = write_ti is not None and write_ti.state == "success"
+        run_cleanup(ctx["run_id"], clear_checkpoints=succeeded)
+
     # === Definición de Tareas ===
-    extract_task = PythonOperator(
-        task_id="extract_task",
-        python_callable=task_extract
+    probe_task = ShortCircuitOperator(
+        task_id="probe_task",
+        python_callable=profiled("probe")(task_probe)
+    )
+
+    plan_task = PythonOperator(
+        task_id="plan_task",
+        python_callable=profiled("plan")(task_plan)
+    )
+
+    # Una instancia por página, con tope de concurrencia
+    extract_page_task = PythonOperator.partial(
+        task_id="extract_page_task",
+        python_callable=profiled("extract_page")(task_extract_page),
+        max_active_tis_per_dag=EXTRACT_CONCURRENCY
+    ).expand(op_kwargs=plan_task.output)
+
+    merge_task = PythonOperator(
+        task_id="merge_task",
+        python_callable=profiled("merge")(task_merge)
     )
 
     validate_task = PythonOperator(
         task_id="validate_task",
-        python_callable=task_validate
+        python_callable=profiled("validate")(task_validate)
     )
 
     write_task = PythonOperator(
         task_id="write_task",
-        python_callable=task_write
+        python_callable=profiled("write")(task_write)
+    )
+
+    documents_task = PythonOperator(
+        task_id="documents_task",
+        python_callable=profiled("documents")(task_fetch_documents)
+    )
+
+    cleanup_task = PythonOperator(
+        task_id="cleanup_task",
+        python_callable=profiled("cleanup")(task_cleanup),
+        trigger_rule="all_done"
     )
 
     # === Dependencias ===
-    extract_task >> validate_task >> write_task
+    probe_task >> plan_task >> extract_page_task >> merge_task >> validate_task >> write_task >> documents_task >> cleanup_task
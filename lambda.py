@@ -4,20 +4,37 @@ import pandas as pd
 from datetime import datetime
 import re
 import psycopg2
-import boto3
-from botocore.exceptions import ClientError
 import json
 import os
+import sys
+import time
 from typing import Dict, Any
 
+# Módulos compartidos con el pipeline (perfilado y tablas de resumen). El
+# paquete de la Lambda de un solo archivo no incluye src/: sin profiling.py no
+# se perfila y sin summary.py hay que reconstruir los resúmenes tras insertar.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+try:
+    from profiling import profiled
+except ImportError:
+    def profiled(stage):
+        return lambda func: func
+try:
+    from summary import apply_insert_deltas
+except ImportError:
+    apply_insert_deltas = None
+
 # Configuración de AWS Secrets Manager
 SECRET_NAME = os.environ.get("SECRET_NAME", "Test")
 REGION_NAME = os.environ.get("AWS_REGION", "us-east-1")
+# 'aws' (Secrets Manager) o 'env' (variables DB_*, para pruebas locales)
+SECRETS_BACKEND = os.environ.get("SECRETS_BACKEND", "aws")
+SECRET_TTL_SECONDS = int(os.environ.get("SECRET_TTL_SECONDS", "300"))
 
 # Constantes para el scraping
 ENTITY_VALUE = 'Agencia Nacional de Infraestructura'
 FIXED_CLASSIFICATION_ID = 13
-URL_BASE = "https://www.ani.gov.co/informacion-de-la-ani/normatividad?field_tipos_de_normas__tid=12&title=&body_value=&field_fecha__value%5Bvalue%5D%5Byear%5D="
+URL_BASE = os.environ.get("ANI_URL_BASE", "https://www.ani.gov.co/informacion-de-la-ani/normatividad?field_tipos_de_normas__tid=12&title=&body_value=&field_fecha__value%5Bvalue%5D%5Byear%5D=")
 
 # Clasificaciones de documentos
 CLASSIFICATION_KEYWORDS = {
@@ -28,20 +45,73 @@ CLASSIFICATION_KEYWORDS = {
 
 DEFAULT_RTYPE_ID = 14
 
-# Cliente de Secrets Manager
-secrets_client = boto3.client('secretsmanager', region_name=REGION_NAME)
+# Estado reutilizado entre invocaciones "calientes" del mismo contenedor
+_secrets_client = None
+_secret_cache = {'value': None, 'expires_at': 0.0}
+_http_session = None
+_db_manager = None
+
+def get_secrets_client():
+    """
+    Crea el cliente de Secrets Manager la primera vez que se necesita
+    (boto3 no se importa en el arranque en frío si no hace falta).
+    """
+    global _secrets_client
+    if _secrets_client is None:
+        import boto3
+        _secrets_client = boto3.client('secretsmanager', region_name=REGION_NAME)
+    return _secrets_client
 
 def get_secret():
     """
     Recupera las credenciales de la base de datos de AWS Secrets Manager.
+    El resultado se cachea durante SECRET_TTL_SECONDS.
     """
-    try:
-        get_secret_value_response = secrets_client.get_secret_value(SecretId=SECRET_NAME)
-        secret = get_secret_value_response['SecretString']
-        return json.loads(secret)
-    except ClientError as e:
-        print(f"Error retrieving secret: {e}")
-        raise e
+    now = time.monotonic()
+    if _secret_cache['value'] is not None and now < _secret_cache['expires_at']:
+        return _secret_cache['value']
+
+    if SECRETS_BACKEND == 'env':
+        secret = {key: os.environ.get(key) for key in ('DB_NAME', 'DB_USERNAME', 'DB_PASSWORD', 'DB_HOST', 'DB_PORT')}
+    else:
+        from botocore.exceptions import ClientError
+        try:
+            get_secret_value_response = get_secrets_client().get_secret_value(SecretId=SECRET_NAME)
+            secret = json.loads(get_secret_value_response['SecretString'])
+        except ClientError as e:
+            print(f"Error retrieving secret: {e}")
+            raise e
+
+    _secret_cache['value'] = secret
+    _secret_cache['expires_at'] = now + SECRET_TTL_SECONDS
+    return secret
+
+def get_http_session():
+    """
+    Sesión HTTP compartida (conexiones keep-alive reutilizadas entre invocaciones).
+    """
+    global _http_session
+    if _http_session is None:
+        _http_session = requests.Session()
+    return _http_session
+
+def get_db_manager():
+    """
+    Retorna una conexión a la base de datos validada, reutilizando la de
+    invocaciones anteriores si sigue viva. Retorna None si no se pudo conectar.
+    """
+    global _db_manager
+    if _db_manager is not None and _db_manager.is_alive():
+        return _db_manager
+
+    if _db_manager is not None:
+        _db_manager.close()
+    _db_manager = DatabaseManager()
+    if not _db_manager.connect():
+        _db_manager = None
+        # Las credenciales pudieron rotar: forzar nueva lectura del secreto
+        _secret_cache['value'] = None
+    return _db_manager
 
 #  Clase para manejar la conexión a la base de datos y realizar operaciones de inserción de datos.
 class DatabaseManager:
@@ -67,10 +137,29 @@ class DatabaseManager:
             return False
 
     def close(self):
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
+        try:
+            if self.cursor:
+                self.cursor.close()
+            if self.connection:
+                self.connection.close()
+        except Exception as e:
+            print(f"Error closing database connection: {e}")
+
+    def is_alive(self):
+        """
+        Verifica que la conexión siga abierta y usable (SELECT 1).
+        """
+        if not self.connection or self.connection.closed:
+            return False
+        try:
+            self.connection.rollback()
+            self.cursor.execute("SELECT 1")
+            self.cursor.fetchone()
+            # No dejar la conexión "idle in transaction" entre invocaciones
+            self.connection.rollback()
+            return True
+        except Exception:
+            return False
 
     def execute_query(self, query, params=None):
         if not self.cursor:
@@ -78,7 +167,7 @@ class DatabaseManager:
         self.cursor.execute(query, params)
         return self.cursor.fetchall()
 
-    def bulk_insert(self, df, table_name):
+    def bulk_insert(self, df, table_name, commit=True):
         if not self.connection or not self.cursor:
             raise Exception("Database not connected")
         
@@ -91,7 +180,8 @@ class DatabaseManager:
             records_to_insert = [tuple(x) for x in df.values]
             
             self.cursor.executemany(insert_query, records_to_insert)
-            self.connection.commit()
+            if commit:
+                self.connection.commit()
             return len(df)
         except Exception as e:
             self.connection.rollback()
@@ -269,7 +359,7 @@ def scrape_page(page_num, verbose=False):
     
     try:
         # Realizar solicitud HTTP
-        response = requests.get(page_url, timeout=15)
+        response = get_http_session().get(page_url, timeout=15)
         response.raise_for_status()
         
         # Parsear HTML
@@ -457,7 +547,8 @@ def insert_new_records(db_manager, df, entity):
         try:
             print(f"=== INSERTANDO {len(new_records)} REGISTROS ===")
             
-            total_rows_processed = db_manager.bulk_insert(new_records, regulations_table_name)
+            # Sin commit: los deltas del resumen van en la misma transacción
+            total_rows_processed = db_manager.bulk_insert(new_records, regulations_table_name, commit=False)
             
             if total_rows_processed == 0:
                 return 0, f"No records were actually inserted for entity {entity}"
@@ -473,6 +564,17 @@ def insert_new_records(db_manager, df, entity):
             else:
                 raise insert_error
         
+        # 7b. TABLAS DE RESUMEN (misma transacción que el INSERT)
+        if apply_insert_deltas is not None:
+            apply_insert_deltas(
+                db_manager,
+                new_records[['entity', 'created_at', 'rtype_id']].itertuples(index=False, name=None)
+            )
+        else:
+            print("AVISO: summary.py no disponible; ejecutar 'python src/summary.py --rebuild' "
+                  "para actualizar regulation_stats_yearly y regulation_stats_entity")
+        db_manager.connection.commit()
+        
         # 8. OBTENER IDS DE REGISTROS INSERTADOS - MÉTODO OPTIMIZADO
         print("=== OBTENIENDO IDS DE REGISTROS INSERTADOS ===")
         
@@ -529,17 +631,19 @@ def insert_new_records(db_manager, df, entity):
         print(traceback.format_exc())
         return 0, error_msg
 
-def check_for_new_content(num_pages_to_check=3):
+def check_for_new_content(num_pages_to_check=3, page_cache=None):
     """
     Verifica si hay contenido nuevo en las primeras páginas.
     Retorna True si se detecta nuevo contenido, False en caso contrario.
+    Si se pasa page_cache (dict), guarda ahí las páginas ya parseadas para
+    que el scraping principal no tenga que volver a descargarlas.
     """
     print(f"Verificando contenido nuevo en las primeras {num_pages_to_check} páginas...")
     
     try:
         # Conectar a la base de datos para obtener la fecha más reciente
-        db_manager = DatabaseManager()
-        if not db_manager.connect():
+        db_manager = get_db_manager()
+        if db_manager is None:
             print("Error conectando a la base de datos para verificación")
             return True  # En caso de error, proceder con el scraping
         
@@ -564,7 +668,6 @@ def check_for_new_content(num_pages_to_check=3):
             # Normalizar datetime (quitar timezone info)
             latest_db_date = normalize_datetime(latest_db_date)
         
-        db_manager.close()
         
         print(f"Fecha más reciente en BD: {latest_db_date}")
         
@@ -572,6 +675,9 @@ def check_for_new_content(num_pages_to_check=3):
         for page_num in range(num_pages_to_check):
             try:
                 page_data = scrape_page(page_num, verbose=False)
+                # Las páginas vacías no se guardan (pudo ser un error HTTP)
+                if page_cache is not None and page_data:
+                    page_cache[page_num] = page_data
                 
                 for record in page_data:
                     created_at_val = record.get('created_at')
@@ -605,6 +711,7 @@ def check_for_new_content(num_pages_to_check=3):
         print(f"Error en verificación de contenido nuevo: {e}")
         return True  # En caso de error, proceder con el scraping
 
+@profiled("lambda_handler")
 def lambda_handler(event, context):
     """
     AWS Lambda handler function para el scraping de normativas ANI.
@@ -617,9 +724,12 @@ def lambda_handler(event, context):
         
         print(f"Iniciando scraping de ANI - Páginas a procesar: {num_pages_to_scrape}")
         
+        # Páginas ya descargadas y parseadas durante esta invocación
+        page_cache = {}
+        
         # Verificar si hay contenido nuevo (a menos que se fuerce el scraping)
         if not force_scrape:
-            has_new_content = check_for_new_content(min(3, num_pages_to_scrape))
+            has_new_content = check_for_new_content(min(3, num_pages_to_scrape), page_cache)
             if not has_new_content:
                 return {
                     'statusCode': 200,
@@ -642,8 +752,12 @@ def lambda_handler(event, context):
         all_normas_data = []
         
         for page_num in range(start_page, end_page + 1):
-            print(f"Procesando página {page_num}...")
-            page_data = scrape_page(page_num)
+            if page_num in page_cache:
+                print(f"Procesando página {page_num} (reutilizada de la verificación)...")
+                page_data = page_cache[page_num]
+            else:
+                print(f"Procesando página {page_num}...")
+                page_data = scrape_page(page_num)
             all_normas_data.extend(page_data)
             
             # Indicador de progreso cada 3 páginas
@@ -667,8 +781,9 @@ def lambda_handler(event, context):
         print(f"Total de registros extraídos: {len(df_normas)}")
         
         # Operaciones de base de datos
-        db_manager = DatabaseManager()
-        if not db_manager.connect():
+        # Conexión persistente entre invocaciones (no se cierra al terminar)
+        db_manager = get_db_manager()
+        if db_manager is None:
             return {
                 'statusCode': 500,
                 'body': json.dumps({
@@ -677,27 +792,23 @@ def lambda_handler(event, context):
                 })
             }
         
-        try:
-            # Insertar nuevos registros
-            inserted_count, status_message = insert_new_records(db_manager, df_normas, ENTITY_VALUE)
-            
-            response = {
-                'statusCode': 200,
-                'body': json.dumps({
-                    'message': status_message,
-                    'records_scraped': len(df_normas),
-                    'records_inserted': inserted_count,
-                    'pages_processed': f"{start_page}-{end_page}",
-                    'content_check': 'new_content_found' if not force_scrape else 'forced_scrape',
-                    'success': True
-                })
-            }
-            
-            print(f"Operación completada: {status_message}")
-            return response
-            
-        finally:
-            db_manager.close()
+        # Insertar nuevos registros
+        inserted_count, status_message = insert_new_records(db_manager, df_normas, ENTITY_VALUE)
+        
+        response = {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': status_message,
+                'records_scraped': len(df_normas),
+                'records_inserted': inserted_count,
+                'pages_processed': f"{start_page}-{end_page}",
+                'content_check': 'new_content_found' if not force_scrape else 'forced_scrape',
+                'success': True
+            })
+        }
+        
+        print(f"Operación completada: {status_message}")
+        return response
         
     except Exception as e:
         error_message = f"Error en la ejecución de Lambda: {str(e)}"
@@ -0,0 +1,308 @@
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+import aiohttp
+import asyncpg
+
+from extraction import build_page_url, parse_page_records, ENTITY_VALUE, COMPONENT_ID
+from records import RegulationBatch, RECORD_FIELDS
+from summary import apply_insert_deltas_async
+from validation import load_rules, validate_batch
+from write import CONTENT_HASH_SQL, _record_key
+
+logger = logging.getLogger("async_pipeline")
+
+# Marca de fin de flujo entre etapas
+_END = None
+
+REGULATION_COLUMNS = [
+    'created_at', 'update_at', 'is_active', 'title', 'gtype', 'entity',
+    'external_link', 'rtype_id', 'summary', 'classification_id',
+]
+
+# content_hash con la misma expresión que write.py (CONTENT_HASH_SQL), para que
+# el siguiente upsert no reporte estas filas como modificadas
+INSERT_REGULATIONS_SQL = f"""
+    INSERT INTO regulations (created_at, update_at, is_active, title, gtype, entity,
+                             external_link, rtype_id, summary, classification_id, content_hash)
+    SELECT t.*, {CONTENT_HASH_SQL}
+    FROM unnest($1::varchar[], $2::timestamp[], $3::boolean[], $4::varchar[],
+                $5::varchar[], $6::varchar[], $7::text[], $8::int[],
+                $9::text[], $10::int[])
+         AS t(created_at, update_at, is_active, title, gtype, entity,
+              external_link, rtype_id, summary, classification_id)
+    ON CONFLICT ON CONSTRAINT unique_regulation DO NOTHING
+    RETURNING id, entity, created_at, rtype_id
+"""
+
+INSERT_COMPONENTS_SQL = """
+    INSERT INTO regulations_component (regulations_id, components_id)
+    SELECT unnest($1::int[]), $2
+    ON CONFLICT DO NOTHING
+"""
+
+
+# === Etapas ===
+async def fetch_worker(session, pages_queue, html_queue, stats):
+    """Descarga páginas mientras haya números de página en la cola."""
+    while True:
+        page_num = await pages_queue.get()
+        if page_num is _END:
+            pages_queue.task_done()
+            return
+        try:
+            url = build_page_url(page_num)
+            async with session.get(url) as response:
+                response.raise_for_status()
+                content = await response.read()
+            stats['pages'] += 1
+            stats['http_bytes'] += len(content)
+            # put() bloquea si el parser va atrasado (backpressure)
+            await html_queue.put((page_num, content))
+        except Exception as e:
+            stats['page_errors'] += 1
+            logger.error(f"Error descargando página {page_num}: {e}")
+        finally:
+            pages_queue.task_done()
+
+
+async def parse_worker(html_queue, rows_queue, rules, executor, update_at, stats):
+    """
+    Parsea y valida páginas como RegulationBatch (records.py); el parseo corre
+    fuera del event loop y entre procesos viajan registros con __slots__, no dicts.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await html_queue.get()
+        if item is _END:
+            html_queue.task_done()
+            return
+        page_num, content = item
+        try:
+            batch = await loop.run_in_executor(executor, parse_page_records, content, page_num, update_at)
+            stats['rows_parsed'] += len(batch)
+            valid = validate_batch(batch, rules)
+            stats['rows_valid'] += len(valid)
+            if len(valid):
+                await rows_queue.put(valid)
+        except Exception as e:
+            stats['page_errors'] += 1
+            logger.error(f"Error parseando página {page_num}: {e}")
+        finally:
+            html_queue.task_done()
+
+
+async def write_batch(pool, batch, existing_keys, stats):
+    """
+    Inserta un RegulationBatch, sus componentes y los deltas de las tablas de
+    resumen en una sola transacción (solo las filas que realmente entraron).
+    Los arreglos de unnest se arman columna por columna desde los registros.
+    """
+    new_records = []
+    for record in batch.records:
+        key = _record_key(record.title, record.created_at, record.external_link)
+        if key in existing_keys:
+            stats['duplicates'] += 1
+            continue
+        existing_keys.add(key)
+        new_records.append(record)
+
+    if not new_records:
+        return
+
+    new_batch = RegulationBatch(batch.entity, batch.classification_id, batch.update_at, batch.is_active,
+                                new_records)
+    update_at = batch.update_at
+    if isinstance(update_at, str):
+        update_at = datetime.strptime(update_at, '%Y-%m-%d %H:%M:%S')
+    columns = {
+        col: new_batch.column(col) if col in RECORD_FIELDS else [getattr(new_batch, col)] * len(new_records)
+        for col in REGULATION_COLUMNS
+    }
+    columns['update_at'] = [update_at] * len(new_records)
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            records = await conn.fetch(
+                INSERT_REGULATIONS_SQL, *[columns[col] for col in REGULATION_COLUMNS]
+            )
+            new_ids = [r['id'] for r in records]
+            if new_ids:
+                await conn.execute(INSERT_COMPONENTS_SQL, new_ids, COMPONENT_ID)
+                await apply_insert_deltas_async(
+                    conn, [(r['entity'], r['created_at'], r['rtype_id']) for r in records]
+                )
+
+    stats['rows_inserted'] += len(new_ids)
+    stats['duplicates'] += len(new_records) - len(new_ids)
+
+
+async def write_worker(pool, rows_queue, batch_size, entity, stats):
+    """Agrupa los lotes validados hasta batch_size filas y los escribe en Postgres."""
+    async with pool.acquire() as conn:
+        existing = await conn.fetch(
+            "SELECT title, created_at, COALESCE(external_link, '') AS external_link "
+            "FROM regulations WHERE entity = $1",
+            entity,
+        )
+    existing_keys = {_record_key(r['title'], r['created_at'], r['external_link']) for r in existing}
+    logger.info(f"Registros existentes en BD para {entity}: {len(existing_keys)}")
+
+    pending, pending_rows = [], 0
+    while True:
+        batch = await rows_queue.get()
+        try:
+            if batch is _END:
+                if pending:
+                    await write_batch(pool, RegulationBatch.concat(pending), existing_keys, stats)
+                return
+            pending.append(batch)
+            pending_rows += len(batch)
+            if pending_rows >= batch_size:
+                await write_batch(pool, RegulationBatch.concat(pending), existing_keys, stats)
+                pending, pending_rows = [], 0
+        finally:
+            rows_queue.task_done()
+
+
+# === Orquestación ===
+async def run_pipeline(
+    num_pages: int = 3,
+    fetch_concurrency: int = 4,
+    parse_workers: int = 2,
+    queue_size: int = 8,
+    batch_size: int = 500,
+    warn_below_rows_per_sec: Optional[float] = None,
+    dsn: Optional[str] = None,
+) -> Dict:
+    """
+    Ejecuta extracción, validación y escritura como corrutinas conectadas
+    por colas acotadas, de modo que red, parseo e inserciones se solapan.
+    Retorna un dict con las estadísticas de la ejecución. Si el throughput
+    final queda por debajo de warn_below_rows_per_sec solo se registra una
+    advertencia (no se regula el ritmo).
+    """
+    stats = {
+        'pages': 0, 'page_errors': 0, 'http_bytes': 0, 'rows_parsed': 0,
+        'rows_valid': 0, 'rows_inserted': 0, 'duplicates': 0,
+    }
+    rules = load_rules()
+    # Un solo update_at para toda la corrida (constante del RegulationBatch)
+    update_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    started = time.monotonic()
+
+    pages_queue: asyncio.Queue = asyncio.Queue()
+    html_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    rows_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    for page_num in range(num_pages):
+        pages_queue.put_nowait(page_num)
+    for _ in range(fetch_concurrency):
+        pages_queue.put_nowait(_END)
+
+    pool = await asyncpg.create_pool(dsn=dsn or _dsn_from_env(), min_size=1, max_size=2)
+    timeout = aiohttp.ClientTimeout(total=15)
+    connector = aiohttp.TCPConnector(limit=fetch_concurrency)
+
+    try:
+        with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+            async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+                writer = asyncio.create_task(
+                    write_worker(pool, rows_queue, batch_size, ENTITY_VALUE, stats)
+                )
+                parsers = [
+                    asyncio.create_task(parse_worker(html_queue, rows_queue, rules, executor, update_at, stats))
+                    for _ in range(parse_workers)
+                ]
+                fetchers = [
+                    asyncio.create_task(fetch_worker(session, pages_queue, html_queue, stats))
+                    for _ in range(fetch_concurrency)
+                ]
+                closer = asyncio.create_task(_close_stages(fetchers, parsers, html_queue, rows_queue))
+                await _supervise([writer, closer, *parsers, *fetchers])
+    finally:
+        await pool.close()
+
+    elapsed = time.monotonic() - started
+    stats['elapsed_seconds'] = round(elapsed, 3)
+    stats['rows_per_sec'] = round(stats['rows_valid'] / elapsed, 1) if elapsed > 0 else 0.0
+    stats['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    logger.info(
+        f"Pipeline asíncrono completado: {stats['rows_valid']} filas válidas, "
+        f"{stats['rows_inserted']} insertadas en {stats['elapsed_seconds']}s "
+        f"({stats['rows_per_sec']} filas/s, RSS máx {stats['max_rss_kb']} KB)."
+    )
+    if warn_below_rows_per_sec and stats['rows_per_sec'] < warn_below_rows_per_sec:
+        logger.warning(
+            f"Throughput por debajo del umbral de aviso: {stats['rows_per_sec']} < {warn_below_rows_per_sec} filas/s"
+        )
+    return stats
+
+
+async def _close_stages(fetchers, parsers, html_queue, rows_queue):
+    """Propaga las marcas de fin: descargas -> parsers -> escritor."""
+    await asyncio.gather(*fetchers)
+    for _ in parsers:
+        await html_queue.put(_END)
+    await asyncio.gather(*parsers)
+    await rows_queue.put(_END)
+
+
+async def _supervise(tasks):
+    """
+    Espera a todas las etapas. Si una falla (p. ej. el escritor por un error
+    de BD), nadie vacía su cola de entrada y las demás quedarían bloqueadas en
+    put(): se cancelan las pendientes y se relanza el error.
+    """
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    failed = [task for task in done if not task.cancelled() and task.exception() is not None]
+    if not failed:
+        return
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    raise failed[0].exception()
+
+
+def _dsn_from_env():
+    """Arma el DSN con las mismas variables que usa write.DatabaseManager."""
+    return "postgresql://{user}:{password}@{host}:{port}/{db}".format(
+        user=os.getenv("POSTGRES_USER", "airflow"),
+        password=os.getenv("POSTGRES_PASSWORD", "airflow"),
+        host=os.getenv("POSTGRES_HOST", "postgres"),
+        port=os.getenv("POSTGRES_PORT", "5432"),
+        db=os.getenv("POSTGRES_DB", "airflow"),
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Pipeline ETL ANI asíncrono con colas acotadas")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--fetch-concurrency", type=int, default=4)
+    parser.add_argument("--parse-workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--warn-below-rows-per-sec", type=float, default=None,
+                        help="Solo reporta: advierte si el throughput final queda por debajo")
+    parser.add_argument("--dsn", default=None)
+    args = parser.parse_args()
+
+    result = asyncio.run(run_pipeline(
+        num_pages=args.pages,
+        fetch_concurrency=args.fetch_concurrency,
+        parse_workers=args.parse_workers,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        warn_below_rows_per_sec=args.warn_below_rows_per_sec,
+        dsn=args.dsn,
+    ))
+    print(result)
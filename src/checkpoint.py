@@ -0,0 +1,120 @@
+"""
+Checkpoints por página de la extracción.
+
+Cada página extraída se guarda en CHECKPOINT_DIR/<run_id>/page_<n>.json con
+su número, huella (sha256 de las claves de sus filas), cantidad de filas y
+las filas mismas. Un reintento o una corrida reanudada con el mismo run_id
+solo descarga las páginas que faltan y reutiliza las ya guardadas.
+Un archivo por página evita carreras entre tareas mapeadas en paralelo.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+from typing import List, Dict, Optional
+
+logger = logging.getLogger("checkpoint")
+
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "/opt/airflow/data/checkpoints")
+CHECKPOINT_RETENTION_HOURS = float(os.getenv("CHECKPOINT_RETENTION_HOURS", "72"))
+
+
+def page_fingerprint(rows: List[Dict]) -> str:
+    """Huella de una página: sha256 de las claves (title|created_at|external_link)."""
+    digest = hashlib.sha256()
+    for row in rows:
+        key = f"{row.get('title')}|{row.get('created_at')}|{row.get('external_link') or ''}\n"
+        digest.update(key.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """Checkpoints de las páginas de una corrida."""
+
+    def __init__(self, run_id: str, directory: Optional[str] = None):
+        self.run_id = run_id
+        safe_run_id = re.sub(r'[^A-Za-z0-9_.-]', '_', run_id)
+        self.path = os.path.join(directory or CHECKPOINT_DIR, safe_run_id)
+
+    def _page_path(self, page_num):
+        return os.path.join(self.path, f"page_{page_num}.json")
+
+    def save_page(self, page_num: int, rows: List[Dict]) -> Dict:
+        """Guarda las filas de una página (escritura atómica)."""
+        os.makedirs(self.path, exist_ok=True)
+        entry = {
+            "page_num": page_num,
+            "fingerprint": page_fingerprint(rows),
+            "row_count": len(rows),
+            "saved_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "rows": rows,
+        }
+        path = self._page_path(page_num)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+        return entry
+
+    def load_page(self, page_num: int) -> Optional[List[Dict]]:
+        """Retorna las filas guardadas de la página, o None si no hay checkpoint válido."""
+        path = self._page_path(page_num)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Checkpoint ilegible para página {page_num}: {e}")
+            return None
+
+        rows = entry.get("rows", [])
+        if len(rows) != entry.get("row_count") or page_fingerprint(rows) != entry.get("fingerprint"):
+            logger.warning(f"Checkpoint inconsistente para página {page_num}; se volverá a descargar.")
+            return None
+        return rows
+
+    def completed_pages(self) -> List[int]:
+        """Páginas con checkpoint guardado."""
+        if not os.path.isdir(self.path):
+            return []
+        pages = []
+        for name in os.listdir(self.path):
+            match = re.match(r'^page_(\d+)\.json$', name)
+            if match:
+                pages.append(int(match.group(1)))
+        return sorted(pages)
+
+    def clear(self):
+        """Elimina los checkpoints de esta corrida y los de corridas vencidas."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+        root = os.path.dirname(self.path)
+        if os.path.isdir(root):
+            cutoff = time.time() - CHECKPOINT_RETENTION_HOURS * 3600
+            for entry in os.scandir(root):
+                if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def scrape_page_checkpointed(page_num: int, store: Optional[CheckpointStore], scrape_func, from_rows=None):
+    """
+    Usa el checkpoint de la página si existe; si no, la descarga y la guarda.
+    scrape_func puede retornar dicts (DAG) o un RegulationBatch (CLI; se
+    guarda con to_dicts); from_rows convierte las filas del checkpoint a ese
+    mismo tipo para que el DAG y la CLI reanuden exactamente igual.
+    """
+    if store is not None:
+        rows = store.load_page(page_num)
+        if rows is not None:
+            logger.info(f"Página {page_num}: {len(rows)} filas recuperadas del checkpoint.")
+            return from_rows(rows) if from_rows else rows
+
+    result = scrape_func(page_num)
+    if store is not None:
+        store.save_page(page_num, result.to_dicts() if hasattr(result, 'to_dicts') else result)
+    return result
@@ -0,0 +1,175 @@
+"""
+Clasificador de rtype_id por palabras clave.
+
+Las palabras clave viven en la tabla rtype_keywords (keyword, rtype_id,
+priority). Se compilan en una sola expresión regular con forma de trie
+(los prefijos comunes se factorizan), de modo que el costo por fila no
+crece con el número de palabras, y título y resumen se recorren en una sola
+pasada. El clasificador compilado se reutiliza hasta que la tabla cambia
+(se revisa count/max(updated_at) cada RTYPE_KEYWORDS_REFRESH_SECONDS).
+
+Reglas de desempate: gana una coincidencia en el título sobre una en el
+resumen; entre ellas, la de mayor prioridad; a igual prioridad, la que
+aparece primero. Las palabras se comparan sin tildes ni mayúsculas.
+
+A diferencia de la versión original (búsqueda de subcadenas), una palabra
+clave no coincide dentro de otra palabra: "Irresolución" ya no es una
+resolución. Junto a dígitos o signos sí coincide ("Resolución20243030001235").
+"""
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("classifier")
+
+# 'db' lee rtype_keywords (con respaldo en DEFAULT_KEYWORDS si la BD no responde); 'static' no usa la BD
+RTYPE_KEYWORDS_SOURCE = os.getenv("RTYPE_KEYWORDS_SOURCE", "db")
+RTYPE_KEYWORDS_REFRESH_SECONDS = float(os.getenv("RTYPE_KEYWORDS_REFRESH_SECONDS", "300"))
+DEFAULT_RTYPE_ID = 14
+
+# Palabras de la versión original (resolución se revisaba antes que decreto).
+# Se comparan palabras completas, así que los plurales van aparte.
+DEFAULT_KEYWORDS = [
+    ('resolución', 15, 20),
+    ('resoluciones', 15, 20),
+    ('decreto', 14, 10),
+    ('decretos', 14, 10),
+]
+
+KEYWORDS_QUERY = "SELECT keyword, rtype_id, priority FROM rtype_keywords WHERE is_active"
+KEYWORDS_VERSION_QUERY = "SELECT count(*), max(updated_at) FROM rtype_keywords WHERE is_active"
+
+
+def normalize(text: Optional[str]) -> str:
+    """Minúsculas y sin tildes (misma longitud no garantizada; solo para buscar)."""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def trie_pattern(words: List[str]) -> str:
+    """Alternancia equivalente a '|'.join(words), factorizada como trie."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        if '' in node and len(node) == 1:
+            return ''
+        optional = '' in node
+        branches = []
+        for ch in sorted(k for k in node if k):
+            branches.append(re.escape(ch) + build(node[ch]))
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if optional else body
+
+    return build(trie)
+
+
+class KeywordClassifier:
+    """Palabras clave compiladas en una sola expresión regular."""
+
+    def __init__(self, keywords: List[Tuple[str, int, int]], default_rtype_id: int = DEFAULT_RTYPE_ID):
+        self.default_rtype_id = default_rtype_id
+        self.rules: Dict[str, Tuple[int, int]] = {}
+        for keyword, rtype_id, priority in keywords:
+            key = normalize(keyword).strip()
+            if not key:
+                continue
+            # Si dos palabras quedan iguales sin tildes, manda la de mayor prioridad
+            current = self.rules.get(key)
+            if current is None or priority > current[1]:
+                self.rules[key] = (int(rtype_id), int(priority or 0))
+        # Sin letras a los lados (dígitos y signos sí); en el trie los sufijos
+        # opcionales son codiciosos (gana la palabra más larga)
+        if self.rules:
+            self.pattern = re.compile(r'(?<![^\W\d_])(' + trie_pattern(list(self.rules)) + r')(?![^\W\d_])')
+        else:
+            self.pattern = None
+
+    def classify(self, title: Optional[str], summary: Optional[str] = None) -> int:
+        if not self.pattern:
+            return self.default_rtype_id
+        title_norm = normalize(title)
+        text = title_norm + '\n' + normalize(summary) if summary else title_norm
+
+        best = None
+        for match in self.pattern.finditer(text):
+            rtype_id, priority = self.rules[match.group(1)]
+            score = (match.start() < len(title_norm), priority, -match.start())
+            if best is None or score > best[0]:
+                best = (score, rtype_id)
+        return best[1] if best else self.default_rtype_id
+
+
+_lock = threading.Lock()
+_cached = {"classifier": None, "version": None, "checked_at": 0.0}
+
+
+def _load_from_db():
+    """Retorna (palabras, versión) desde rtype_keywords."""
+    from write import DatabaseManager
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise Exception("Fallo al conectar con la base de datos")
+    try:
+        version = tuple(db_manager.execute_query(KEYWORDS_VERSION_QUERY)[0])
+        if _cached["classifier"] is not None and version == _cached["version"]:
+            return None, version
+        return db_manager.execute_query(KEYWORDS_QUERY), version
+    finally:
+        db_manager.close()
+
+
+def get_classifier(force_reload: bool = False) -> KeywordClassifier:
+    """Clasificador vigente; solo se recompila si la tabla cambió."""
+    now = time.monotonic()
+    if (not force_reload and _cached["classifier"] is not None
+            and now - _cached["checked_at"] < RTYPE_KEYWORDS_REFRESH_SECONDS):
+        return _cached["classifier"]
+
+    with _lock:
+        if (not force_reload and _cached["classifier"] is not None
+                and now - _cached["checked_at"] < RTYPE_KEYWORDS_REFRESH_SECONDS):
+            return _cached["classifier"]
+
+        keywords, version = None, "static"
+        if RTYPE_KEYWORDS_SOURCE == 'db':
+            try:
+                keywords, version = _load_from_db()
+                if keywords is None:
+                    _cached["checked_at"] = now
+                    return _cached["classifier"]
+                if not keywords:
+                    logger.warning("rtype_keywords está vacía; se usan las palabras por defecto.")
+            except Exception as e:
+                if _cached["classifier"] is not None:
+                    logger.warning(f"No se pudieron leer las palabras clave de la BD ({e}); se mantiene el clasificador actual.")
+                    _cached["checked_at"] = now
+                    return _cached["classifier"]
+                logger.warning(f"No se pudieron leer las palabras clave de la BD ({e}); se usan las de por defecto.")
+                version = None
+        if not keywords:
+            keywords = DEFAULT_KEYWORDS
+
+        _cached["classifier"] = KeywordClassifier(keywords)
+        _cached["version"] = version
+        _cached["checked_at"] = now
+        logger.info(f"Clasificador compilado con {len(_cached['classifier'].rules)} palabras clave.")
+        return _cached["classifier"]
+
+
+def classify_rtype(title: Optional[str], summary: Optional[str] = None) -> int:
+    """rtype_id de una regulación según su título y resumen."""
+    return get_classifier().classify(title, summary)
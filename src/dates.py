@@ -0,0 +1,113 @@
+"""
+Normalización de fechas de la ANI.
+
+Reconoce los formatos que aparecen en el listado y en las fuentes
+configuradas (ISO con hora y zona, YYYY-MM-DD, d/m/Y, d-m-Y, d.m.Y y fechas
+con el mes en español: "31 de diciembre de 2024", "dic. 31, 2024",
+"martes, 3 de enero de 2023"...) y retorna datetime.date.
+
+Las mismas fechas se repiten muchísimo entre filas, así que el resultado se
+memoriza por texto crudo; normalize_dates normaliza una columna completa
+procesando cada valor distinto una sola vez.
+"""
+import os
+import re
+import unicodedata
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+DATE_CACHE_SIZE = int(os.getenv("DATE_CACHE_SIZE", "65536"))
+
+SPANISH_MONTHS = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6, 'julio': 7,
+    'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12,
+    'ene': 1, 'feb': 2, 'mar': 3, 'abr': 4, 'may': 5, 'jun': 6, 'jul': 7, 'ago': 8,
+    'sep': 9, 'sept': 9, 'set': 9, 'oct': 10, 'nov': 11, 'dic': 12,
+}
+_MONTH = '(' + '|'.join(sorted(SPANISH_MONTHS, key=len, reverse=True)) + ')'
+
+# Año primero (el texto ya está en minúsculas): 2024-12-31, 2024/12/31, 2024-12-31T00:00:00-05:00, 2024-12-31 10:00:00
+_YMD = re.compile(r'^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?:[t ].*)?$')
+# Día primero (formato colombiano): 31/12/2024, 31-12-2024, 31.12.2024, 31/12/24
+_DMY = re.compile(r'^(\d{1,2})[-/.](\d{1,2})[-/.](\d{4}|\d{2})(?:\s.*)?$')
+# 31 de diciembre de 2024, 31 dic 2024, 31-dic-2024, martes 31 de diciembre del 2024
+_D_MONTH_Y = re.compile(r'^(?:[a-z]+\s+)?(\d{1,2})\s*(?:de\s+|-|/)?' + _MONTH + r'\.?\s*(?:de\s+|del\s+|-|/)?\s*(\d{4})$')
+# diciembre 31 de 2024, dic. 31, 2024
+_MONTH_D_Y = re.compile(r'^' + _MONTH + r'\.?\s+(\d{1,2})\s*(?:de\s+|del\s+)?\s*(\d{4})$')
+
+
+def _clean(raw: str) -> str:
+    text = unicodedata.normalize('NFKD', raw.strip().lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    # Las comas no aportan ("martes, 3 de enero", "dic. 31, 2024"); espacios colapsados
+    return ' '.join(text.replace(',', ' ').split())
+
+
+def _build(year: int, month: int, day: int) -> Optional[date]:
+    if year < 100:
+        year += 2000 if year < 70 else 1900
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _normalize_text(raw: str) -> Optional[date]:
+    text = _clean(raw)
+    if not text:
+        return None
+
+    match = _YMD.match(text)
+    if match:
+        return _build(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+    match = _DMY.match(text)
+    if match:
+        return _build(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+
+    match = _D_MONTH_Y.match(text)
+    if match:
+        return _build(int(match.group(3)), SPANISH_MONTHS[match.group(2)], int(match.group(1)))
+
+    match = _MONTH_D_Y.match(text)
+    if match:
+        return _build(int(match.group(3)), SPANISH_MONTHS[match.group(1)], int(match.group(2)))
+
+    return None
+
+
+def normalize_date(raw) -> Optional[date]:
+    """Convierte una fecha cruda a datetime.date; None si no se reconoce."""
+    if raw is None:
+        return None
+    if isinstance(raw, datetime):
+        return raw.date()
+    if isinstance(raw, date):
+        return raw
+    return _normalize_text(str(raw))
+
+
+def format_date(raw) -> Optional[str]:
+    """Fecha normalizada como texto YYYY-MM-DD (formato de regulations.created_at)."""
+    value = normalize_date(raw)
+    return value.isoformat() if value else None
+
+
+def normalize_dates(values: Iterable) -> List[Optional[date]]:
+    """
+    Normaliza una columna completa (lista o pandas.Series): cada valor
+    distinto se procesa una sola vez y el resto se resuelve por diccionario.
+    """
+    values = list(values)
+    distinct = {}
+    for value in values:
+        if value not in distinct:
+            distinct[value] = normalize_date(value)
+    return [distinct[value] for value in values]
+
+
+def cache_info():
+    """Aciertos/fallos de la memoización (functools.lru_cache)."""
+    return _normalize_text.cache_info()
@@ -0,0 +1,211 @@
+"""
+Detección de casi duplicados con MinHash + LSH.
+
+La deduplicación de write.insert_new_records es exacta sobre
+title|created_at|external_link, pero la ANI suele republicar la misma norma
+con pequeñas diferencias en el título o el enlace. Aquí cada regulación se
+reduce a un conjunto de shingles de caracteres (título y nombre del archivo
+enlazado, normalizados) y a su firma MinHash; el índice LSH por bandas solo
+compara pares que comparten alguna banda, así que el costo crece de forma
+casi lineal con el número de filas en vez de cuadrática.
+
+    python src/dedup.py --threshold 0.85 --output near_duplicates.csv
+"""
+import argparse
+import csv
+import logging
+import os
+import re
+import sys
+import unicodedata
+import zlib
+from collections import defaultdict
+from typing import Iterable, List, Dict, Optional, Tuple
+from urllib.parse import urlparse, unquote
+
+import numpy as np
+
+logger = logging.getLogger("dedup")
+
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+NUM_PERM = int(os.getenv("NEAR_DUP_NUM_PERM", "128"))
+SHINGLE_SIZE = 4
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Minúsculas, sin tildes ni puntuación y con espacios colapsados."""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    return text.strip()
+
+
+def link_stem(external_link: Optional[str]) -> str:
+    """Nombre del archivo enlazado sin extensión (p. ej. 'resolucion_123.pdf' -> 'resolucion 123')."""
+    if not external_link:
+        return ''
+    path = unquote(urlparse(str(external_link)).path)
+    name = path.rstrip('/').rsplit('/', 1)[-1]
+    return normalize_text(name.rsplit('.', 1)[0])
+
+
+def shingles(title: Optional[str], external_link: Optional[str] = None, size: int = SHINGLE_SIZE) -> set:
+    """Shingles de caracteres del título y del nombre del archivo enlazado."""
+    text = normalize_text(title)
+    stem = link_stem(external_link)
+    if stem:
+        text = f"{text} {stem}" if text else stem
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Bandas y filas por banda cuyo umbral aproximado (1/b)^(1/r) queda más cerca del pedido."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        approx = (1.0 / bands) ** (1.0 / rows)
+        error = abs(approx - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class NearDuplicateIndex:
+    """Índice LSH de firmas MinHash (32 bits por permutación)."""
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, num_perm: int = NUM_PERM, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, (1 << 32) - 1, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, (1 << 32) - 1, size=num_perm, dtype=np.uint64)
+        self._buckets = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures = {}
+        self._labels = {}
+
+    def signature(self, items: set) -> np.ndarray:
+        """Firma MinHash de un conjunto de shingles."""
+        if not items:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashes = np.fromiter((zlib.crc32(item.encode('utf-8')) for item in items),
+                             dtype=np.uint64, count=len(items))
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature: np.ndarray, label: Optional[str] = None):
+        self._signatures[key] = signature
+        if label is not None:
+            self._labels[key] = label
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band][band_key].append(key)
+
+    def candidates(self, signature: np.ndarray) -> set:
+        found = set()
+        for band, band_key in self._band_keys(signature):
+            found.update(self._buckets[band].get(band_key, ()))
+        return found
+
+    def query(self, signature: np.ndarray) -> List[Tuple[object, float]]:
+        """Claves cuya similitud estimada con la firma alcanza el umbral, de mayor a menor."""
+        matches = []
+        for key in self.candidates(signature):
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda m: -m[1])
+
+    def label(self, key) -> Optional[str]:
+        return self._labels.get(key)
+
+
+def find_near_duplicates(
+    rows: Iterable[Tuple[object, str, Optional[str]]],
+    stored: Optional[Iterable[Tuple[object, str, Optional[str]]]] = None,
+    threshold: float = NEAR_DUP_THRESHOLD,
+    num_perm: int = NUM_PERM,
+) -> List[Dict]:
+    """
+    Busca casi duplicados de rows (tuplas (clave, title, external_link)) contra
+    stored (mismas tuplas, p. ej. las filas de la BD) y contra las filas
+    anteriores del mismo lote. Cada fila se reporta una sola vez, con su
+    coincidencia más parecida: {'key', 'title', 'match_scope' ('stored'|'batch'),
+    'match_key', 'match_title', 'similarity'}.
+    """
+    index = NearDuplicateIndex(threshold, num_perm)
+
+    stored_count = 0
+    for key, title, external_link in stored or ():
+        index.add(('stored', key), index.signature(shingles(title, external_link)), title)
+        stored_count += 1
+
+    matches = []
+    for key, title, external_link in rows:
+        signature = index.signature(shingles(title, external_link))
+        found = index.query(signature)
+        if found:
+            (scope, match_key), similarity = found[0]
+            matches.append({
+                'key': key,
+                'title': title,
+                'match_scope': scope,
+                'match_key': match_key,
+                'match_title': index.label((scope, match_key)),
+                'similarity': round(similarity, 3),
+            })
+        index.add(('batch', key), signature, title)
+
+    logger.info(
+        f"Casi duplicados (umbral {threshold}, {index.bands} bandas x {index.rows} filas): "
+        f"{len(matches)} coincidencias contra {stored_count} filas almacenadas y el lote."
+    )
+    return matches
+
+
+def scan_table(db_manager, entity: Optional[str] = None, threshold: float = NEAR_DUP_THRESHOLD) -> List[Dict]:
+    """Reporta los casi duplicados ya almacenados en regulations (cada fila contra las anteriores por id)."""
+    where, params = ("WHERE entity = %s", (entity,)) if entity else ("", None)
+    rows = db_manager.iter_query(
+        f"SELECT id, title, external_link FROM regulations {where} ORDER BY id", params
+    )
+    return find_near_duplicates(rows, threshold=threshold)
+
+
+if __name__ == "__main__":
+    from write import DatabaseManager
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Reporte de casi duplicados en regulations")
+    parser.add_argument("--threshold", type=float, default=NEAR_DUP_THRESHOLD)
+    parser.add_argument("--entity", default=None)
+    parser.add_argument("--output", default=None, help="CSV de salida (por defecto stdout)")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise SystemExit("Fallo al conectar con la base de datos")
+    try:
+        report = scan_table(db_manager, args.entity, args.threshold)
+    finally:
+        db_manager.close()
+
+    columns = ['key', 'title', 'match_scope', 'match_key', 'match_title', 'similarity']
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(report)
+    finally:
+        if args.output:
+            out.close()
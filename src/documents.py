@@ -0,0 +1,300 @@
+"""
+Descarga de los documentos enlazados (external_link) de las regulaciones.
+
+Los archivos se guardan en un almacén direccionado por contenido:
+DOCUMENTS_DIR/objects/<sha256[:2]>/<sha256>. Un mismo archivo enlazado por
+varias regulaciones (o republicado con otra URL) se guarda una sola vez.
+
+- Peticiones condicionales: con el ETag / Last-Modified de la descarga
+  anterior el servidor responde 304 y el archivo no se vuelve a bajar.
+- Descargas reanudables: lo descargado se va escribiendo en
+  DOCUMENTS_DIR/partial/; si la transferencia se corta, el siguiente intento
+  pide solo el resto con Range (+ If-Range para no mezclar versiones).
+
+Por cada regulación se registra en regulation_documents el hash, el tamaño,
+el estado y el tiempo de descarga.
+
+    python src/documents.py --concurrency 8 --limit 200
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+import requests
+
+import metrics
+
+logger = logging.getLogger("documents")
+
+DOCUMENTS_DIR = os.getenv("DOCUMENTS_DIR", "/opt/airflow/data/documents")
+DOCUMENT_CONCURRENCY = int(os.getenv("DOCUMENT_CONCURRENCY", "8"))
+# Máximo de regulaciones por corrida y antigüedad mínima antes de revalidar un documento
+DOCUMENT_BATCH_LIMIT = int(os.getenv("DOCUMENT_BATCH_LIMIT", "500"))
+DOCUMENT_REFRESH_HOURS = float(os.getenv("DOCUMENT_REFRESH_HOURS", "168"))
+# Reintentos de documentos con error: espera base (se duplica con cada fallo seguido) y tope de intentos
+DOCUMENT_RETRY_BASE_MINUTES = float(os.getenv("DOCUMENT_RETRY_BASE_MINUTES", "60"))
+DOCUMENT_MAX_ATTEMPTS = int(os.getenv("DOCUMENT_MAX_ATTEMPTS", "5"))
+DOCUMENT_TIMEOUT = 60
+CHUNK_SIZE = 64 * 1024
+
+PENDING_DOCUMENTS_QUERY = """
+    SELECT r.id, r.external_link, d.url, d.sha256, d.size_bytes, d.etag, d.last_modified
+    FROM regulations r
+    LEFT JOIN regulation_documents d ON d.regulations_id = r.id
+    WHERE r.gtype = 'link'
+      AND r.external_link IS NOT NULL
+      AND (d.regulations_id IS NULL
+           OR (d.status = 'error'
+               AND d.attempts < %s
+               AND d.fetched_at < NOW() - make_interval(secs => %s * power(2, d.attempts - 1)))
+           OR (d.status <> 'error' AND d.fetched_at < NOW() - make_interval(secs => %s)))
+    ORDER BY d.fetched_at NULLS FIRST, r.id
+    LIMIT %s
+"""
+
+UPSERT_DOCUMENTS_QUERY = """
+    INSERT INTO regulation_documents (regulations_id, url, sha256, size_bytes, content_type, etag,
+                                      last_modified, http_status, status, error, fetch_seconds, fetched_at,
+                                      attempts)
+    VALUES %s
+    ON CONFLICT (regulations_id) DO UPDATE SET
+        url = EXCLUDED.url,
+        sha256 = COALESCE(EXCLUDED.sha256, regulation_documents.sha256),
+        size_bytes = COALESCE(EXCLUDED.size_bytes, regulation_documents.size_bytes),
+        content_type = COALESCE(EXCLUDED.content_type, regulation_documents.content_type),
+        etag = COALESCE(EXCLUDED.etag, regulation_documents.etag),
+        last_modified = COALESCE(EXCLUDED.last_modified, regulation_documents.last_modified),
+        http_status = EXCLUDED.http_status,
+        status = EXCLUDED.status,
+        error = EXCLUDED.error,
+        fetch_seconds = EXCLUDED.fetch_seconds,
+        fetched_at = EXCLUDED.fetched_at,
+        attempts = CASE WHEN EXCLUDED.status = 'error' THEN regulation_documents.attempts + 1 ELSE 0 END
+"""
+UPSERT_DOCUMENTS_TEMPLATE = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::timestamp, %s)"
+
+
+class DocumentStore:
+    """Almacén local de documentos direccionado por sha256."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or DOCUMENTS_DIR
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.partial_dir = os.path.join(self.root, "partial")
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def has(self, sha256: Optional[str]) -> bool:
+        return bool(sha256) and os.path.exists(self.object_path(sha256))
+
+    def partial_path(self, url: str) -> str:
+        os.makedirs(self.partial_dir, exist_ok=True)
+        return os.path.join(self.partial_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".part")
+
+    def discard_partial(self, partial_path: str):
+        for path in (partial_path, partial_path + ".json"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def commit(self, partial_path: str, sha256: str) -> bool:
+        """Mueve la descarga terminada a su ruta final. Retorna False si el contenido ya estaba."""
+        target = self.object_path(sha256)
+        if os.path.exists(target):
+            self.discard_partial(partial_path)
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(partial_path, target)
+        self.discard_partial(partial_path)
+        return True
+
+
+def _read_partial(partial_path: str):
+    """Retorna (bytes ya descargados, sha256 parcial, validadores de esa descarga)."""
+    hasher = hashlib.sha256()
+    if not os.path.exists(partial_path):
+        return 0, hasher, {}
+    try:
+        with open(partial_path + ".json", "r", encoding="utf-8") as f:
+            validators = json.load(f)
+    except (OSError, ValueError):
+        validators = {}
+    size = 0
+    with open(partial_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+            size += len(chunk)
+    return size, hasher, validators
+
+
+def fetch_document(session, url: str, store: DocumentStore, previous: Optional[Dict] = None) -> Dict:
+    """
+    Descarga (o revalida) un documento. previous trae sha256/etag/last_modified
+    de la descarga anterior de la misma URL. Retorna los datos a registrar;
+    status es 'downloaded', 'stored' (contenido que ya estaba en el almacén),
+    'not_modified' o 'error'.
+    """
+    previous = previous or {}
+    result = {
+        "url": url, "sha256": None, "size_bytes": None, "content_type": None, "etag": None,
+        "last_modified": None, "http_status": None, "status": "error", "error": None,
+    }
+    partial_path = store.partial_path(url)
+    t0 = time.perf_counter()
+
+    try:
+        headers = {}
+        # Solo se revalida si el archivo anterior sigue en el almacén
+        if store.has(previous.get("sha256")):
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
+
+        offset, hasher, validators = _read_partial(partial_path)
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if validators.get("etag") or validators.get("last_modified"):
+                headers["If-Range"] = validators.get("etag") or validators.get("last_modified")
+
+        response = session.get(url, headers=headers, stream=True, timeout=DOCUMENT_TIMEOUT)
+        result["http_status"] = response.status_code
+
+        if response.status_code == 304:
+            response.close()
+            store.discard_partial(partial_path)
+            result.update(status="not_modified", sha256=previous.get("sha256"),
+                          size_bytes=previous.get("size_bytes"), etag=previous.get("etag"),
+                          last_modified=previous.get("last_modified"))
+            return result
+
+        if response.status_code == 416:
+            # El parcial no corresponde al archivo actual: se descarta y se reintenta completo
+            response.close()
+            store.discard_partial(partial_path)
+            return fetch_document(session, url, store, previous)
+
+        response.raise_for_status()
+        result["etag"] = response.headers.get("ETag")
+        result["last_modified"] = response.headers.get("Last-Modified")
+        result["content_type"] = response.headers.get("Content-Type")
+
+        if response.status_code != 206:
+            # Respuesta completa (sin Range o el archivo cambió): se empieza de cero
+            offset, hasher = 0, hashlib.sha256()
+        with open(partial_path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"etag": result["etag"], "last_modified": result["last_modified"]}, f)
+
+        size = offset
+        with open(partial_path, "ab" if offset else "wb") as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                hasher.update(chunk)
+                size += len(chunk)
+        metrics.record_http(size - offset, time.perf_counter() - t0)
+
+        sha256 = hasher.hexdigest()
+        is_new = store.commit(partial_path, sha256)
+        result.update(status="downloaded" if is_new else "stored", sha256=sha256, size_bytes=size)
+        return result
+
+    except Exception as e:
+        # El parcial se conserva para reanudar en la siguiente corrida
+        result["error"] = str(e)[:500]
+        logger.error(f"Error descargando {url}: {e}")
+        return result
+    finally:
+        result["fetch_seconds"] = round(time.perf_counter() - t0, 3)
+
+
+def fetch_documents(db_manager, limit: Optional[int] = None, concurrency: Optional[int] = None,
+                    store: Optional[DocumentStore] = None) -> Dict[str, int]:
+    """
+    Descarga los documentos pendientes (nuevos primero, luego los sin revalidar
+    en DOCUMENT_REFRESH_HOURS y los con error cuya espera exponencial ya pasó,
+    hasta DOCUMENT_MAX_ATTEMPTS fallos seguidos) y registra el resultado por regulación.
+    Cada URL se descarga una sola vez aunque la enlacen varias regulaciones.
+    Retorna conteos por status.
+    """
+    store = store or DocumentStore()
+    limit = limit or DOCUMENT_BATCH_LIMIT
+    pending = db_manager.execute_query(PENDING_DOCUMENTS_QUERY, (
+        DOCUMENT_MAX_ATTEMPTS, DOCUMENT_RETRY_BASE_MINUTES * 60, DOCUMENT_REFRESH_HOURS * 3600, limit,
+    ))
+
+    by_url = {}
+    for reg_id, external_link, prev_url, sha256, size_bytes, etag, last_modified in pending:
+        entry = by_url.setdefault(external_link, {"ids": [], "previous": {}})
+        entry["ids"].append(reg_id)
+        if sha256 and prev_url == external_link and not entry["previous"]:
+            entry["previous"] = {"sha256": sha256, "size_bytes": size_bytes,
+                                 "etag": etag, "last_modified": last_modified}
+
+    counts = {}
+    with metrics.stage("documents") as stage_metrics:
+        # requests.Session no es thread-safe (cookies y estado del adaptador):
+        # una sesión por hilo del pool, reutilizada entre sus descargas
+        local = threading.local()
+        sessions = []
+
+        def thread_session():
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+                sessions.append(local.session)
+            return local.session
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, concurrency or DOCUMENT_CONCURRENCY)) as executor:
+                results = list(executor.map(
+                    metrics.bind(lambda item: fetch_document(thread_session(), item[0], store, item[1]["previous"])),
+                    by_url.items(),
+                ))
+        finally:
+            for session in sessions:
+                session.close()
+
+        fetched_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        records = []
+        for (url, entry), result in zip(by_url.items(), results):
+            counts[result["status"]] = counts.get(result["status"], 0) + len(entry["ids"])
+            for reg_id in entry["ids"]:
+                records.append((
+                    reg_id, url, result["sha256"], result["size_bytes"], result["content_type"],
+                    result["etag"], result["last_modified"], result["http_status"], result["status"],
+                    result["error"], result["fetch_seconds"], fetched_at,
+                    1 if result["status"] == "error" else 0,
+                ))
+        if records:
+            db_manager.bulk_update(UPSERT_DOCUMENTS_QUERY, records, template=UPSERT_DOCUMENTS_TEMPLATE)
+
+        stage_metrics.rows_in += len(pending)
+        stage_metrics.rows_out += len(records) - counts.get("error", 0)
+
+    logger.info(f"Documentos: {len(by_url)} URLs para {len(pending)} regulaciones | {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    from write import DatabaseManager
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Descarga los documentos enlazados de las regulaciones")
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de regulaciones (DOCUMENT_BATCH_LIMIT)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Descargas en paralelo")
+    parser.add_argument("--documents-dir", default=None, help="Raíz del almacén (DOCUMENTS_DIR)")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise SystemExit("Fallo al conectar con la base de datos")
+    try:
+        fetch_documents(db_manager, args.limit, args.concurrency, DocumentStore(args.documents_dir))
+    finally:
+        db_manager.close()
@@ -0,0 +1,139 @@
+"""
+Puntos de entrada livianos para las tareas del DAG.
+
+Este módulo no importa pandas, numpy, BeautifulSoup, requests ni psycopg2
+al cargarse: cada función importa su módulo pesado al ejecutarse. Así el
+scheduler de Airflow puede re-parsear la carpeta de DAGs sin cargar el
+stack de datos.
+"""
+import logging
+from typing import List, Dict, Tuple, Optional
+
+logger = logging.getLogger("etl_tasks")
+
+
+def run_probe() -> bool:
+    """Sonda de la página 0: True si hay contenido nuevo (ver probe.has_new_content)."""
+    from probe import has_new_content
+    has_new, reason = has_new_content()
+    logger.info(f"Sonda de contenido nuevo: {reason}")
+    return has_new
+
+
+def run_extract(num_pages: int = 3, run_id: Optional[str] = None) -> Dict[str, List[Dict]]:
+    """Ejecuta la extracción (ver extraction.extract)."""
+    from extraction import extract
+    return extract(num_pages=num_pages, run_id=run_id)
+
+
+def run_extract_page(page_num: int, run_id: str):
+    """
+    Extrae una sola página (tarea mapeada). Retorna el valor para XCom:
+    las filas, o la referencia al archivo si HANDOFF_MODE=file.
+    """
+    import metrics
+    from checkpoint import CheckpointStore, scrape_page_checkpointed
+    from extraction import scrape_page
+    from handoff import to_xcom_value
+
+    with metrics.stage("extract") as stage_metrics:
+        rows = scrape_page_checkpointed(page_num, CheckpointStore(run_id), scrape_page)
+        stage_metrics.rows_out += len(rows)
+    value = to_xcom_value(rows, run_id, f"page_{page_num}")
+    metrics.flush_metrics(run_id)
+    return value
+
+
+def run_merge_pages(page_values) -> Dict[str, List[Dict]]:
+    """Reduce las salidas de las tareas mapeadas (en orden de página)."""
+    from extraction import build_components
+    from handoff import from_xcom_value
+
+    regulations = []
+    for value in page_values:
+        regulations.extend(from_xcom_value(value))
+    return {"regulations": regulations, "components": build_components(regulations)}
+
+
+def run_validate(regulations: List[Dict], components: List[Dict],
+                 run_id: Optional[str] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Ejecuta la validación (ver validation.validate). Antes perfila lo extraído
+    (ver quality.profile_run) para detectar cambios de marcado frente a la corrida anterior.
+    """
+    import metrics
+    from validation import validate
+
+    if run_id:
+        from quality import profile_run
+        profile_run(run_id, regulations)
+    result = validate(regulations, components)
+    if run_id:
+        metrics.flush_metrics(run_id)
+    return result
+
+
+def run_write(regulations: List[Dict], components: List[Dict],
+              run_id: Optional[str] = None) -> Dict[str, int]:
+    """Ejecuta la escritura (ver write.write): conteos {'inserted', 'updated', 'unchanged'}."""
+    import metrics
+    from write import write
+
+    result = write(regulations, components)
+    if run_id:
+        metrics.flush_metrics(run_id)
+    return result
+
+
+def run_reconcile(regulations: List[Dict], run_id: Optional[str] = None) -> Dict[str, Dict]:
+    """Reconcilia is_active contra lo rastreado (ver reconcile.reconcile)."""
+    import metrics
+    from reconcile import reconcile
+
+    result = reconcile(regulations)
+    if run_id:
+        metrics.flush_metrics(run_id)
+    return result
+
+
+def run_fetch_documents(run_id: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, int]:
+    """Descarga los documentos enlazados pendientes (ver documents.fetch_documents)."""
+    import metrics
+    from documents import fetch_documents
+    from write import DatabaseManager
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise Exception("Fallo al conectar con la base de datos")
+    try:
+        counts = fetch_documents(db_manager, limit=limit)
+    finally:
+        db_manager.close()
+    if run_id:
+        metrics.flush_metrics(run_id)
+    return counts
+
+
+def push_records(ti, key: str, records: List[Dict], run_id: str):
+    """Publica registros por XCom o por archivo (ver handoff.HANDOFF_MODE)."""
+    from handoff import push_records as _push_records
+    _push_records(ti, key, records, run_id)
+
+
+def pull_records(ti, key: str, task_ids: str) -> List[Dict]:
+    """Recupera registros publicados con push_records."""
+    from handoff import pull_records as _pull_records
+    return _pull_records(ti, key, task_ids)
+
+
+def run_cleanup(run_id: str, clear_checkpoints: bool = True) -> int:
+    """
+    Elimina los archivos de handoff de la corrida y, si se indica, sus
+    checkpoints de extracción (solo conviene cuando la corrida terminó bien).
+    """
+    from checkpoint import CheckpointStore
+    from handoff import cleanup_handoff
+
+    if clear_checkpoints:
+        CheckpointStore(run_id).clear()
+    return cleanup_handoff(run_id)
@@ -0,0 +1,132 @@
+"""
+Exporta regulations (con sus regulations_component) a CSV comprimido o Parquet.
+
+Las filas se leen con un cursor del lado del servidor
+(DatabaseManager.iter_query_batches) y se escriben lote por lote, así que la
+memoria se mantiene constante sin importar el tamaño de la tabla.
+
+    python src/export.py --output regulations.csv.gz
+    python src/export.py --output regulations.parquet --entity "Agencia Nacional de Infraestructura"
+"""
+import argparse
+import csv
+import gzip
+import logging
+import time
+from typing import Optional
+
+import metrics
+
+logger = logging.getLogger("export")
+
+EXPORT_COLUMNS = [
+    'id', 'created_at', 'update_at', 'is_active', 'title', 'gtype', 'entity',
+    'external_link', 'rtype_id', 'summary', 'classification_id', 'components_id',
+]
+
+EXPORT_QUERY = """
+    SELECT r.id, r.created_at, r.update_at, r.is_active, r.title, r.gtype, r.entity,
+           r.external_link, r.rtype_id, r.summary, r.classification_id, c.components_id
+    FROM regulations r
+    LEFT JOIN regulations_component c ON c.regulations_id = r.id
+    {where}
+    ORDER BY r.id, c.components_id
+"""
+
+
+def _detect_format(output_path: str) -> str:
+    if output_path.endswith(".parquet"):
+        return "parquet"
+    if output_path.endswith(".csv.gz") or output_path.endswith(".csv"):
+        return "csv"
+    raise ValueError(f"No se reconoce el formato de {output_path} (use .csv.gz o .parquet)")
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ('id', pa.int64()),
+        ('created_at', pa.string()),
+        ('update_at', pa.timestamp('us')),
+        ('is_active', pa.bool_()),
+        ('title', pa.string()),
+        ('gtype', pa.string()),
+        ('entity', pa.string()),
+        ('external_link', pa.string()),
+        ('rtype_id', pa.int64()),
+        ('summary', pa.string()),
+        ('classification_id', pa.int64()),
+        ('components_id', pa.int64()),
+    ])
+
+
+def _write_csv(batches, output_path: str) -> int:
+    opener = gzip.open if output_path.endswith(".gz") else open
+    total = 0
+    with opener(output_path, "wt", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        for rows in batches:
+            writer.writerows(rows)
+            total += len(rows)
+    return total
+
+
+def _write_parquet(batches, output_path: str) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    total = 0
+    with pq.ParquetWriter(output_path, schema, compression="zstd") as writer:
+        for rows in batches:
+            columns = list(zip(*rows))
+            table = pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema,
+            )
+            # Cada lote queda como un row group; no se acumula nada en memoria
+            writer.write_table(table)
+            total += len(rows)
+    return total
+
+
+def export_regulations(db_manager, output_path: str, output_format: Optional[str] = None,
+                       entity: Optional[str] = None, fetch_size: Optional[int] = None) -> int:
+    """Escribe la exportación en output_path y retorna el número de filas."""
+    output_format = output_format or _detect_format(output_path)
+    where, params = ("WHERE r.entity = %s", (entity,)) if entity else ("", None)
+    batches = db_manager.iter_query_batches(EXPORT_QUERY.format(where=where), params, fetch_size)
+
+    with metrics.stage("export") as stage_metrics:
+        if output_format == "parquet":
+            total = _write_parquet(batches, output_path)
+        else:
+            total = _write_csv(batches, output_path)
+        stage_metrics.rows_out += total
+
+    logger.info(f"Exportadas {total} filas a {output_path} ({output_format}).")
+    return total
+
+
+if __name__ == "__main__":
+    from write import DatabaseManager
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Exporta regulations a CSV comprimido o Parquet")
+    parser.add_argument("--output", required=True, help="Ruta .csv.gz o .parquet")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None)
+    parser.add_argument("--entity", default=None)
+    parser.add_argument("--fetch-size", type=int, default=None, help="Filas por lote (DB_FETCH_SIZE)")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise SystemExit("Fallo al conectar con la base de datos")
+    t0 = time.perf_counter()
+    try:
+        export_regulations(db_manager, args.output, args.format, args.entity, args.fetch_size)
+    finally:
+        db_manager.close()
+    logger.info(f"Exportación terminada en {time.perf_counter() - t0:.1f}s")
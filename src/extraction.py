@@ -3,6 +3,14 @@ from bs4 import BeautifulSoup
 from datetime import datetime
 import re
 import logging
+import os
+import time
+
+import metrics
+from classifier import classify_rtype
+from dates import format_date
+from checkpoint import CheckpointStore, scrape_page_checkpointed
+from records import RegulationBatch, RegulationRecord
 
 logger = logging.getLogger("extraction")
 
@@ -11,18 +19,13 @@ ENTITY_VALUE = 'Agencia Nacional de Infraestructura'
 FIXED_CLASSIFICATION_ID = 13
 COMPONENT_ID = 7  # ID fijo del componente en la tabla regulations_component
 
-URL_BASE = (
+# Se puede sobrescribir con ANI_URL_BASE para apuntar a un sitio local (pruebas)
+URL_BASE = os.getenv(
+    "ANI_URL_BASE",
     "https://www.ani.gov.co/informacion-de-la-ani/normatividad"
     "?field_tipos_de_normas__tid=12&title=&body_value=&field_fecha__value%5Bvalue%5D%5Byear%5D="
 )
 
-CLASSIFICATION_KEYWORDS = {
-    'resolución': 15,
-    'resolucion': 15,
-    'decreto': 14,
-}
-DEFAULT_RTYPE_ID = 14
-
 
 # === Utilidades ===
 def clean_quotes(text):
@@ -35,13 +38,9 @@ def clean_quotes(text):
     return ' '.join(cleaned_text.split())
 
 
-def get_rtype_id(title):
-    """Obtiene el tipo de regulación basado en palabras clave."""
-    title_lower = title.lower()
-    for keyword, rtype_id in CLASSIFICATION_KEYWORDS.items():
-        if keyword in title_lower:
-            return rtype_id
-    return DEFAULT_RTYPE_ID
+def get_rtype_id(title, summary=None):
+    """Obtiene el tipo de regulación por palabras clave en título y resumen (ver classifier.py)."""
+    return classify_rtype(title, summary)
 
 
 def is_valid_created_at(created_at_value):
@@ -102,18 +101,10 @@ def extract_creation_date(row, norma_data):
         fecha_span = fecha_cell.find('span', class_='date-display-single')
         if fecha_span:
             created_at_raw = fecha_span.get('content', fecha_span.get_text(strip=True))
-            if 'T' in created_at_raw:
-                norma_data['created_at'] = created_at_raw.split('T')[0]
-            elif '/' in created_at_raw:
-                try:
-                    day, month, year = created_at_raw.split('/')
-                    norma_data['created_at'] = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                except:
-                    norma_data['created_at'] = created_at_raw
-            else:
-                norma_data['created_at'] = created_at_raw
         else:
-            norma_data['created_at'] = fecha_cell.get_text(strip=True)
+            created_at_raw = fecha_cell.get_text(strip=True)
+        # Formatos no reconocidos se conservan crudos; la validación descartará la fila
+        norma_data['created_at'] = format_date(created_at_raw) or created_at_raw
     else:
         norma_data['created_at'] = None
 
@@ -121,63 +112,91 @@ def extract_creation_date(row, norma_data):
 
 
 # === Scraping principal ===
-def scrape_page(page_num=0):
-    """Extrae los registros de una página específica."""
-    page_url = f"{URL_BASE}&page={page_num}" if page_num > 0 else URL_BASE
-    response = requests.get(page_url, timeout=15)
-    response.raise_for_status()
+def build_page_url(page_num=0, url_base=None):
+    """Construye la URL de una página del listado."""
+    base = url_base or URL_BASE
+    return f"{base}&page={page_num}" if page_num > 0 else base
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+
+def parse_page_records(content, page_num=0, update_at=None):
+    """
+    Parsea el HTML de una página y retorna un RegulationBatch con las filas válidas.
+    update_at se calcula una sola vez (por página, o el que se reciba para la corrida).
+    """
+    batch = RegulationBatch(
+        entity=ENTITY_VALUE,
+        classification_id=FIXED_CLASSIFICATION_ID,
+        update_at=update_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    )
+
+    soup = BeautifulSoup(content, 'html.parser')
     tbody = soup.find('tbody')
     if not tbody:
-        return []
-
-    rows = tbody.find_all('tr')
-    page_data = []
-
-    for i, row in enumerate(rows, 1):
-        norma_data = {
-            'created_at': None,
-            'update_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'is_active': True,
-            'title': None,
-            'gtype': None,
-            'entity': ENTITY_VALUE,
-            'external_link': None,
-            'rtype_id': None,
-            'summary': None,
-            'classification_id': FIXED_CLASSIFICATION_ID,
-        }
+        return batch
 
+    # Dict de trabajo reutilizado: las funciones extract_* escriben aquí sus campos
+    norma_data = {}
+    for row in tbody.find_all('tr'):
         if not extract_title_and_link(row, norma_data):
             continue
         extract_summary(row, norma_data)
         if not extract_creation_date(row, norma_data):
             continue
 
-        norma_data['rtype_id'] = get_rtype_id(norma_data['title'])
-        page_data.append(norma_data)
+        batch.append(RegulationRecord(
+            title=norma_data['title'],
+            created_at=norma_data['created_at'],
+            external_link=norma_data['external_link'],
+            gtype=norma_data['gtype'],
+            summary=norma_data['summary'],
+            rtype_id=get_rtype_id(norma_data['title'], norma_data['summary']),
+        ))
+
+    logger.info(f"Página {page_num}: {len(batch)} filas extraídas.")
+    return batch
+
+
+def parse_page(content, page_num=0):
+    """Parsea el HTML de una página y retorna las filas válidas (dicts)."""
+    return parse_page_records(content, page_num).to_dicts()
+
+
+def scrape_page_records(page_num=0, url_base=None, update_at=None):
+    """Extrae los registros de una página específica como RegulationBatch."""
+    page_url = build_page_url(page_num, url_base)
+    t0 = time.perf_counter()
+    response = requests.get(page_url, timeout=15)
+    metrics.record_http(len(response.content), time.perf_counter() - t0)
+    response.raise_for_status()
+    return parse_page_records(response.content, page_num, update_at)
+
+
+def scrape_page(page_num=0, url_base=None):
+    """Extrae los registros de una página específica."""
+    return scrape_page_records(page_num, url_base).to_dicts()
+
 
-    logger.info(f"Página {page_num}: {len(page_data)} filas extraídas.")
-    return page_data
+def build_components(regulations):
+    """Genera los componentes asociados (uno por regulación)."""
+    return [{"components_id": COMPONENT_ID} for _ in regulations]
 
 
 # === Función principal ===
-def extract(num_pages=3):
+def extract(num_pages=3, run_id=None):
     """
     Extrae regulaciones y crea la lista de componentes asociada.
+    Si se indica run_id, guarda un checkpoint por página y reutiliza los
+    existentes, de modo que un reintento solo descarga las páginas faltantes.
     Retorna un dict: {'regulations': [...], 'components': [...]}
     """
-    all_regs = []
-    for p in range(num_pages):
-        all_regs.extend(scrape_page(p))
-
-    # Generar componentes asociados (uno por regulación)
-    components = []
-    for _ in all_regs:
-        components.append({
-            "components_id": COMPONENT_ID,  # Componente fijo (ej. 7)
-        })
+    store = CheckpointStore(run_id) if run_id else None
+    with metrics.stage("extract") as stage_metrics:
+        all_regs = []
+        for p in range(num_pages):
+            all_regs.extend(scrape_page_checkpointed(p, store, scrape_page))
+
+        components = build_components(all_regs)
+        stage_metrics.rows_out += len(all_regs)
 
     logger.info(f"Total extraído: {len(all_regs)} regulaciones y {len(components)} componentes.")
 
@@ -0,0 +1,113 @@
+"""
+Traspaso de datos entre tareas del DAG mediante archivos columnares.
+
+En modo 'file' cada etapa escribe su salida como Parquet (zstd) en el
+volumen compartido y por XCom solo viaja {'path', 'rows', 'checksum'}.
+En modo 'xcom' (por defecto) se conserva el comportamiento original.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import time
+from typing import List, Dict, Optional
+
+import pandas as pd
+
+logger = logging.getLogger("handoff")
+
+HANDOFF_MODE = os.getenv("HANDOFF_MODE", "xcom")
+HANDOFF_DIR = os.getenv("HANDOFF_DIR", "/opt/airflow/data/handoff")
+# Directorios de corridas que no se limpiaron (p. ej. por un fallo del worker)
+HANDOFF_RETENTION_HOURS = float(os.getenv("HANDOFF_RETENTION_HOURS", "24"))
+
+
+def _run_dir(run_id):
+    safe_run_id = re.sub(r'[^A-Za-z0-9_.-]', '_', run_id)
+    return os.path.join(HANDOFF_DIR, safe_run_id)
+
+
+def _file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_handoff(records: List[Dict], run_id: str, name: str) -> Dict:
+    """Escribe los registros en Parquet y retorna la referencia para XCom."""
+    run_dir = _run_dir(run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    path = os.path.join(run_dir, f"{name}.parquet")
+
+    df = pd.DataFrame(records)
+    tmp_path = path + ".tmp"
+    df.to_parquet(tmp_path, engine="pyarrow", compression="zstd", index=False)
+    os.replace(tmp_path, path)
+
+    ref = {"path": path, "rows": len(df), "checksum": _file_checksum(path)}
+    logger.info(f"Handoff '{name}' escrito: {ref['rows']} filas en {path}")
+    return ref
+
+
+def read_handoff(ref: Dict) -> List[Dict]:
+    """Lee un archivo de handoff verificando su checksum."""
+    path = ref["path"]
+    checksum = _file_checksum(path)
+    if checksum != ref["checksum"]:
+        raise ValueError(f"Checksum inválido para {path}: {checksum} != {ref['checksum']}")
+
+    df = pd.read_parquet(path, engine="pyarrow")
+    if len(df) != ref["rows"]:
+        raise ValueError(f"Número de filas inválido para {path}: {len(df)} != {ref['rows']}")
+
+    df = df.astype(object).where(pd.notnull(df), None)
+    return df.to_dict("records")
+
+
+def to_xcom_value(records: List[Dict], run_id: str, name: str, mode: Optional[str] = None):
+    """Retorna lo que debe viajar por XCom: la referencia al archivo o los registros."""
+    if (mode or HANDOFF_MODE) == "file":
+        return write_handoff(records, run_id, name)
+    return records
+
+
+def from_xcom_value(value) -> List[Dict]:
+    """Inverso de to_xcom_value."""
+    if isinstance(value, dict) and "path" in value and "checksum" in value:
+        return read_handoff(value)
+    return value or []
+
+
+def push_records(ti, key: str, records: List[Dict], run_id: str, mode: Optional[str] = None):
+    """Publica una lista de registros según el modo de handoff."""
+    ti.xcom_push(key=key, value=to_xcom_value(records, run_id, key, mode))
+
+
+def pull_records(ti, key: str, task_ids: str) -> List[Dict]:
+    """Recupera una lista de registros publicada con push_records."""
+    return from_xcom_value(ti.xcom_pull(key=key, task_ids=task_ids))
+
+
+def cleanup_handoff(run_id: str) -> int:
+    """
+    Elimina los archivos de la corrida y los directorios de corridas
+    anteriores que superen HANDOFF_RETENTION_HOURS. Retorna los directorios eliminados.
+    """
+    removed = 0
+    run_dir = _run_dir(run_id)
+    if os.path.isdir(run_dir):
+        shutil.rmtree(run_dir, ignore_errors=True)
+        removed += 1
+
+    if os.path.isdir(HANDOFF_DIR):
+        cutoff = time.time() - HANDOFF_RETENTION_HOURS * 3600
+        for entry in os.scandir(HANDOFF_DIR):
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+
+    logger.info(f"Handoff limpiado para {run_id}: {removed} directorios eliminados.")
+    return removed
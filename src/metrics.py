@@ -0,0 +1,284 @@
+"""
+Métricas por etapa del pipeline: tiempo, filas, throughput, bytes y
+latencias HTTP, y sentencias de base de datos.
+
+Las etapas se miden con `stage(...)`; dentro de ellas extraction y write
+registran llamadas HTTP y sentencias SQL con `record_http` / `record_db`.
+Al final de cada tarea `flush_metrics(run_id)` exporta en formato
+Prometheus (textfile) o StatsD y guarda el resumen en `pipeline_runs`.
+
+La etapa activa es por hilo: el trabajo que se reparte en un
+ThreadPoolExecutor debe envolverse con `bind(fn)` para que sus llamadas HTTP
+y SQL cuenten en la etapa del hilo que lo lanzó.
+"""
+import functools
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("metrics")
+
+# 'prometheus', 'statsd' o 'none'
+METRICS_EXPORT = os.getenv("METRICS_EXPORT", "none")
+METRICS_TEXTFILE_DIR = os.getenv("METRICS_TEXTFILE_DIR", "/opt/airflow/logs/metrics")
+METRICS_SAVE_DB = os.getenv("METRICS_SAVE_DB", "1") == "1"
+STATSD_HOST = os.getenv("STATSD_HOST", "localhost")
+STATSD_PORT = int(os.getenv("STATSD_PORT", "8125"))
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "ani_pipeline")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano (0 si no hay valores)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class StageMetrics:
+    """Acumulador de métricas de una etapa."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = None
+        self.wall_seconds = 0.0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.http_requests = 0
+        self.http_bytes = 0
+        self.http_latencies = []
+        self.db_statements = 0
+        self.db_seconds = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_out / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def summary(self) -> Dict:
+        return {
+            'stage': self.name,
+            'started_at': self.started_at,
+            'wall_seconds': round(self.wall_seconds, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rows_per_sec': round(self.rows_per_sec, 3),
+            'http_requests': self.http_requests,
+            'http_bytes': self.http_bytes,
+            'http_p50_ms': round(percentile(self.http_latencies, 50) * 1000, 3),
+            'http_p95_ms': round(percentile(self.http_latencies, 95) * 1000, 3),
+            'http_p99_ms': round(percentile(self.http_latencies, 99) * 1000, 3),
+            'db_statements': self.db_statements,
+            'db_seconds': round(self.db_seconds, 6),
+        }
+
+
+class RunMetrics:
+    """Métricas de todas las etapas ejecutadas en este proceso."""
+
+    def __init__(self):
+        self.stages: Dict[str, StageMetrics] = {}
+        # Pila de etapas activas de cada hilo
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def get_stage(self, name) -> StageMetrics:
+        with self._lock:
+            if name not in self.stages:
+                self.stages[name] = StageMetrics(name)
+            return self.stages[name]
+
+    def _stack(self) -> List[StageMetrics]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self) -> StageMetrics:
+        """Etapa activa más interna del hilo actual ('unscoped' si no hay ninguna)."""
+        stack = self._stack()
+        if stack:
+            return stack[-1]
+        return self.get_stage('unscoped')
+
+    @contextmanager
+    def stage(self, name):
+        stage_metrics = self.get_stage(name)
+        if stage_metrics.started_at is None:
+            stage_metrics.started_at = datetime.now()
+        stack = self._stack()
+        stack.append(stage_metrics)
+        t0 = time.perf_counter()
+        try:
+            yield stage_metrics
+        finally:
+            stage_metrics.wall_seconds += time.perf_counter() - t0
+            stack.pop()
+
+    def bind(self, fn):
+        """
+        Envuelve fn para que, ejecutada en otro hilo, registre en las etapas
+        activas del hilo que la envolvió (sin sumar su tiempo de pared).
+        """
+        stages = list(self._stack())
+
+        @functools.wraps(fn)
+        def bound(*args, **kwargs):
+            stack = self._stack()
+            depth = len(stack)
+            stack.extend(stages)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                del stack[depth:]
+
+        return bound
+
+    def record_http(self, nbytes, seconds):
+        stage_metrics = self.current()
+        with self._lock:
+            stage_metrics.http_requests += 1
+            stage_metrics.http_bytes += nbytes
+            stage_metrics.http_latencies.append(seconds)
+
+    def record_db(self, seconds, statements=1):
+        stage_metrics = self.current()
+        with self._lock:
+            stage_metrics.db_statements += statements
+            stage_metrics.db_seconds += seconds
+
+    def summaries(self) -> List[Dict]:
+        return [s.summary() for s in self.stages.values() if s.started_at or s.http_requests or s.db_statements]
+
+
+_RUN_METRICS = RunMetrics()
+
+
+def get_metrics() -> RunMetrics:
+    return _RUN_METRICS
+
+
+def reset_metrics():
+    global _RUN_METRICS
+    _RUN_METRICS = RunMetrics()
+
+
+def stage(name):
+    """Atajo para get_metrics().stage(name)."""
+    return _RUN_METRICS.stage(name)
+
+
+def bind(fn):
+    """Atajo para get_metrics().bind(fn)."""
+    return _RUN_METRICS.bind(fn)
+
+
+def record_http(nbytes, seconds):
+    _RUN_METRICS.record_http(nbytes, seconds)
+
+
+def record_db(seconds, statements=1):
+    _RUN_METRICS.record_db(seconds, statements)
+
+
+# === Exportadores ===
+EXPORTED_FIELDS = [
+    'wall_seconds', 'rows_in', 'rows_out', 'rows_per_sec', 'http_requests', 'http_bytes',
+    'http_p50_ms', 'http_p95_ms', 'http_p99_ms', 'db_statements', 'db_seconds',
+]
+
+
+def to_prometheus(summaries: List[Dict]) -> str:
+    """Serializa los resúmenes en formato de texto de Prometheus."""
+    lines = []
+    for field in EXPORTED_FIELDS:
+        metric = f"{METRICS_PREFIX}_{field}"
+        lines.append(f"# TYPE {metric} gauge")
+        for summary in summaries:
+            lines.append(f'{metric}{{stage="{summary["stage"]}"}} {summary[field]}')
+    return "\n".join(lines) + "\n"
+
+
+def export_prometheus(summaries: List[Dict], directory: str = None):
+    """Escribe un archivo .prom por etapa para el textfile collector de node_exporter."""
+    directory = directory or METRICS_TEXTFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    for summary in summaries:
+        path = os.path.join(directory, f"{METRICS_PREFIX}_{summary['stage']}.prom")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(to_prometheus([summary]))
+        os.replace(tmp_path, path)
+
+
+def export_statsd(summaries: List[Dict], host: str = None, port: int = None):
+    """Envía los resúmenes como gauges StatsD por UDP."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for summary in summaries:
+            for field in EXPORTED_FIELDS:
+                packet = f"{METRICS_PREFIX}.{summary['stage']}.{field}:{summary[field]}|g"
+                sock.sendto(packet.encode("utf-8"), (host or STATSD_HOST, port or STATSD_PORT))
+    finally:
+        sock.close()
+
+
+def save_run_summary(run_id: str, summaries: List[Dict]) -> int:
+    """
+    Guarda una fila por etapa en la tabla pipeline_runs. Cada proceso (cada
+    tarea del DAG, incluidas las mapeadas por página) guarda sus propias filas
+    con el mismo run_id; la vista pipeline_run_stages las agrega por corrida.
+    """
+    import pandas as pd
+    from write import DatabaseManager
+
+    if not summaries:
+        return 0
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise Exception("Fallo al conectar con la base de datos")
+    try:
+        df = pd.DataFrame(summaries)
+        df.insert(0, 'run_id', run_id)
+        return db_manager.bulk_insert(df, 'pipeline_runs')
+    finally:
+        db_manager.close()
+
+
+def flush_metrics(run_id: str, save_to_db: Optional[bool] = None) -> List[Dict]:
+    """
+    Exporta las métricas del proceso y guarda el resumen de la corrida.
+    Los errores se registran pero no interrumpen el pipeline.
+    """
+    summaries = _RUN_METRICS.summaries()
+    for summary in summaries:
+        logger.info(
+            f"[{run_id}] {summary['stage']}: {summary['wall_seconds']}s, "
+            f"{summary['rows_in']} -> {summary['rows_out']} filas ({summary['rows_per_sec']} filas/s), "
+            f"HTTP {summary['http_requests']} req / {summary['http_bytes']} B "
+            f"(p50 {summary['http_p50_ms']} ms, p95 {summary['http_p95_ms']} ms), "
+            f"BD {summary['db_statements']} sentencias / {summary['db_seconds']}s"
+        )
+
+    try:
+        if METRICS_EXPORT == "prometheus":
+            export_prometheus(summaries)
+        elif METRICS_EXPORT == "statsd":
+            export_statsd(summaries)
+    except Exception as e:
+        logger.error(f"Error exportando métricas: {e}")
+
+    if save_to_db if save_to_db is not None else METRICS_SAVE_DB:
+        try:
+            save_run_summary(run_id, summaries)
+        except Exception as e:
+            logger.error(f"Error guardando métricas en pipeline_runs: {e}")
+
+    reset_metrics()
+    return summaries
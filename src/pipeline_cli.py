@@ -0,0 +1,210 @@
+"""
+Ejecuta extract -> validate -> write en un solo proceso, sin Airflow.
+
+Pensado para corridas ad-hoc y mediciones reproducibles:
+
+    python src/pipeline_cli.py --start-page 0 --end-page 8 --concurrency 4
+    python src/pipeline_cli.py --pages 3 --dry-run --output json --output-file regs.json
+    python src/pipeline_cli.py --url-base "http://localhost:8765/normatividad?x=" --dry-run
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional
+
+import metrics
+from checkpoint import CheckpointStore, scrape_page_checkpointed
+from extraction import scrape_page_records
+from records import RegulationBatch
+from validation import validate, validate_batch
+
+logger = logging.getLogger("pipeline_cli")
+
+OUTPUT_FORMATS = ["summary", "json", "csv", "parquet"]
+
+
+def extract_pages(pages: List[int], concurrency: int = 1, url_base: Optional[str] = None,
+                  resume: Optional[str] = None) -> RegulationBatch:
+    """
+    Extrae las páginas indicadas (en paralelo) conservando el orden, como un
+    único RegulationBatch con un update_at común para toda la corrida.
+    Con resume=<run_id> usa checkpoints por página para reanudar la corrida.
+    """
+    store = CheckpointStore(resume) if resume else None
+    update_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def fetch(page_num):
+        # Mismo helper de checkpoints que el DAG (extraction.extract y las tareas mapeadas)
+        return scrape_page_checkpointed(
+            page_num, store,
+            lambda p: scrape_page_records(p, url_base=url_base, update_at=update_at),
+            from_rows=lambda rows: RegulationBatch.from_dicts(rows, update_at),
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        batches = list(executor.map(metrics.bind(fetch), pages))
+    if not batches:
+        return RegulationBatch.from_dicts([], update_at)
+    return RegulationBatch.concat(batches)
+
+
+def write_output(regulations, output_format: str, output_file: Optional[str]):
+    """Escribe las regulaciones validadas (lista de dicts o RegulationBatch) en el formato pedido."""
+    if output_format == "json":
+        if isinstance(regulations, RegulationBatch):
+            regulations = regulations.to_dicts()
+        payload = json.dumps(regulations, ensure_ascii=False, indent=2, default=str)
+        if output_file:
+            with open(output_file, "w", encoding="utf-8") as f:
+                f.write(payload)
+        else:
+            sys.stdout.write(payload + "\n")
+    elif output_format in ("csv", "parquet"):
+        import pandas as pd
+        if isinstance(regulations, RegulationBatch):
+            df = regulations.to_dataframe()
+        else:
+            df = pd.DataFrame(regulations)
+        if output_format == "csv":
+            df.to_csv(output_file or sys.stdout, index=False)
+        else:
+            if not output_file:
+                raise ValueError("--output parquet requiere --output-file")
+            df.to_parquet(output_file, index=False)
+
+
+def run(
+    pages: List[int],
+    concurrency: int = 1,
+    dry_run: bool = False,
+    url_base: Optional[str] = None,
+    write_mode: Optional[str] = None,
+    resume: Optional[str] = None,
+    sources_file: Optional[str] = None,
+    rate_limit: float = 0,
+    reconcile: bool = False,
+    profile_run_id: Optional[str] = None,
+) -> Dict:
+    """
+    Corre el pipeline completo y retorna regulaciones y tiempos por etapa.
+    Con sources_file se rastrean todas las fuentes configuradas (len(pages) por fuente).
+    Con reconcile (solo tras un rastreo completo) se desactivan las filas que ya no están en el sitio;
+    se omite si alguna página de las fuentes falló.
+    Con profile_run_id se perfila la calidad de lo extraído (ver quality.py).
+    """
+    timings = {}
+    failed_pages = 0
+
+    t0 = time.perf_counter()
+    if sources_file:
+        # Varias entidades: se mantiene la representación en dicts
+        from sources import load_sources, crawl_sources
+        data = crawl_sources(load_sources(sources_file), concurrency, rate_limit, len(pages) or None)
+        regulations, components = data["regulations"], data["components"]
+        failed_pages = data["failed_pages"]
+    else:
+        with metrics.stage("extract") as stage_metrics:
+            regulations = extract_pages(pages, concurrency, url_base, resume)
+            stage_metrics.rows_out += len(regulations)
+    timings["extract"] = time.perf_counter() - t0
+
+    if profile_run_id:
+        from quality import profile_run
+        t0 = time.perf_counter()
+        profile_run(profile_run_id, regulations, save_to_db=not dry_run, run_type="cli")
+        timings["profile"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if sources_file:
+        valid_regs, valid_comps = validate(regulations, components)
+    else:
+        valid_regs = validate_batch(regulations)
+    timings["validate"] = time.perf_counter() - t0
+
+    write_counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not dry_run:
+        from write import write, write_batch
+        t0 = time.perf_counter()
+        if sources_file:
+            write_counts = write(valid_regs, valid_comps, mode=write_mode)
+        else:
+            write_counts = write_batch(valid_regs, mode=write_mode)
+        timings["write"] = time.perf_counter() - t0
+        if reconcile and failed_pages:
+            # Un rastreo con páginas caídas parecería "filas que ya no están en el sitio"
+            logger.warning(f"Reconciliación omitida: {failed_pages} páginas fallaron en la extracción.")
+        elif reconcile:
+            from reconcile import reconcile as reconcile_active
+            t0 = time.perf_counter()
+            reconcile_active(valid_regs)
+            timings["reconcile"] = time.perf_counter() - t0
+        if resume:
+            CheckpointStore(resume).clear()
+
+    return {
+        "regulations": valid_regs,
+        "extracted": len(regulations),
+        "failed_pages": failed_pages,
+        "valid": len(valid_regs),
+        "inserted": write_counts["inserted"],
+        "updated": write_counts["updated"],
+        "unchanged": write_counts["unchanged"],
+        "timings": timings,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline ETL ANI en un solo proceso")
+    parser.add_argument("--pages", type=int, default=None, help="Número de páginas desde la 0")
+    parser.add_argument("--start-page", type=int, default=0)
+    parser.add_argument("--end-page", type=int, default=2, help="Última página (inclusive)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Descargas en paralelo")
+    parser.add_argument("--dry-run", action="store_true", help="No escribe en la base de datos")
+    parser.add_argument("--output", choices=OUTPUT_FORMATS, default="summary")
+    parser.add_argument("--output-file", default=None)
+    parser.add_argument("--url-base", default=None, help="URL del listado (por defecto ANI_URL_BASE)")
+    parser.add_argument("--write-mode", choices=["insert", "upsert"], default=None)
+    parser.add_argument("--resume", default=None, metavar="RUN_ID",
+                        help="Guarda/reutiliza checkpoints por página bajo este identificador")
+    parser.add_argument("--sources", default=None, metavar="SOURCES_JSON",
+                        help="Rastrea todas las fuentes de este archivo (ver configs/sources.json)")
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="Peticiones por segundo compartidas entre fuentes (0 = sin límite)")
+    parser.add_argument("--reconcile", action="store_true",
+                        help="Tras un rastreo completo, marca is_active=false lo que ya no está en el sitio")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    args = parse_args(argv)
+
+    if args.pages is not None:
+        pages = list(range(args.pages))
+    elif args.sources:
+        # Con --sources cada fuente usa sus propias páginas, salvo que se pase --pages
+        pages = []
+    else:
+        pages = list(range(args.start_page, args.end_page + 1))
+
+    run_id = f"cli__{datetime.now().isoformat()}"
+    result = run(pages, args.concurrency, args.dry_run, args.url_base, args.write_mode, args.resume,
+                 args.sources, args.rate_limit, args.reconcile, run_id)
+    write_output(result["regulations"], args.output, args.output_file)
+    metrics.flush_metrics(run_id, save_to_db=not args.dry_run)
+
+    timings = " | ".join(f"{stage}: {seconds:.3f}s" for stage, seconds in result["timings"].items())
+    logger.info(
+        f"Páginas: {len(pages)} | Extraídas: {result['extracted']} | Válidas: {result['valid']} | "
+        f"Insertadas: {result['inserted']} | Actualizadas: {result['updated']} | "
+        f"Sin cambios: {result['unchanged']}{' (dry-run)' if args.dry_run else ''} | {timings}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
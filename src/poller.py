@@ -0,0 +1,373 @@
+"""
+Servicio residente que sondea la página 0 de la ANI e ingiere solo lo nuevo.
+
+A diferencia del DAG y de la Lambda, el proceso se mantiene vivo y conserva
+entre sondeos: la sesión HTTP (keep-alive y ETag de la última respuesta), la
+conexión a la BD, las reglas de validación ya cargadas, el clasificador
+compilado y el conjunto de claves ya almacenadas. Un sondeo sin cambios
+cuesta una petición condicional; con cambios se parsea la página, se
+filtran las filas que ya existen y, si toda la página era nueva, se sigue
+con la siguiente (hasta POLL_MAX_PAGES).
+
+Endpoints locales:
+    GET  /health   200 si el último sondeo terminó bien y es reciente; 503 si no
+    GET  /metrics  métricas en formato de texto de Prometheus
+    POST /trigger  fuerza un sondeo inmediato
+
+    python src/poller.py --interval 60 --port 8090
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import requests
+
+import metrics
+from checkpoint import page_fingerprint
+from extraction import build_page_url, parse_page_records, ENTITY_VALUE
+from validation import load_rules, validate_batch
+from write import (
+    DatabaseManager, NEAR_DUP_MODE, handle_near_duplicates, insert_records_skip_conflicts, _record_key,
+)
+
+logger = logging.getLogger("poller")
+
+POLL_INTERVAL_SECONDS = float(os.getenv("POLL_INTERVAL_SECONDS", "60"))
+POLL_MAX_PAGES = int(os.getenv("POLL_MAX_PAGES", "5"))
+POLLER_HOST = os.getenv("POLLER_HOST", "127.0.0.1")
+POLLER_PORT = int(os.getenv("POLLER_PORT", "8090"))
+
+# Campos de metrics.StageMetrics que se acumulan entre ciclos (el resto son del último ciclo)
+STAGE_COUNTERS = ['wall_seconds', 'rows_in', 'rows_out', 'http_requests', 'http_bytes',
+                  'db_statements', 'db_seconds']
+STAGE_GAUGES = ['http_p50_ms', 'http_p95_ms', 'http_p99_ms']
+
+KNOWN_KEYS_QUERY = """
+    SELECT title, created_at, COALESCE(external_link, '') FROM regulations WHERE entity = %s
+"""
+
+
+class Poller:
+    """Estado caliente del servicio y un ciclo de sondeo."""
+
+    def __init__(self, url_base: Optional[str] = None, interval: float = POLL_INTERVAL_SECONDS,
+                 max_pages: int = POLL_MAX_PAGES, entity: str = ENTITY_VALUE):
+        self.url_base = url_base
+        self.interval = interval
+        self.max_pages = max_pages
+        self.entity = entity
+
+        self.session = requests.Session()
+        self.db_manager = None
+        self.rules = load_rules()
+        self.known_keys = None
+        self.etag = None
+        self.pending_etag = None
+        self.last_fingerprint = None
+
+        self.trigger_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.stats = {
+            "polls_total": 0,
+            "polls_changed": 0,
+            "polls_failed": 0,
+            "pages_fetched": 0,
+            "rows_inserted": 0,
+            "last_poll_timestamp": 0.0,
+            "last_success_timestamp": 0.0,
+            "last_poll_seconds": 0.0,
+        }
+        self.last_error = None
+        # Métricas por etapa (metrics.py) acumuladas entre ciclos para /metrics
+        self.stage_totals = {}
+        self.stage_last = {}
+
+    # --- Recursos calientes ---
+    def get_db(self) -> DatabaseManager:
+        """Conexión persistente; se reabre solo si dejó de responder."""
+        if self.db_manager is not None:
+            try:
+                self.db_manager.connection.rollback()
+                self.db_manager.cursor.execute("SELECT 1")
+                self.db_manager.cursor.fetchone()
+                self.db_manager.connection.rollback()
+                return self.db_manager
+            except Exception:
+                logger.warning("Conexión a BD perdida; se reabre.")
+                try:
+                    self.db_manager.close()
+                except Exception:
+                    pass
+                self.db_manager = None
+                self.known_keys = None
+        db_manager = DatabaseManager()
+        if not db_manager.connect():
+            raise Exception("Fallo al conectar con la base de datos")
+        self.db_manager = db_manager
+        return db_manager
+
+    def load_known_keys(self, db_manager):
+        if self.known_keys is None:
+            self.known_keys = {
+                _record_key(title, created_at, link)
+                for title, created_at, link in db_manager.iter_query(KNOWN_KEYS_QUERY, (self.entity,))
+            }
+            logger.info(f"Claves conocidas cargadas: {len(self.known_keys)}")
+        return self.known_keys
+
+    # --- Sondeo ---
+    def fetch(self, page_num: int):
+        """
+        Descarga una página; None si la página 0 no cambió (304). El ETag
+        nuevo queda pendiente hasta que el ciclo termine sin error.
+        """
+        headers = {"If-None-Match": self.etag} if page_num == 0 and self.etag else {}
+        t0 = time.perf_counter()
+        response = self.session.get(build_page_url(page_num, self.url_base), headers=headers, timeout=15)
+        metrics.record_http(len(response.content), time.perf_counter() - t0)
+        with self.lock:
+            self.stats["pages_fetched"] += 1
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        if page_num == 0:
+            self.pending_etag = response.headers.get("ETag")
+        return response.content
+
+    def poll_once(self) -> Dict:
+        """Un ciclo: página 0 y, mientras todo sea nuevo, las siguientes."""
+        t0 = time.perf_counter()
+        result = {"changed": False, "new_rows": 0, "inserted": 0, "pages": 0}
+        try:
+            with metrics.stage("extract"):
+                content = self.fetch(0)
+                result["pages"] = 1
+                if content is None:
+                    return result
+                update_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                batch = parse_page_records(content, 0, update_at)
+            fingerprint = page_fingerprint(batch.to_dicts())
+            if fingerprint == self.last_fingerprint:
+                self.etag = self.pending_etag
+                return result
+            result["changed"] = True
+
+            db_manager = self.get_db()
+            known = self.load_known_keys(db_manager)
+            new_batches = []
+            page_num = 0
+            while True:
+                new_records = [r for r in batch.records
+                               if _record_key(r.title, r.created_at, r.external_link) not in known]
+                if new_records:
+                    page_batch = type(batch)(batch.entity, batch.classification_id, update_at, batch.is_active,
+                                             new_records)
+                    new_batches.append(page_batch)
+                # Si la página tenía filas ya conocidas, lo nuevo no sigue más atrás
+                if len(new_records) < len(batch) or not len(batch) or page_num + 1 >= self.max_pages:
+                    break
+                page_num += 1
+                with metrics.stage("extract"):
+                    batch = parse_page_records(self.fetch(page_num), page_num, update_at)
+                result["pages"] += 1
+
+            if new_batches:
+                valid = validate_batch(type(batch).concat(new_batches), self.rules)
+                result["new_rows"] = len(valid)
+                if len(valid):
+                    result["inserted"] = self.insert(db_manager, valid)
+            # Solo tras insertar sin error: si algo falla, el próximo ciclo reintenta la misma página
+            self.last_fingerprint = fingerprint
+            self.etag = self.pending_etag
+            return result
+        finally:
+            result["seconds"] = round(time.perf_counter() - t0, 3)
+
+    def insert(self, db_manager, batch) -> int:
+        """
+        Inserta el delta ya deduplicado contra las claves conocidas. Las claves
+        pueden estar desactualizadas (el DAG o la Lambda también escriben), por
+        eso las filas ya presentes se omiten con ON CONFLICT sin perder las nuevas.
+        """
+        # Misma normalización que insert_new_records
+        df = batch.to_dataframe()
+        df['created_at'] = df['created_at'].astype(str)
+        df['external_link'] = df['external_link'].fillna('').astype(str)
+        df['title'] = df['title'].astype(str).str.strip()
+        df = df.drop_duplicates(subset=['title', 'created_at', 'external_link'], keep='first')
+        if NEAR_DUP_MODE != 'off':
+            df, _ = handle_near_duplicates(db_manager, df, self.entity)
+            if df.empty:
+                return 0
+        with metrics.stage("write") as stage_metrics:
+            inserted, message = insert_records_skip_conflicts(db_manager, df, self.entity)
+            stage_metrics.rows_in += len(df)
+            stage_metrics.rows_out += inserted
+        logger.info(message)
+        # Insertadas por este ciclo o por otro escritor: en ambos casos ya están en la BD
+        self.known_keys.update(
+            _record_key(title, created_at, link)
+            for title, created_at, link in zip(df['title'], df['created_at'], df['external_link'])
+        )
+        return inserted
+
+    def run(self):
+        """Bucle principal hasta recibir stop()."""
+        logger.info(f"Sondeando cada {self.interval}s (máximo {self.max_pages} páginas por cambio).")
+        while not self.stop_event.is_set():
+            try:
+                result = self.poll_once()
+                with self.lock:
+                    self.stats["polls_total"] += 1
+                    self.stats["polls_changed"] += int(result["changed"])
+                    self.stats["rows_inserted"] += result["inserted"]
+                    self.stats["last_poll_seconds"] = result["seconds"]
+                    self.stats["last_poll_timestamp"] = self.stats["last_success_timestamp"] = time.time()
+                    self.last_error = None
+                if result["changed"]:
+                    logger.info(f"Sondeo con cambios: {result}")
+            except Exception as e:
+                with self.lock:
+                    self.stats["polls_total"] += 1
+                    self.stats["polls_failed"] += 1
+                    self.stats["last_poll_timestamp"] = time.time()
+                    self.last_error = str(e)
+                logger.error(f"Error en el sondeo: {e}")
+            self.collect_stage_metrics()
+
+            self.trigger_event.wait(self.interval)
+            self.trigger_event.clear()
+
+    def collect_stage_metrics(self):
+        """Suma las métricas por etapa del ciclo a los totales del servicio y las reinicia."""
+        summaries = metrics.get_metrics().summaries()
+        metrics.reset_metrics()
+        with self.lock:
+            for summary in summaries:
+                totals = self.stage_totals.setdefault(summary['stage'], dict.fromkeys(STAGE_COUNTERS, 0))
+                for field in STAGE_COUNTERS:
+                    totals[field] += summary[field]
+                self.stage_last[summary['stage']] = {field: summary[field] for field in STAGE_GAUGES}
+
+    def trigger(self):
+        self.trigger_event.set()
+
+    def stop(self):
+        self.stop_event.set()
+        self.trigger_event.set()
+
+    def close(self):
+        self.session.close()
+        if self.db_manager is not None:
+            self.db_manager.close()
+
+    # --- Estado para los endpoints ---
+    def health(self):
+        with self.lock:
+            last_success = self.stats["last_success_timestamp"]
+            error = self.last_error
+        age = time.time() - last_success if last_success else None
+        healthy = age is not None and age <= 3 * self.interval + 30 and error is None
+        return healthy, {"healthy": healthy, "last_success_age_seconds": age, "last_error": error}
+
+    def prometheus(self) -> str:
+        prefix = metrics.METRICS_PREFIX + "_poller"
+        with self.lock:
+            stats = dict(self.stats)
+            stage_totals = {name: dict(totals) for name, totals in self.stage_totals.items()}
+            stage_last = {name: dict(last) for name, last in self.stage_last.items()}
+        lines = []
+        for name, value in stats.items():
+            kind = "counter" if name in ("polls_total", "polls_changed", "polls_failed",
+                                         "pages_fetched", "rows_inserted") else "gauge"
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"{prefix}_{name} {value}")
+        lines.append(f"# TYPE {prefix}_known_keys gauge")
+        lines.append(f"{prefix}_known_keys {len(self.known_keys or ())}")
+        # Etapas de metrics.py: totales desde el arranque y percentiles HTTP del último ciclo
+        for field in STAGE_COUNTERS:
+            metric = f"{prefix}_stage_{field}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for name, totals in stage_totals.items():
+                lines.append(f'{metric}{{stage="{name}"}} {round(totals[field], 6)}')
+        for field in STAGE_GAUGES:
+            metric = f"{prefix}_stage_{field}"
+            lines.append(f"# TYPE {metric} gauge")
+            for name, last in stage_last.items():
+                lines.append(f'{metric}{{stage="{name}"}} {last[field]}')
+        return "\n".join(lines) + "\n"
+
+
+def make_handler(poller: Poller):
+    class PollerHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type="application/json"):
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/health":
+                healthy, body = poller.health()
+                self._send(200 if healthy else 503, json.dumps(body))
+            elif self.path == "/metrics":
+                self._send(200, poller.prometheus(), "text/plain; version=0.0.4")
+            else:
+                self._send(404, json.dumps({"error": "not found"}))
+
+        def do_POST(self):
+            if self.path == "/trigger":
+                poller.trigger()
+                self._send(202, json.dumps({"triggered": True}))
+            else:
+                self._send(404, json.dumps({"error": "not found"}))
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return PollerHandler
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Servicio de sondeo incremental de la ANI")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL_SECONDS, help="Segundos entre sondeos")
+    parser.add_argument("--max-pages", type=int, default=POLL_MAX_PAGES)
+    parser.add_argument("--url-base", default=None, help="URL del listado (por defecto ANI_URL_BASE)")
+    parser.add_argument("--host", default=POLLER_HOST)
+    parser.add_argument("--port", type=int, default=POLLER_PORT)
+    args = parser.parse_args(argv)
+
+    poller = Poller(args.url_base, args.interval, args.max_pages)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(poller))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Endpoints en http://{args.host}:{args.port} (/health, /metrics, POST /trigger)")
+
+    def handle_signal(signum, frame):
+        logger.info("Señal de parada recibida.")
+        poller.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    try:
+        poller.run()
+    finally:
+        server.shutdown()
+        server.server_close()
+        poller.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+"""
+Sonda barata de contenido nuevo: descarga solo la página 0 y la compara
+contra la marca de agua de la base de datos.
+"""
+import logging
+from typing import Tuple, Optional
+
+import pandas as pd
+
+from extraction import scrape_page, ENTITY_VALUE
+from write import DatabaseManager, compute_content_hash, CONTENT_HASH_SQL, WRITE_MODE
+
+logger = logging.getLogger("probe")
+
+
+def _key(title, created_at, external_link):
+    return f"{str(title).strip()}|{created_at}|{external_link or ''}"
+
+
+def has_new_content(url_base: Optional[str] = None, entity: str = ENTITY_VALUE,
+                    compare_content: Optional[bool] = None) -> Tuple[bool, str]:
+    """
+    Retorna (hay_contenido_nuevo, motivo).
+    Hay contenido nuevo si la fecha más reciente de la página 0 supera la de la
+    BD, si alguna fila de la página 0 no existe en la BD o, en modo upsert,
+    si su hash de contenido cambió. Ante cualquier error se asume que sí.
+    """
+    if compare_content is None:
+        compare_content = WRITE_MODE == 'upsert'
+
+    try:
+        rows = scrape_page(0, url_base=url_base)
+    except Exception as e:
+        return True, f"Error descargando la página 0: {e}"
+
+    if not rows:
+        return True, "La página 0 no tiene filas; se ejecuta el pipeline para diagnosticar"
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        return True, "Error conectando a la base de datos"
+
+    try:
+        result = db_manager.execute_query(
+            "SELECT MAX(created_at) FROM regulations WHERE entity = %s", (entity,)
+        )
+        watermark = result[0][0] if result and result[0][0] else None
+
+        newest_web = max(str(row['created_at']) for row in rows)
+        if watermark is None or newest_web > str(watermark):
+            return True, f"Fecha más reciente en web {newest_web} > marca de agua {watermark}"
+
+        titles = list({str(row['title']).strip() for row in rows})
+        existing = db_manager.execute_query(
+            f"""
+            SELECT title, created_at, COALESCE(external_link, ''), COALESCE(content_hash, {CONTENT_HASH_SQL})
+            FROM regulations
+            WHERE entity = %s AND title = ANY(%s)
+            """,
+            (entity, titles),
+        )
+        stored = {_key(t, c, l): h for t, c, l, h in existing}
+
+        hashes = compute_content_hash(pd.DataFrame(rows)) if compare_content else [None] * len(rows)
+        for row, content_hash in zip(rows, hashes):
+            key = _key(row['title'], row['created_at'], row['external_link'])
+            if key not in stored:
+                return True, f"Fila nueva en la página 0: {row['title']}"
+            if compare_content and stored[key] != content_hash:
+                return True, f"Contenido modificado en la página 0: {row['title']}"
+
+        return False, f"Sin cambios en la página 0 (marca de agua {watermark})"
+    except Exception as e:
+        return True, f"Error en la sonda de contenido nuevo: {e}"
+    finally:
+        db_manager.close()
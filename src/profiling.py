@@ -0,0 +1,105 @@
+"""
+Perfilado opcional (cProfile + tracemalloc) de las tareas del pipeline.
+
+Se activa con PIPELINE_PROFILE=1. Con la variable apagada el decorador
+solo agrega una consulta a os.environ por llamada, así que puede quedar
+en el código desplegado. Los resultados se escriben en
+PROFILE_DIR/<run_id>/<etapa>.{prof,tracemalloc,txt}; en Lambda usar
+PROFILE_DIR=/tmp/profiles (único directorio escribible).
+"""
+import functools
+import io
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger("profiling")
+
+PROFILE_FLAG = "PIPELINE_PROFILE"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/opt/airflow/logs/profiles")
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+
+
+def _resolve_label(stage, args, kwargs):
+    """Obtiene (run_id, etiqueta) del contexto de Airflow o de Lambda."""
+    run_id = kwargs.get("run_id")
+    label = stage
+
+    ti = kwargs.get("ti")
+    map_index = getattr(ti, "map_index", -1) if ti is not None else -1
+    if map_index is not None and map_index >= 0:
+        label = f"{stage}_{map_index}"
+
+    # lambda_handler(event, context)
+    if run_id is None and len(args) >= 2:
+        run_id = getattr(args[1], "aws_request_id", None)
+
+    run_id = run_id or time.strftime("local_%Y%m%dT%H%M%S")
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(run_id)), label
+
+
+def _write_reports(profiler, snapshot, peak, elapsed, run_id, label):
+    import pstats
+
+    out_dir = os.path.join(PROFILE_DIR, run_id)
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, label)
+
+    profiler.dump_stats(base + ".prof")
+    snapshot.dump(base + ".tracemalloc")
+
+    stats_buffer = io.StringIO()
+    pstats.Stats(profiler, stream=stats_buffer).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(f"Etapa: {label} | run_id: {run_id} | tiempo: {elapsed:.3f}s | pico de memoria: {peak / 1024:.1f} KiB\n\n")
+        f.write("=== Asignaciones (top por línea) ===\n")
+        for stat in snapshot.statistics("lineno")[:PROFILE_TOP_N]:
+            f.write(f"{stat}\n")
+        f.write("\n=== cProfile (acumulado) ===\n")
+        f.write(stats_buffer.getvalue())
+
+    logger.info(f"Perfil de {label} escrito en {base}.{{prof,tracemalloc,txt}}")
+
+
+def _run_profiled(func, args, kwargs, stage):
+    import cProfile
+    import tracemalloc
+
+    run_id, label = _resolve_label(stage, args, kwargs)
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(25)
+    tracemalloc.reset_peak()
+
+    profiler = cProfile.Profile()
+    t0 = time.perf_counter()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - t0
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        try:
+            _write_reports(profiler, snapshot, peak, elapsed, run_id, label)
+        except Exception as e:
+            logger.error(f"Error escribiendo el perfil de {label}: {e}")
+
+
+def profiled(stage):
+    """Decorador: perfila la función si PIPELINE_PROFILE=1."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if os.environ.get(PROFILE_FLAG) != "1":
+                return func(*args, **kwargs)
+            return _run_profiled(func, args, kwargs, stage)
+        return wrapper
+    return decorator
@@ -0,0 +1,258 @@
+"""
+Perfil de calidad de datos por corrida.
+
+Recorre las regulaciones una sola vez y, por columna, acumula: nulos (y
+textos vacíos), histograma de longitudes con cubetas fijas, longitud mínima,
+máxima y media, distintos aproximados con HyperLogLog (2^12 registros, ~1.6 %
+de error) y, para created_at, el rango de fechas. La memoria es constante
+sin importar el número de filas.
+
+El perfil se guarda en data_quality_profiles (una fila por columna y
+corrida) y se compara con la corrida anterior del mismo alcance (mismas
+entidades) y tipo de corrida (dag o cli): un salto en la tasa de nulos,
+en la longitud media o en los distintos suele indicar un cambio de marcado
+en la ANI antes de que la validación empiece a descartar filas.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger("quality")
+
+QUALITY_PROFILE = os.getenv("QUALITY_PROFILE", "1") == "1"
+# Umbrales de la comparación con la corrida anterior
+QUALITY_NULL_RATE_DELTA = float(os.getenv("QUALITY_NULL_RATE_DELTA", "0.10"))
+QUALITY_LENGTH_CHANGE_PCT = float(os.getenv("QUALITY_LENGTH_CHANGE_PCT", "30"))
+QUALITY_DISTINCT_CHANGE_PCT = float(os.getenv("QUALITY_DISTINCT_CHANGE_PCT", "50"))
+
+PROFILED_COLUMNS = [
+    'created_at', 'title', 'summary', 'external_link', 'gtype', 'rtype_id',
+    'entity', 'classification_id', 'is_active',
+]
+# Límite superior (inclusive) de cada cubeta de longitud; la última es "más de 255"
+LENGTH_BUCKETS = [0, 10, 25, 50, 65, 100, 255]
+
+PREVIOUS_PROFILE_QUERY = """
+    SELECT column_name, row_count, null_rate, distinct_estimate, mean_length, min_value, max_value
+    FROM data_quality_profiles
+    WHERE run_id = (
+        SELECT run_id FROM data_quality_profiles
+        WHERE run_id <> %s AND scope = %s AND run_type = %s
+        ORDER BY recorded_at DESC
+        LIMIT 1
+    )
+    AND scope = %s AND run_type = %s
+"""
+
+
+class HyperLogLog:
+    """Conteo aproximado de distintos con 2^p registros de un byte."""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        self.alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, value):
+        x = int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        estimate = self.alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Rango bajo: conteo lineal
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class ColumnProfile:
+    """Estadísticas de una columna acumuladas fila a fila."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.empty = 0
+        self.length_total = 0
+        self.min_length = None
+        self.max_length = None
+        self.histogram = [0] * (len(LENGTH_BUCKETS) + 1)
+        self.hll = HyperLogLog()
+        self.min_value = None
+        self.max_value = None
+
+    def update(self, value):
+        self.count += 1
+        if value is None or (isinstance(value, float) and value != value):
+            self.nulls += 1
+            return
+        text = str(value)
+        length = len(text)
+        if length == 0:
+            self.empty += 1
+        self.length_total += length
+        self.min_length = length if self.min_length is None else min(self.min_length, length)
+        self.max_length = length if self.max_length is None else max(self.max_length, length)
+        for i, upper in enumerate(LENGTH_BUCKETS):
+            if length <= upper:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+        self.hll.add(text)
+        if self.name == 'created_at':
+            # Fechas YYYY-MM-DD: el orden de texto coincide con el de fechas
+            self.min_value = text if self.min_value is None else min(self.min_value, text)
+            self.max_value = text if self.max_value is None else max(self.max_value, text)
+
+    def to_dict(self) -> Dict:
+        present = self.count - self.nulls
+        return {
+            'column_name': self.name,
+            'row_count': self.count,
+            'null_rate': round(self.nulls / self.count, 4) if self.count else 0.0,
+            'empty_count': self.empty,
+            'distinct_estimate': self.hll.count() if present else 0,
+            'min_length': self.min_length,
+            'max_length': self.max_length,
+            'mean_length': round(self.length_total / present, 2) if present else None,
+            'length_histogram': json.dumps(dict(zip(
+                [f"<={upper}" for upper in LENGTH_BUCKETS] + [f">{LENGTH_BUCKETS[-1]}"], self.histogram
+            ))),
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+        }
+
+
+class DataProfiler:
+    """Perfil de todas las columnas en una sola pasada."""
+
+    def __init__(self, columns: Optional[List[str]] = None):
+        self.columns = {name: ColumnProfile(name) for name in (columns or PROFILED_COLUMNS)}
+
+    def update(self, row: Dict):
+        for name, column in self.columns.items():
+            column.update(row.get(name))
+
+    def update_many(self, rows: Iterable[Dict]) -> "DataProfiler":
+        for row in rows:
+            self.update(row)
+        return self
+
+    def update_batch(self, batch) -> "DataProfiler":
+        """Perfila un RegulationBatch (records.py) sin convertirlo a dicts."""
+        for record in batch.records:
+            for name, column in self.columns.items():
+                column.update(batch.value(record, name))
+        return self
+
+    def to_dicts(self) -> List[Dict]:
+        return [column.to_dict() for column in self.columns.values()]
+
+
+def compare_profiles(current: List[Dict], previous: List[Dict]) -> List[str]:
+    """Diferencias relevantes entre el perfil actual y el de la corrida anterior."""
+    previous_by_column = {row['column_name']: row for row in previous}
+    warnings = []
+    for row in current:
+        name = row['column_name']
+        old = previous_by_column.get(name)
+        if not old:
+            continue
+        if abs(row['null_rate'] - float(old['null_rate'] or 0)) > QUALITY_NULL_RATE_DELTA:
+            warnings.append(f"{name}: tasa de nulos {old['null_rate']} -> {row['null_rate']}")
+        old_length, new_length = old.get('mean_length'), row.get('mean_length')
+        if old_length and new_length is not None:
+            change = abs(new_length - float(old_length)) / float(old_length) * 100
+            if change > QUALITY_LENGTH_CHANGE_PCT:
+                warnings.append(f"{name}: longitud media {old_length} -> {new_length}")
+        # Los distintos solo son comparables si el volumen es parecido
+        old_rows, old_distinct = old.get('row_count') or 0, old.get('distinct_estimate') or 0
+        if old_distinct and old_rows and row['row_count']:
+            old_ratio = old_distinct / old_rows
+            new_ratio = row['distinct_estimate'] / row['row_count']
+            if abs(new_ratio - old_ratio) / old_ratio * 100 > QUALITY_DISTINCT_CHANGE_PCT:
+                warnings.append(
+                    f"{name}: distintos/filas {old_ratio:.2f} -> {new_ratio:.2f}"
+                )
+        if name == 'created_at' and old.get('max_value') and row.get('max_value') \
+                and row['max_value'] < old['max_value']:
+            warnings.append(f"created_at: fecha máxima retrocedió {old['max_value']} -> {row['max_value']}")
+    return warnings
+
+
+def profile_scope(regulations) -> str:
+    """Alcance de la corrida: sus entidades, ordenadas (una corrida --sources no se compara con una solo ANI)."""
+    if hasattr(regulations, 'records'):
+        entities = {regulations.entity}
+    else:
+        entities = {row.get('entity') for row in regulations}
+    return " | ".join(sorted(str(entity) for entity in entities if entity))[:255]
+
+
+def save_profile(run_id: str, profile: List[Dict], scope: str = "", run_type: str = "dag") -> List[str]:
+    """
+    Guarda el perfil de la corrida y retorna las advertencias frente a la
+    anterior con el mismo alcance y tipo de corrida.
+    """
+    import pandas as pd
+    from write import DatabaseManager
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise Exception("Fallo al conectar con la base de datos")
+    try:
+        columns = ['column_name', 'row_count', 'null_rate', 'distinct_estimate', 'mean_length',
+                   'min_value', 'max_value']
+        previous = [dict(zip(columns, row)) for row in db_manager.execute_query(
+            PREVIOUS_PROFILE_QUERY, (run_id, scope, run_type, scope, run_type)
+        )]
+        df = pd.DataFrame(profile)
+        df.insert(0, 'run_id', run_id)
+        df.insert(1, 'scope', scope)
+        df.insert(2, 'run_type', run_type)
+        db_manager.bulk_insert(df, 'data_quality_profiles')
+    finally:
+        db_manager.close()
+    return compare_profiles(profile, previous)
+
+
+def profile_run(run_id: str, regulations, save_to_db: bool = True, run_type: str = "dag") -> List[Dict]:
+    """
+    Perfila las regulaciones de una corrida (lista de dicts o RegulationBatch),
+    la guarda y registra las diferencias con la anterior del mismo alcance y
+    run_type ('dag' o 'cli'). Los errores se registran pero no interrumpen el pipeline.
+    """
+    if not QUALITY_PROFILE:
+        return []
+    profiler = DataProfiler()
+    if hasattr(regulations, 'records'):
+        profiler.update_batch(regulations)
+    else:
+        profiler.update_many(regulations)
+    profile = profiler.to_dicts()
+
+    for row in profile:
+        logger.info(
+            f"[{run_id}] {row['column_name']}: nulos {row['null_rate']:.1%} | "
+            f"~{row['distinct_estimate']} distintos | longitud {row['min_length']}-{row['max_length']} "
+            f"(media {row['mean_length']})"
+            + (f" | rango {row['min_value']} a {row['max_value']}" if row['min_value'] else "")
+        )
+
+    if save_to_db:
+        try:
+            for warning in save_profile(run_id, profile, profile_scope(regulations), run_type):
+                logger.warning(f"[{run_id}] Cambio de calidad frente a la corrida anterior: {warning}")
+        except Exception as e:
+            logger.error(f"Error guardando el perfil de calidad: {e}")
+    return profile
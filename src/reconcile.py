@@ -0,0 +1,180 @@
+"""
+Reconciliación de is_active tras un rastreo completo.
+
+Las claves rastreadas (title, created_at, external_link) se cargan en una
+tabla temporal y, en la misma transacción, un único UPDATE con anti-join
+marca como inactivas las regulaciones de la entidad que ya no aparecen en
+el sitio (y reactiva las que volvieron a aparecer). Si el número de filas a
+desactivar supera RECONCILE_MAX_DEACTIVATE_PCT de las activas, se asume un
+rastreo parcial y no se cambia nada.
+"""
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import psycopg2.extras
+
+import metrics
+
+logger = logging.getLogger("reconcile")
+
+RECONCILE_MAX_DEACTIVATE_PCT = float(os.getenv("RECONCILE_MAX_DEACTIVATE_PCT", "10"))
+
+CREATE_KEYS_TABLE = """
+    CREATE TEMP TABLE crawled_keys (
+        title VARCHAR(255),
+        created_at VARCHAR(100),
+        external_link TEXT
+    ) ON COMMIT DROP
+"""
+
+MISSING_CONDITION = """
+    r.entity = %s
+    AND NOT EXISTS (
+        SELECT 1 FROM crawled_keys k
+        WHERE k.title = r.title
+          AND k.created_at = r.created_at
+          AND k.external_link = COALESCE(r.external_link, '')
+    )
+"""
+
+PRESENT_CONDITION = """
+    r.entity = %s
+    AND EXISTS (
+        SELECT 1 FROM crawled_keys k
+        WHERE k.title = r.title
+          AND k.created_at = r.created_at
+          AND k.external_link = COALESCE(r.external_link, '')
+    )
+"""
+
+
+class ReconcileAborted(Exception):
+    """El rastreo parece parcial: se desactivarían demasiadas filas."""
+
+
+def reconcile_active(db_manager, entity: str, keys: Iterable[Tuple], max_deactivate_pct: Optional[float] = None,
+                     dry_run: bool = False) -> Dict[str, int]:
+    """
+    Reconcilia is_active de una entidad contra las claves rastreadas
+    (tuplas title, created_at, external_link). Retorna los conteos
+    {'crawled', 'active', 'deactivated', 'reactivated'}. Lanza
+    ReconcileAborted (sin cambios) si se supera el umbral de seguridad.
+    is_active forma parte del hash del modo upsert (write.MUTABLE_COLUMNS), así
+    que content_hash se recalcula en el mismo UPDATE.
+    """
+    from write import CONTENT_HASH_SQL_TEMPLATE
+
+    if not db_manager.connection or not db_manager.cursor:
+        raise Exception("Database not connected")
+    max_deactivate_pct = RECONCILE_MAX_DEACTIVATE_PCT if max_deactivate_pct is None else max_deactivate_pct
+    cursor = db_manager.cursor
+    counts = {'crawled': 0, 'active': 0, 'deactivated': 0, 'reactivated': 0}
+
+    normalized = (
+        (str(title).strip(), str(created_at), external_link or '')
+        for title, created_at, external_link in keys
+    )
+
+    with metrics.stage("reconcile") as stage_metrics:
+        t0 = time.perf_counter()
+        try:
+            cursor.execute(CREATE_KEYS_TABLE)
+            psycopg2.extras.execute_values(
+                cursor, "INSERT INTO crawled_keys (title, created_at, external_link) VALUES %s",
+                normalized, page_size=5000,
+            )
+            cursor.execute("SELECT count(*) FROM crawled_keys")
+            counts['crawled'] = cursor.fetchone()[0]
+            cursor.execute("ANALYZE crawled_keys")
+
+            cursor.execute("SELECT count(*) FROM regulations WHERE entity = %s AND is_active", (entity,))
+            counts['active'] = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT count(*) FROM regulations r WHERE r.is_active AND {MISSING_CONDITION}", (entity,)
+            )
+            missing = cursor.fetchone()[0]
+
+            limit = counts['active'] * max_deactivate_pct / 100
+            if counts['crawled'] == 0 or missing > limit:
+                raise ReconcileAborted(
+                    f"Entity {entity}: se desactivarían {missing} de {counts['active']} filas activas "
+                    f"(máximo {max_deactivate_pct}%) con {counts['crawled']} claves rastreadas; "
+                    f"¿rastreo parcial?"
+                )
+
+            if dry_run:
+                counts['deactivated'] = missing
+            else:
+                cursor.execute(
+                    f"UPDATE regulations r SET is_active = FALSE, update_at = NOW(), "
+                    f"content_hash = {CONTENT_HASH_SQL_TEMPLATE.format(is_active='FALSE')} "
+                    f"WHERE r.is_active AND {MISSING_CONDITION}", (entity,)
+                )
+                counts['deactivated'] = cursor.rowcount
+                cursor.execute(
+                    f"UPDATE regulations r SET is_active = TRUE, update_at = NOW(), "
+                    f"content_hash = {CONTENT_HASH_SQL_TEMPLATE.format(is_active='TRUE')} "
+                    f"WHERE NOT r.is_active AND {PRESENT_CONDITION}", (entity,)
+                )
+                counts['reactivated'] = cursor.rowcount
+
+            if dry_run:
+                db_manager.connection.rollback()
+            else:
+                db_manager.connection.commit()
+        except Exception:
+            db_manager.connection.rollback()
+            raise
+        finally:
+            metrics.record_db(time.perf_counter() - t0, statements=7)
+
+        stage_metrics.rows_in += counts['crawled']
+        stage_metrics.rows_out += counts['deactivated'] + counts['reactivated']
+
+    logger.info(
+        f"Reconciliación {entity}{' (dry-run)' if dry_run else ''}: {counts['crawled']} rastreadas | "
+        f"{counts['active']} activas | {counts['deactivated']} desactivadas | {counts['reactivated']} reactivadas"
+    )
+    return counts
+
+
+def keys_by_entity(regulations: List[Dict]) -> Dict[str, List[Tuple]]:
+    """Agrupa las claves (title, created_at, external_link) de una lista de dicts por entidad."""
+    grouped = defaultdict(list)
+    for row in regulations:
+        grouped[row.get('entity')].append((row.get('title'), row.get('created_at'), row.get('external_link')))
+    return grouped
+
+
+def reconcile(regulations, max_deactivate_pct: Optional[float] = None, dry_run: bool = False) -> Dict[str, Dict]:
+    """
+    Reconcilia cada entidad presente en las regulaciones rastreadas (lista de
+    dicts o RegulationBatch). Una entidad abortada no impide las demás.
+    """
+    from write import DatabaseManager
+
+    if hasattr(regulations, 'records'):
+        grouped = {regulations.entity: [(r.title, r.created_at, r.external_link) for r in regulations]}
+    else:
+        grouped = keys_by_entity(regulations)
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise Exception("Fallo al conectar con la base de datos")
+
+    results = {}
+    try:
+        for entity, keys in grouped.items():
+            if not entity:
+                continue
+            try:
+                results[entity] = reconcile_active(db_manager, entity, keys, max_deactivate_pct, dry_run)
+            except ReconcileAborted as e:
+                logger.error(f"Reconciliación abortada: {e}")
+                results[entity] = {'aborted': str(e)}
+    finally:
+        db_manager.close()
+    return results
@@ -0,0 +1,117 @@
+"""
+Tipo de registro compacto para regulaciones.
+
+Cada fila guarda solo los campos que varían (RegulationRecord usa
+__slots__, sin __dict__ por instancia). Los valores iguales en toda la
+corrida (entity, is_active, classification_id, update_at) se guardan una
+sola vez en RegulationBatch, que se convierte a DataFrame columna por
+columna sin pasar por dicts.
+"""
+from typing import List, Dict, Iterable, Optional
+
+# Orden de columnas de la tabla regulations (igual que los dicts de extraction)
+COLUMNS = [
+    'created_at', 'update_at', 'is_active', 'title', 'gtype', 'entity',
+    'external_link', 'rtype_id', 'summary', 'classification_id',
+]
+RECORD_FIELDS = ('title', 'created_at', 'external_link', 'gtype', 'summary', 'rtype_id')
+BATCH_CONSTANTS = ('entity', 'is_active', 'classification_id', 'update_at')
+
+
+class RegulationRecord:
+    """Campos propios de una regulación."""
+    __slots__ = RECORD_FIELDS
+
+    def __init__(self, title, created_at, external_link=None, gtype=None, summary=None, rtype_id=None):
+        self.title = title
+        self.created_at = created_at
+        self.external_link = external_link
+        self.gtype = gtype
+        self.summary = summary
+        self.rtype_id = rtype_id
+
+    def __repr__(self):
+        return f"RegulationRecord(title={self.title!r}, created_at={self.created_at!r})"
+
+
+class RegulationBatch:
+    """Lista de RegulationRecord más los valores constantes de la corrida."""
+    __slots__ = BATCH_CONSTANTS + ('records',)
+
+    def __init__(self, entity, classification_id, update_at, is_active=True,
+                 records: Optional[List[RegulationRecord]] = None):
+        self.entity = entity
+        self.classification_id = classification_id
+        self.update_at = update_at
+        self.is_active = is_active
+        self.records = records if records is not None else []
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def append(self, record: RegulationRecord):
+        self.records.append(record)
+
+    def value(self, record: RegulationRecord, field: str):
+        """Valor de un campo, sea propio del registro o constante del lote."""
+        if field in RECORD_FIELDS:
+            return getattr(record, field)
+        if field in BATCH_CONSTANTS:
+            return getattr(self, field)
+        return None
+
+    def column(self, field: str) -> List:
+        return [getattr(record, field) for record in self.records]
+
+    def to_dicts(self) -> List[Dict]:
+        """Convierte a la lista de dicts que usan XCom, validation y lambda.py."""
+        return [{col: self.value(record, col) for col in COLUMNS} for record in self.records]
+
+    def to_dataframe(self):
+        """DataFrame con las columnas de regulations, construido columna por columna."""
+        import pandas as pd
+
+        n = len(self.records)
+        data = {}
+        for col in COLUMNS:
+            if col in RECORD_FIELDS:
+                data[col] = self.column(col)
+            else:
+                data[col] = [getattr(self, col)] * n
+        return pd.DataFrame(data, columns=COLUMNS)
+
+    @classmethod
+    def from_dicts(cls, rows: List[Dict], update_at=None) -> "RegulationBatch":
+        """Construye un lote desde dicts (los constantes se toman de la primera fila)."""
+        first = rows[0] if rows else {}
+        batch = cls(
+            entity=first.get('entity'),
+            classification_id=first.get('classification_id'),
+            update_at=update_at or first.get('update_at'),
+            is_active=first.get('is_active', True),
+        )
+        for row in rows:
+            batch.append(RegulationRecord(*(row.get(field) for field in RECORD_FIELDS)))
+        return batch
+
+    @classmethod
+    def concat(cls, batches: Iterable["RegulationBatch"]) -> "RegulationBatch":
+        """Une lotes de la misma entidad; update_at queda con el más reciente."""
+        batches = [b for b in batches if b is not None]
+        if not batches:
+            raise ValueError("No hay lotes para unir")
+        # Los lotes vacíos (p. ej. from_dicts([])) no aportan constantes
+        batches = [b for b in batches if len(b)] or batches[:1]
+        first = batches[0]
+        merged = cls(first.entity, first.classification_id, first.update_at, first.is_active)
+        for batch in batches:
+            if (batch.entity, batch.classification_id, batch.is_active) != \
+                    (first.entity, first.classification_id, first.is_active):
+                raise ValueError("Los lotes tienen valores constantes distintos")
+            if batch.update_at and (not merged.update_at or str(batch.update_at) > str(merged.update_at)):
+                merged.update_at = batch.update_at
+            merged.records.extend(batch.records)
+        return merged
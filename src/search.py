@@ -0,0 +1,165 @@
+"""
+Búsqueda de regulaciones por palabras clave y fechas.
+
+Usa la columna generada regulations.search_vector (tsvector en español,
+título con peso A y resumen con peso B) y su índice GIN, en lugar de ILIKE
+sobre title/summary. La paginación es por conjunto de claves (keyset): el
+cursor lleva la última posición devuelta en lugar de un OFFSET.
+
+- Sin texto (orden created_at DESC, id DESC) el cursor se aplica sobre el
+  índice, así que una página profunda cuesta lo mismo que la primera. Las
+  filas sin created_at no tienen lugar en ese orden (y (NULL, id) < cursor
+  nunca es verdadero): se excluyen del listado por fecha, pero sí aparecen
+  en las búsquedas con texto.
+- Con texto (orden por relevancia) ts_rank_cd se calcula y ordena sobre todas
+  las coincidencias antes de aplicar el cursor: cada página cuesta lo que el
+  conjunto de coincidencias, se ahorra solo el OFFSET. Conviene acotar la
+  búsqueda con fechas, rtype_ids o entidad cuando el término es muy común.
+
+    python src/search.py "concesión vial" --date-from 2023-01-01 --limit 10
+"""
+import argparse
+import base64
+import json
+import logging
+from typing import List, Dict, Optional
+
+logger = logging.getLogger("search")
+
+SEARCH_CONFIG = "spanish"
+MAX_LIMIT = 200
+
+RESULT_COLUMNS = ['id', 'title', 'created_at', 'entity', 'external_link', 'rtype_id', 'summary', 'rank']
+
+
+def encode_cursor(values: List) -> str:
+    """Cursor opaco con la clave de ordenamiento de la última fila."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> List:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Cursor inválido: {e}")
+
+
+def build_search_query(query: Optional[str] = None, date_from: Optional[str] = None,
+                       date_to: Optional[str] = None, rtype_ids: Optional[List[int]] = None,
+                       entity: Optional[str] = None, limit: int = 20, after: Optional[str] = None):
+    """
+    Arma (sql, params). Con query se ordena por relevancia (rank DESC, id DESC);
+    sin query, por fecha (created_at DESC, id DESC). Se pide una fila de más
+    para saber si hay página siguiente.
+    """
+    conditions = []
+    params = []
+
+    if query:
+        rank_sql = f"ts_rank_cd(search_vector, websearch_to_tsquery('{SEARCH_CONFIG}', %s))"
+        params.append(query)
+        conditions.append(f"search_vector @@ websearch_to_tsquery('{SEARCH_CONFIG}', %s)")
+        params.append(query)
+    else:
+        rank_sql = "NULL::real"
+
+    # created_at se guarda como texto YYYY-MM-DD, que ordena igual que la fecha
+    if date_from:
+        conditions.append("created_at >= %s")
+        params.append(str(date_from))
+    if date_to:
+        conditions.append("created_at <= %s")
+        params.append(str(date_to))
+    if rtype_ids:
+        conditions.append("rtype_id = ANY(%s)")
+        params.append(list(rtype_ids))
+    if entity:
+        conditions.append("entity = %s")
+        params.append(entity)
+    if not query:
+        conditions.append("created_at IS NOT NULL")
+
+    where_sql = " AND ".join(conditions) or "TRUE"
+    inner_sql = f"""
+        SELECT id, title, created_at, entity, external_link, rtype_id, summary, {rank_sql} AS rank
+        FROM regulations
+        WHERE {where_sql}
+    """
+
+    outer_conditions = []
+    if after:
+        last = decode_cursor(after)
+        if query:
+            outer_conditions.append("(rank, id) < (%s::real, %s)")
+        else:
+            outer_conditions.append("(created_at, id) < (%s, %s)")
+        params.extend(last)
+
+    order_sql = "rank DESC, id DESC" if query else "created_at DESC, id DESC"
+    if query:
+        sql = f"""
+            SELECT {', '.join(RESULT_COLUMNS)} FROM ({inner_sql}) AS matches
+            {'WHERE ' + ' AND '.join(outer_conditions) if outer_conditions else ''}
+            ORDER BY {order_sql}
+            LIMIT %s
+        """
+    else:
+        # Sin rank la condición de keyset va directo sobre la tabla para usar
+        # el índice (created_at DESC, id DESC)
+        if outer_conditions:
+            inner_sql += " AND " + " AND ".join(outer_conditions)
+        sql = f"{inner_sql} ORDER BY {order_sql} LIMIT %s"
+    params.append(limit + 1)
+    return sql, params
+
+
+def search_regulations(db_manager, query: Optional[str] = None, date_from: Optional[str] = None,
+                       date_to: Optional[str] = None, rtype_ids: Optional[List[int]] = None,
+                       entity: Optional[str] = None, limit: int = 20,
+                       after: Optional[str] = None) -> Dict:
+    """
+    Busca regulaciones. query acepta la sintaxis de websearch_to_tsquery
+    ("frase exacta", OR, -excluir). Retorna {'results': [...], 'next_cursor'};
+    next_cursor es None en la última página y se pasa como after para seguir.
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    sql, params = build_search_query(query, date_from, date_to, rtype_ids, entity, limit, after)
+    rows = db_manager.execute_query(sql, params)
+
+    results = [dict(zip(RESULT_COLUMNS, row)) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit and results:
+        last = results[-1]
+        key = [last['rank'], last['id']] if query else [last['created_at'], last['id']]
+        next_cursor = encode_cursor(key)
+    if not query:
+        for result in results:
+            result.pop('rank')
+
+    logger.info(f"Búsqueda '{query or ''}': {len(results)} resultados.")
+    return {"results": results, "next_cursor": next_cursor}
+
+
+if __name__ == "__main__":
+    from write import DatabaseManager
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Búsqueda de texto completo sobre regulations")
+    parser.add_argument("query", nargs="?", default=None)
+    parser.add_argument("--date-from", default=None, help="YYYY-MM-DD")
+    parser.add_argument("--date-to", default=None, help="YYYY-MM-DD")
+    parser.add_argument("--rtype-id", type=int, action="append", dest="rtype_ids")
+    parser.add_argument("--entity", default=None)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--after", default=None, help="Cursor devuelto por la página anterior")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise SystemExit("Fallo al conectar con la base de datos")
+    try:
+        page = search_regulations(db_manager, args.query, args.date_from, args.date_to,
+                                  args.rtype_ids, args.entity, args.limit, args.after)
+    finally:
+        db_manager.close()
+    print(json.dumps(page, ensure_ascii=False, indent=2, default=str))
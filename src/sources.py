@@ -0,0 +1,231 @@
+"""
+Scraper multi-fuente configurado por archivo.
+
+Cada fuente (URL, selectores CSS, formatos de fecha, entidad, clasificación)
+se define en configs/sources.json y se compila una sola vez en un extractor
+de filas. Todas las páginas de todas las fuentes se descargan en una misma
+corrida, compartiendo un tope global de concurrencia y de peticiones por segundo.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional
+
+import requests
+import soupsieve
+from bs4 import BeautifulSoup
+
+import metrics
+from dates import format_date
+from extraction import clean_quotes, get_rtype_id, build_components
+
+logger = logging.getLogger("sources")
+
+SOURCES_PATH = os.getenv("SOURCES_FILE", "/opt/airflow/configs/sources.json")
+
+
+def load_sources(path: Optional[str] = None) -> List["CompiledSource"]:
+    """Carga y compila las definiciones de fuentes."""
+    try:
+        with open(path or SOURCES_PATH, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except Exception as e:
+        logger.error(f"Error cargando fuentes: {e}")
+        raise
+    return [CompiledSource(definition) for definition in config.get("sources", [])]
+
+
+class CompiledSource:
+    """Definición de una fuente con sus selectores ya compilados."""
+
+    def __init__(self, definition: Dict):
+        self.name = definition["name"]
+        self.entity = definition["entity"]
+        self.classification_id = definition.get("classification_id")
+        self.url_template = definition["url_template"]
+        self.first_page_url = definition.get("first_page_url")
+        self.link_prefix = definition.get("link_prefix", "")
+        self.pages = int(definition.get("pages", 1))
+        self.max_title_length = definition.get("max_title_length")
+        self.date_attribute = definition.get("date_attribute")
+        self.date_formats = definition.get("date_formats", ["%Y-%m-%d"])
+
+        selectors = definition["selectors"]
+        self._row = soupsieve.compile(selectors["row"])
+        self._title = soupsieve.compile(selectors["title"])
+        self._summary = soupsieve.compile(selectors["summary"]) if selectors.get("summary") else None
+        self._date = soupsieve.compile(selectors["date"]) if selectors.get("date") else None
+        self._date_cell = soupsieve.compile(selectors["date_cell"]) if selectors.get("date_cell") else None
+
+    def page_url(self, page_num: int) -> str:
+        if page_num == 0 and self.first_page_url:
+            return self.first_page_url
+        return self.url_template.format(page=page_num)
+
+    def parse_date(self, raw: Optional[str]) -> Optional[str]:
+        """Convierte la fecha al formato YYYY-MM-DD probando los formatos de la fuente."""
+        if not raw:
+            return None
+        raw = raw.strip()
+        for fmt in self.date_formats:
+            try:
+                return datetime.strptime(raw, fmt).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+        # Formatos comunes no declarados en la fuente (p. ej. mes en español); si
+        # tampoco se reconoce se conserva el valor crudo y la validación descartará la fila
+        return format_date(raw) or raw
+
+    def parse(self, content, update_at: Optional[str] = None) -> List[Dict]:
+        """Extrae las filas válidas de una página de esta fuente."""
+        soup = BeautifulSoup(content, 'html.parser')
+        update_at = update_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = []
+
+        for row in self._row.select(soup):
+            title_link = self._title.select_one(row)
+            if not title_link:
+                continue
+            title = clean_quotes(title_link.get_text(strip=True))
+            if not title or (self.max_title_length and len(title) > self.max_title_length):
+                continue
+
+            external_link = title_link.get('href')
+            if external_link and not external_link.startswith('http'):
+                external_link = self.link_prefix + external_link
+
+            summary = None
+            if self._summary:
+                summary_cell = self._summary.select_one(row)
+                if summary_cell:
+                    summary = clean_quotes(summary_cell.get_text(strip=True)).capitalize()
+
+            created_at = None
+            date_tag = self._date.select_one(row) if self._date else None
+            if date_tag:
+                raw = date_tag.get(self.date_attribute) if self.date_attribute else None
+                created_at = self.parse_date(raw or date_tag.get_text(strip=True))
+            elif self._date_cell:
+                date_cell = self._date_cell.select_one(row)
+                if date_cell:
+                    created_at = self.parse_date(date_cell.get_text(strip=True))
+            if not created_at:
+                continue
+
+            rows.append({
+                'created_at': created_at,
+                'update_at': update_at,
+                'is_active': True,
+                'title': title,
+                'gtype': 'link' if external_link else None,
+                'entity': self.entity,
+                'external_link': external_link,
+                'rtype_id': get_rtype_id(title, summary),
+                'summary': summary,
+                'classification_id': self.classification_id,
+            })
+        return rows
+
+
+class RateLimiter:
+    """Token bucket compartido entre hilos (peticiones por segundo)."""
+
+    def __init__(self, rate_per_sec: float, burst: Optional[int] = None):
+        self.rate = rate_per_sec
+        self.capacity = burst or max(1, int(rate_per_sec))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def crawl_sources(
+    sources: List[CompiledSource],
+    max_concurrency: int = 8,
+    rate_per_sec: float = 5.0,
+    pages: Optional[int] = None,
+) -> Dict[str, List[Dict]]:
+    """
+    Descarga todas las páginas de todas las fuentes bajo un mismo presupuesto
+    de concurrencia y tasa. Las páginas se intercalan entre fuentes para que
+    ninguna acapare el presupuesto. Retorna {'regulations', 'components',
+    'failed_pages'}: una página con error se registra y se omite, así que con
+    failed_pages > 0 el resultado es parcial (no sirve para reconciliar).
+    """
+    limiter = RateLimiter(rate_per_sec)
+    # requests.Session no es thread-safe: una sesión por hilo del pool
+    local = threading.local()
+    sessions = []
+
+    def thread_session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+            sessions.append(local.session)
+        return local.session
+    update_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    max_pages = max((pages or s.pages) for s in sources) if sources else 0
+    jobs = [
+        (source, page_num)
+        for page_num in range(max_pages)
+        for source in sources
+        if page_num < (pages or source.pages)
+    ]
+
+    def fetch(job):
+        source, page_num = job
+        limiter.acquire()
+        try:
+            t0 = time.perf_counter()
+            response = thread_session().get(source.page_url(page_num), timeout=15)
+            metrics.record_http(len(response.content), time.perf_counter() - t0)
+            response.raise_for_status()
+            rows = source.parse(response.content, update_at)
+            logger.info(f"[{source.name}] Página {page_num}: {len(rows)} filas extraídas.")
+            return rows
+        except Exception as e:
+            logger.error(f"[{source.name}] Error en página {page_num}: {e}")
+            return None
+
+    with metrics.stage("extract") as stage_metrics:
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+                results = list(executor.map(metrics.bind(fetch), jobs))
+        finally:
+            for session in sessions:
+                session.close()
+
+        # Orden estable: por fuente y luego por página
+        by_source = {source.name: [] for source in sources}
+        failed_pages = 0
+        for (source, _), rows in zip(jobs, results):
+            if rows is None:
+                failed_pages += 1
+                continue
+            by_source[source.name].extend(rows)
+        regulations = [row for source in sources for row in by_source[source.name]]
+        stage_metrics.rows_out += len(regulations)
+
+    logger.info(
+        f"Total extraído de {len(sources)} fuentes: {len(regulations)} regulaciones "
+        f"({failed_pages} páginas con error)."
+    )
+    return {"regulations": regulations, "components": build_components(regulations),
+            "failed_pages": failed_pages}
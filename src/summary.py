@@ -0,0 +1,201 @@
+"""
+Tablas de resumen para los tableros.
+
+- regulation_stats_yearly: regulaciones por entidad × año (de created_at) × rtype_id.
+- regulation_stats_entity: total y created_at más reciente por entidad.
+
+write.py las actualiza con los deltas de cada lote, en la misma transacción
+que el INSERT/UPDATE de regulations (si la transacción se revierte, el resumen
+también). async_pipeline.py aplica los mismos deltas con asyncpg
+(apply_insert_deltas_async) y lambda.py con apply_insert_deltas cuando tiene
+src/ disponible; la Lambda de un solo archivo avisa que hay que reconstruir.
+Ante cualquier duda se reconstruyen con:
+
+    python src/summary.py --rebuild
+"""
+import argparse
+import logging
+import time
+from collections import Counter
+from typing import Iterable, Tuple
+
+import psycopg2.extras
+
+import metrics
+
+logger = logging.getLogger("summary")
+
+UPSERT_YEARLY = """
+    INSERT INTO regulation_stats_yearly (entity, year, rtype_id, regulation_count)
+    VALUES %s
+    ON CONFLICT (entity, year, rtype_id) DO UPDATE
+    SET regulation_count = regulation_stats_yearly.regulation_count + EXCLUDED.regulation_count
+"""
+
+UPSERT_ENTITY = """
+    INSERT INTO regulation_stats_entity (entity, regulation_count, latest_created_at, updated_at)
+    VALUES %s
+    ON CONFLICT (entity) DO UPDATE
+    SET regulation_count = regulation_stats_entity.regulation_count + EXCLUDED.regulation_count,
+        latest_created_at = GREATEST(regulation_stats_entity.latest_created_at, EXCLUDED.latest_created_at),
+        updated_at = EXCLUDED.updated_at
+"""
+
+# Variantes para asyncpg (async_pipeline.py): un lote por arreglo con unnest
+UPSERT_YEARLY_ASYNC = """
+    INSERT INTO regulation_stats_yearly (entity, year, rtype_id, regulation_count)
+    SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::int[], $4::bigint[])
+    ON CONFLICT (entity, year, rtype_id) DO UPDATE
+    SET regulation_count = regulation_stats_yearly.regulation_count + EXCLUDED.regulation_count
+"""
+
+UPSERT_ENTITY_ASYNC = """
+    INSERT INTO regulation_stats_entity (entity, regulation_count, latest_created_at, updated_at)
+    SELECT entity, regulation_count, latest_created_at, NOW()
+    FROM unnest($1::varchar[], $2::bigint[], $3::varchar[]) AS t(entity, regulation_count, latest_created_at)
+    ON CONFLICT (entity) DO UPDATE
+    SET regulation_count = regulation_stats_entity.regulation_count + EXCLUDED.regulation_count,
+        latest_created_at = GREATEST(regulation_stats_entity.latest_created_at, EXCLUDED.latest_created_at),
+        updated_at = EXCLUDED.updated_at
+"""
+
+REBUILD_STATEMENTS = [
+    "TRUNCATE regulation_stats_yearly, regulation_stats_entity",
+    """
+    INSERT INTO regulation_stats_yearly (entity, year, rtype_id, regulation_count)
+    SELECT entity, LEFT(created_at, 4), COALESCE(rtype_id, 0), count(*)
+    FROM regulations
+    WHERE entity IS NOT NULL AND created_at IS NOT NULL
+    GROUP BY entity, LEFT(created_at, 4), COALESCE(rtype_id, 0)
+    """,
+    """
+    INSERT INTO regulation_stats_entity (entity, regulation_count, latest_created_at, updated_at)
+    SELECT entity, count(*), max(created_at), NOW()
+    FROM regulations
+    WHERE entity IS NOT NULL
+    GROUP BY entity
+    """,
+]
+
+
+def _year(created_at) -> str:
+    return str(created_at)[:4]
+
+
+def _rtype(rtype_id) -> int:
+    # NaN/None -> 0 (las claves del resumen no admiten NULL)
+    try:
+        return int(rtype_id)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _apply(cursor, yearly: Counter, entities: dict):
+    yearly_rows = [(entity, year, rtype_id, delta)
+                   for (entity, year, rtype_id), delta in yearly.items() if delta]
+    if yearly_rows:
+        psycopg2.extras.execute_values(cursor, UPSERT_YEARLY, yearly_rows)
+    entity_rows = [(entity, delta, latest, time.strftime('%Y-%m-%d %H:%M:%S'))
+                   for entity, (delta, latest) in entities.items()]
+    if entity_rows:
+        psycopg2.extras.execute_values(cursor, UPSERT_ENTITY, entity_rows,
+                                       template="(%s, %s, %s, %s::timestamp)")
+
+
+def _insert_deltas(rows: Iterable[Tuple]):
+    """Agrupa filas insertadas (entity, created_at, rtype_id) en deltas por año y por entidad."""
+    yearly = Counter()
+    entities = {}
+    for entity, created_at, rtype_id in rows:
+        if entity is None or created_at is None:
+            continue
+        yearly[(entity, _year(created_at), _rtype(rtype_id))] += 1
+        count, latest = entities.get(entity, (0, None))
+        created_at = str(created_at)
+        entities[entity] = (count + 1, created_at if latest is None or created_at > latest else latest)
+    return yearly, entities
+
+
+def apply_insert_deltas(db_manager, rows: Iterable[Tuple]):
+    """
+    Suma al resumen las filas insertadas (tuplas entity, created_at, rtype_id).
+    No hace commit: debe llamarse dentro de la transacción del INSERT.
+    """
+    yearly, entities = _insert_deltas(rows)
+
+    t0 = time.perf_counter()
+    _apply(db_manager.cursor, yearly, entities)
+    metrics.record_db(time.perf_counter() - t0, statements=2)
+
+
+async def apply_insert_deltas_async(conn, rows: Iterable[Tuple]):
+    """
+    Igual que apply_insert_deltas sobre una conexión asyncpg. Debe llamarse
+    dentro de conn.transaction() del INSERT.
+    """
+    yearly, entities = _insert_deltas(rows)
+    t0 = time.perf_counter()
+    if yearly:
+        keys = list(yearly)
+        await conn.execute(
+            UPSERT_YEARLY_ASYNC,
+            [k[0] for k in keys], [k[1] for k in keys], [k[2] for k in keys], [yearly[k] for k in keys],
+        )
+    if entities:
+        names = list(entities)
+        await conn.execute(
+            UPSERT_ENTITY_ASYNC,
+            names, [entities[e][0] for e in names], [entities[e][1] for e in names],
+        )
+    metrics.record_db(time.perf_counter() - t0, statements=2)
+
+
+def apply_update_deltas(db_manager, rows: Iterable[Tuple]):
+    """
+    Mueve en el resumen las filas actualizadas cuyo rtype_id cambió
+    (tuplas entity, created_at, rtype_id anterior, rtype_id nuevo). Sin commit.
+    """
+    yearly = Counter()
+    for entity, created_at, old_rtype_id, new_rtype_id in rows:
+        if entity is None or created_at is None or _rtype(old_rtype_id) == _rtype(new_rtype_id):
+            continue
+        yearly[(entity, _year(created_at), _rtype(old_rtype_id))] -= 1
+        yearly[(entity, _year(created_at), _rtype(new_rtype_id))] += 1
+
+    if yearly:
+        t0 = time.perf_counter()
+        _apply(db_manager.cursor, yearly, {})
+        metrics.record_db(time.perf_counter() - t0)
+
+
+def rebuild_summaries(db_manager):
+    """Recalcula ambas tablas desde regulations en una sola transacción."""
+    t0 = time.perf_counter()
+    try:
+        for statement in REBUILD_STATEMENTS:
+            db_manager.cursor.execute(statement)
+        db_manager.connection.commit()
+    except Exception:
+        db_manager.connection.rollback()
+        raise
+    metrics.record_db(time.perf_counter() - t0, statements=len(REBUILD_STATEMENTS))
+    logger.info(f"Tablas de resumen reconstruidas en {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    from write import DatabaseManager
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Tablas de resumen de regulations")
+    parser.add_argument("--rebuild", action="store_true", help="Recalcula los resúmenes desde regulations")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("indique --rebuild")
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise SystemExit("Fallo al conectar con la base de datos")
+    try:
+        rebuild_summaries(db_manager)
+    finally:
+        db_manager.close()
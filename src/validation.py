@@ -2,7 +2,9 @@ import json
 import logging
 import os
 import re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
+
+import metrics
 
 logger = logging.getLogger("validation")
 
@@ -38,30 +40,85 @@ def validate_field(value, rules):
     return True
 
 
-def validate_regulations(data: List[Dict]) -> List[Dict]:
-    """Valida las regulaciones según las reglas definidas."""
-    rules = load_rules()
+def validate_regulations(data: List[Dict], rules: Optional[Dict] = None) -> List[Dict]:
+    """
+    Valida las regulaciones según las reglas definidas.
+    Si no se reciben reglas ya cargadas, se leen desde RULES_PATH.
+    """
+    if rules is None:
+        rules = load_rules()
     valid_rows = []
     discarded = 0
 
-    for row in data:
-        valid = True
-        for field, cfg in rules.get("fields", {}).items():
-            val = row.get(field)
-            if not validate_field(val, cfg):
-                if cfg.get("required", False):
-                    valid = False
-                    break
-                row[field] = None
-        if valid:
-            valid_rows.append(row)
-        else:
-            discarded += 1
+    with metrics.stage("validate") as stage_metrics:
+        for row in data:
+            valid = True
+            for field, cfg in rules.get("fields", {}).items():
+                val = row.get(field)
+                if not validate_field(val, cfg):
+                    if cfg.get("required", False):
+                        valid = False
+                        break
+                    row[field] = None
+            if valid:
+                valid_rows.append(row)
+            else:
+                discarded += 1
+
+        stage_metrics.rows_in += len(data)
+        stage_metrics.rows_out += len(valid_rows)
 
     logger.info(f"Validación completada: {len(valid_rows)} válidas, {discarded} descartadas.")
     return valid_rows
 
 
+def validate_batch(batch, rules: Optional[Dict] = None):
+    """
+    Valida un RegulationBatch (ver records.py) sin convertirlo a dicts.
+    Los campos constantes del lote (p. ej. entity) se validan una sola vez.
+    Retorna un nuevo lote solo con los registros válidos.
+    """
+    from records import RegulationBatch, RECORD_FIELDS, BATCH_CONSTANTS
+
+    if rules is None:
+        rules = load_rules()
+    fields = rules.get("fields", {})
+
+    with metrics.stage("validate") as stage_metrics:
+        valid_batch = RegulationBatch(batch.entity, batch.classification_id, batch.update_at, batch.is_active)
+
+        # Campos constantes: si uno requerido es inválido, se descarta todo el lote
+        constants_valid = True
+        for field, cfg in fields.items():
+            if field in RECORD_FIELDS:
+                continue
+            if not validate_field(batch.value(None, field), cfg):
+                if cfg.get("required", False):
+                    constants_valid = False
+                elif field in BATCH_CONSTANTS:
+                    setattr(valid_batch, field, None)
+
+        record_rules = [(field, cfg) for field, cfg in fields.items() if field in RECORD_FIELDS]
+        if constants_valid:
+            for record in batch.records:
+                valid = True
+                for field, cfg in record_rules:
+                    if not validate_field(getattr(record, field), cfg):
+                        if cfg.get("required", False):
+                            valid = False
+                            break
+                        setattr(record, field, None)
+                if valid:
+                    valid_batch.append(record)
+
+        stage_metrics.rows_in += len(batch)
+        stage_metrics.rows_out += len(valid_batch)
+
+    discarded = len(batch) - len(valid_batch)
+    logger.info(f"Validación completada: {len(valid_batch)} válidas, {discarded} descartadas.")
+    return valid_batch
+
+
 def validate(regulations: List[Dict], components: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
     """
     Valida las regulaciones y retorna ambas listas (regulations y components)
@@ -1,15 +1,42 @@
 import os
+import hashlib
 import psycopg2
+import psycopg2.extras
 import logging
+import time
+import uuid
 import pandas as pd
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Any, Iterator, Optional
 from datetime import datetime
 
+import metrics
+from summary import apply_insert_deltas, apply_update_deltas
+
 logger = logging.getLogger("write")
 
 # Constante de la Lambda original
 ENTITY_VALUE = 'Agencia Nacional de Infraestructura'
 
+# Modo de escritura: 'insert' (solo nuevos, comportamiento original) o 'upsert' (CDC)
+WRITE_MODE = os.getenv("WRITE_MODE", "insert")
+
+# Columnas que pueden cambiar en la ANI sin cambiar la clave (title, created_at, external_link)
+KEY_COLUMNS = ['title', 'created_at', 'external_link']
+MUTABLE_COLUMNS = ['summary', 'rtype_id', 'gtype', 'classification_id', 'is_active']
+# Mismo md5 que compute_content_hash calculado en SQL ({is_active}: expresión del valor booleano)
+CONTENT_HASH_SQL_TEMPLATE = (
+    "md5(COALESCE(summary, '') || '|' || COALESCE(rtype_id::text, '') || '|' || COALESCE(gtype, '') "
+    "|| '|' || COALESCE(classification_id::text, '') || '|' || "
+    "CASE WHEN {is_active} THEN 'True' WHEN NOT {is_active} THEN 'False' ELSE '' END)"
+)
+CONTENT_HASH_SQL = CONTENT_HASH_SQL_TEMPLATE.format(is_active='is_active')
+
+# Casi duplicados (src/dedup.py): 'off', 'report' (solo registra) o 'skip' (no los inserta)
+NEAR_DUP_MODE = os.getenv("NEAR_DUP_MODE", "off")
+
+# Filas por viaje al servidor en las lecturas con cursor del lado del servidor
+DB_FETCH_SIZE = int(os.getenv("DB_FETCH_SIZE", "10000"))
+
 # --- CLASE DATABASEMANAGER (Refactorizada) ---
 # Esta clase está basada en la de lambda.py, pero modificada
 # para usar variables de entorno en lugar de AWS Secrets Manager.
@@ -51,11 +78,47 @@ class DatabaseManager:
         # Lógica de lambda.py
         if not self.cursor:
             raise Exception("Database not connected")
+        t0 = time.perf_counter()
         self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+        rows = self.cursor.fetchall()
+        metrics.record_db(time.perf_counter() - t0)
+        return rows
 
-    def bulk_insert(self, df, table_name):
-        # Lógica de lambda.py
+    def iter_query_batches(self, query, params=None, fetch_size: Optional[int] = None) -> Iterator[List[tuple]]:
+        """
+        Ejecuta la consulta con un cursor con nombre (del lado del servidor) y
+        entrega las filas en lotes de fetch_size, sin traer todo el resultado a memoria.
+        """
+        if not self.connection:
+            raise Exception("Database not connected")
+        fetch_size = fetch_size or DB_FETCH_SIZE
+        cursor = self.connection.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cursor.itersize = fetch_size
+        db_seconds = 0.0
+        fetches = 0
+        try:
+            t0 = time.perf_counter()
+            cursor.execute(query, params)
+            db_seconds += time.perf_counter() - t0
+            while True:
+                t0 = time.perf_counter()
+                rows = cursor.fetchmany(fetch_size)
+                db_seconds += time.perf_counter() - t0
+                fetches += 1
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+            metrics.record_db(db_seconds, statements=fetches)
+
+    def iter_query(self, query, params=None, fetch_size: Optional[int] = None) -> Iterator[tuple]:
+        """Como execute_query, pero itera fila por fila sobre un cursor del lado del servidor."""
+        for rows in self.iter_query_batches(query, params, fetch_size):
+            yield from rows
+
+    def bulk_insert(self, df, table_name, commit=True):
+        # Lógica de lambda.py (con commit=False el llamador cierra la transacción)
         if not self.connection or not self.cursor:
             raise Exception("Database not connected")
         
@@ -67,13 +130,40 @@ class DatabaseManager:
             insert_query = f"INSERT INTO {table_name} ({columns_for_sql}) VALUES ({placeholders})"
             records_to_insert = [tuple(x) for x in df.values]
             
+            t0 = time.perf_counter()
             self.cursor.executemany(insert_query, records_to_insert)
-            self.connection.commit()
+            if commit:
+                self.connection.commit()
+            metrics.record_db(time.perf_counter() - t0, statements=len(records_to_insert))
             return len(df)
         except Exception as e:
             self.connection.rollback()
             raise Exception(f"Error inserting into {table_name}: {str(e)}")
 
+    def bulk_update(self, query, records, template=None, fetch=False, commit=True):
+        """
+        Ejecuta un UPDATE ... FROM (VALUES %s) con todas las filas en una sola sentencia.
+        Con fetch=True retorna las filas del RETURNING en lugar del conteo.
+        """
+        if not self.connection or not self.cursor:
+            raise Exception("Database not connected")
+        if not records:
+            return 0
+
+        try:
+            t0 = time.perf_counter()
+            returned = psycopg2.extras.execute_values(
+                self.cursor, query, records, template=template, page_size=len(records), fetch=fetch
+            )
+            updated = self.cursor.rowcount
+            if commit:
+                self.connection.commit()
+            metrics.record_db(time.perf_counter() - t0)
+            return returned if fetch else updated
+        except Exception as e:
+            self.connection.rollback()
+            raise Exception(f"Error in bulk update: {str(e)}")
+
 # --- LÓGICA DE IDEMPOTENCIA (Copiada de lambda.py) ---
 # Estas son las funciones originales que cumplen el requisito R8.
 
@@ -96,32 +186,152 @@ def insert_regulations_component(db_manager, new_ids):
     except Exception as e:
         return 0, f"Error inserting regulation components: {str(e)}"
 
+def _entity_list(entity) -> List[str]:
+    """Una entidad o una lista de entidades -> lista."""
+    return list(entity) if isinstance(entity, (list, tuple)) else [entity]
+
+def _insert_returning(db_manager, new_records, on_conflict=""):
+    """
+    INSERT de todas las filas en una sentencia con RETURNING (id, entity,
+    created_at, rtype_id). Sin commit: el llamador cierra la transacción.
+    """
+    # Con el hash desde el INSERT, el primer upsert no reescribe las filas recién insertadas
+    if 'content_hash' not in new_records.columns:
+        new_records = new_records.assign(content_hash=compute_content_hash(new_records))
+
+    df = new_records.astype(object).where(pd.notnull(new_records), None)
+    columns_for_sql = ", ".join([f'"{col}"' for col in df.columns])
+    insert_query = f"""
+        INSERT INTO regulations ({columns_for_sql}) VALUES %s
+        {on_conflict}
+        RETURNING id, entity, created_at, rtype_id
+    """
+    t0 = time.perf_counter()
+    returned = psycopg2.extras.execute_values(
+        db_manager.cursor, insert_query, [tuple(x) for x in df.values], page_size=1000, fetch=True
+    )
+    metrics.record_db(time.perf_counter() - t0, statements=(len(df) + 999) // 1000)
+    return returned
+
+def insert_records_with_components(db_manager, new_records, entity):
+    """
+    Inserta registros ya deduplicados (de una o varias entidades) y sus componentes.
+    Retorna (insertados, mensaje).
+    """
+    if not db_manager.connection or not db_manager.cursor:
+        raise Exception("Database not connected")
+    label = ", ".join(_entity_list(entity))
+
+    try:
+        # El resumen (summary.py) se actualiza en la misma transacción que el INSERT
+        returned = _insert_returning(db_manager, new_records)
+        if not returned:
+            db_manager.connection.rollback()
+            return 0, f"No records were actually inserted for entity {label}"
+        apply_insert_deltas(db_manager, [(row[1], row[2], row[3]) for row in returned])
+        db_manager.connection.commit()
+    except Exception as insert_error:
+        db_manager.connection.rollback()
+        logger.error(f"Error en inserción: {insert_error}")
+        if "duplicate" in str(insert_error).lower() or "unique" in str(insert_error).lower():
+            return 0, f"Some records for entity {label} were duplicates and skipped"
+        else:
+            raise insert_error
+
+    # Los IDs vienen del RETURNING (antes: los N últimos ids de la entidad)
+    new_ids = [row[0] for row in returned]
+    _, component_message = insert_regulations_component(db_manager, new_ids)
+    return len(new_ids), component_message
+
+def insert_records_skip_conflicts(db_manager, new_records, entity):
+    """
+    Como insert_records_with_components, pero las filas que otro escritor ya
+    insertó se omiten (ON CONFLICT ... DO NOTHING) en lugar de revertir todo el
+    lote. Los componentes y el resumen se aplican solo a las filas insertadas.
+    Retorna (insertados, mensaje).
+    """
+    if not db_manager.connection or not db_manager.cursor:
+        raise Exception("Database not connected")
+
+    try:
+        returned = _insert_returning(
+            db_manager, new_records, on_conflict="ON CONFLICT ON CONSTRAINT unique_regulation DO NOTHING"
+        )
+        apply_insert_deltas(db_manager, [(row[1], row[2], row[3]) for row in returned])
+        db_manager.connection.commit()
+    except Exception:
+        db_manager.connection.rollback()
+        raise
+
+    new_ids = [row[0] for row in returned]
+    _, component_message = insert_regulations_component(db_manager, new_ids)
+    skipped = len(new_records) - len(new_ids)
+    return len(new_ids), (
+        f"Entity {', '.join(_entity_list(entity))}: New inserted: {len(new_ids)} | "
+        f"Already present (conflict): {skipped}. {component_message}"
+    )
+
+def handle_near_duplicates(db_manager, new_records, entity, mode=None):
+    """
+    Busca casi duplicados de new_records contra la BD (en streaming, las
+    filas de la entidad o lista de entidades) y dentro del propio lote. Los
+    registra en el log y, en modo 'skip', los descarta.
+    Retorna (new_records, cantidad de casi duplicados).
+    """
+    from dedup import find_near_duplicates
+
+    mode = mode or NEAR_DUP_MODE
+    stored = db_manager.iter_query(
+        "SELECT id, title, external_link FROM regulations WHERE entity = ANY(%s)", (_entity_list(entity),)
+    )
+    rows = zip(range(len(new_records)), new_records['title'], new_records['external_link'])
+    matches = find_near_duplicates(rows, stored)
+
+    for match in matches:
+        origin = f"id {match['match_key']}" if match['match_scope'] == 'stored' else "el mismo lote"
+        logger.warning(
+            f"Casi duplicado ({match['similarity']:.2f}) de '{match['match_title']}' ({origin}): "
+            f"'{match['title']}'"
+        )
+
+    if mode == 'skip' and matches:
+        positions = {match['key'] for match in matches}
+        keep = [i not in positions for i in range(len(new_records))]
+        new_records = new_records[keep]
+    return new_records, len(matches)
+
+def _record_key(title, created_at, external_link):
+    """Clave title|created_at|external_link normalizada como en insert_new_records."""
+    return f"{str(title).strip()}|{created_at}|{external_link or ''}"
+
 def insert_new_records(db_manager, df, entity):
     """
     Inserta nuevos registros en la base de datos evitando duplicados.
+    entity puede ser una lista: todas las entidades del lote se deduplican
+    con una sola consulta y se insertan con una sola sentencia.
     (Copiada de lambda.py)
     """
     regulations_table_name = 'regulations'
+    entities = _entity_list(entity)
+    entity = ", ".join(entities)
     
     try:
-        # 1. OBTENER REGISTROS EXISTENTES
+        # 1. OBTENER CLAVES EXISTENTES (en streaming, solo se guarda el conjunto de claves)
         query = """
-            SELECT title, created_at, entity, COALESCE(external_link, '') as external_link 
+            SELECT title, created_at, COALESCE(external_link, '') as external_link 
             FROM {} 
-            WHERE entity = %s
+            WHERE entity = ANY(%s)
         """.format(regulations_table_name)
         
-        existing_records = db_manager.execute_query(query, (entity,))
-        
-        if not existing_records:
-            db_df = pd.DataFrame(columns=['title', 'created_at', 'entity', 'external_link'])
-        else:
-            db_df = pd.DataFrame(existing_records, columns=['title', 'created_at', 'entity', 'external_link'])
+        existing_keys = {
+            _record_key(title, created_at, external_link)
+            for title, created_at, external_link in db_manager.iter_query(query, (entities,))
+        }
         
-        logger.info(f"Registros existentes en BD para {entity}: {len(db_df)}")
+        logger.info(f"Registros existentes en BD para {entity}: {len(existing_keys)}")
         
         # 2. PREPARAR DATAFRAME DE LA ENTIDAD
-        entity_df = df[df['entity'] == entity].copy()
+        entity_df = df[df['entity'].isin(entities)].copy()
         
         if entity_df.empty:
             return 0, f"No records found for entity {entity}"
@@ -129,17 +339,12 @@ def insert_new_records(db_manager, df, entity):
         logger.info(f"Registros a procesar para {entity}: {len(entity_df)}")
         
         # 3. NORMALIZAR DATOS PARA COMPARACIÓN
-        if not db_df.empty:
-            db_df['created_at'] = db_df['created_at'].astype(str)
-            db_df['external_link'] = db_df['external_link'].fillna('').astype(str)
-            db_df['title'] = db_df['title'].astype(str).str.strip()
-        
         entity_df['created_at'] = entity_df['created_at'].astype(str)
         entity_df['external_link'] = entity_df['external_link'].fillna('').astype(str)
         entity_df['title'] = entity_df['title'].astype(str).str.strip()
         
         # 4. IDENTIFICAR DUPLICADOS (Lógica de lambda.py)
-        if db_df.empty:
+        if not existing_keys:
             new_records = entity_df.copy()
             duplicates_found = 0
         else:
@@ -148,13 +353,6 @@ def insert_new_records(db_manager, df, entity):
                 entity_df['created_at'] + '|' + 
                 entity_df['external_link']
             )
-            db_df['unique_key'] = (
-                db_df['title'] + '|' + 
-                db_df['created_at'] + '|' + 
-                db_df['external_link']
-            )
-            
-            existing_keys = set(db_df['unique_key'])
             entity_df['is_duplicate'] = entity_df['unique_key'].isin(existing_keys)
             
             new_records = entity_df[~entity_df['is_duplicate']].copy()
@@ -168,6 +366,11 @@ def insert_new_records(db_manager, df, entity):
         internal_duplicates = len(entity_df) - duplicates_found - len(new_records)
         total_duplicates = duplicates_found + internal_duplicates
         
+        # 5b. CASI DUPLICADOS (MinHash/LSH contra la BD y dentro del lote)
+        near_duplicates = 0
+        if NEAR_DUP_MODE != 'off' and not new_records.empty:
+            new_records, near_duplicates = handle_near_duplicates(db_manager, new_records, entities)
+        
         if new_records.empty:
             logger.info(f"No new records found for entity {entity} after duplicate validation")
             return 0, f"No new records found for entity {entity} after duplicate validation"
@@ -178,36 +381,18 @@ def insert_new_records(db_manager, df, entity):
             if col in new_records.columns:
                 new_records = new_records.drop(columns=[col])
         
-        # 7. INSERTAR NUEVOS REGISTROS
-        total_rows_processed = 0
-        try:
-            total_rows_processed = db_manager.bulk_insert(new_records, regulations_table_name)
-            if total_rows_processed == 0:
-                return 0, f"No records were actually inserted for entity {entity}"
-        except Exception as insert_error:
-            logger.error(f"Error en inserción: {insert_error}")
-            if "duplicate" in str(insert_error).lower() or "unique" in str(insert_error).lower():
-                return 0, f"Some records for entity {entity} were duplicates and skipped"
-            else:
-                raise insert_error
-        
-        # 8. OBTENER IDS DE REGISTROS INSERTADOS
-        new_ids_query = f"""
-            SELECT id FROM {regulations_table_name}
-            WHERE entity = %s 
-            ORDER BY id DESC
-            LIMIT %s
-        """
-        new_ids_result = db_manager.execute_query(new_ids_query, (entity, total_rows_processed))
-        new_ids = [row[0] for row in new_ids_result]
-        
-        # 9. INSERTAR COMPONENTES DE REGULACIÓN
-        inserted_count_comp, component_message = insert_regulations_component(db_manager, new_ids)
+        # 7-9. INSERTAR NUEVOS REGISTROS Y SUS COMPONENTES
+        total_rows_processed, component_message = insert_records_with_components(
+            db_manager, new_records, entities
+        )
+        if total_rows_processed == 0:
+            return 0, component_message
         
         # 10. MENSAJE FINAL
         stats = (
             f"Processed: {len(entity_df)} | "
             f"Duplicates skipped: {total_duplicates} | "
+            f"Near duplicates: {near_duplicates} | "
             f"New inserted: {total_rows_processed}"
         )
         message = f"Entity {entity}: {stats}. {component_message}"
@@ -222,16 +407,150 @@ def insert_new_records(db_manager, df, entity):
         logger.error(f"ERROR CRÍTICO: {error_msg}")
         return 0, error_msg
 
+# --- MODO UPSERT (CDC) ---
+
+def _hash_value(value):
+    """Normaliza un valor para el hash de contenido (None/NaN -> '', 14.0 -> '14')."""
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def compute_content_hash(df):
+    """Calcula el md5 de las columnas mutables de cada fila."""
+    columns = [col for col in MUTABLE_COLUMNS if col in df.columns]
+    return [
+        hashlib.md5('|'.join(_hash_value(v) for v in row).encode('utf-8')).hexdigest()
+        for row in df[columns].itertuples(index=False, name=None)
+    ]
+
+
+UPDATE_CHANGED_QUERY = """
+    UPDATE regulations AS r
+    SET summary = v.summary,
+        rtype_id = v.rtype_id,
+        gtype = v.gtype,
+        classification_id = v.classification_id,
+        is_active = v.is_active,
+        content_hash = v.content_hash,
+        update_at = v.update_at
+    FROM (VALUES %s) AS v(entity, title, created_at, external_link, summary, rtype_id,
+                          gtype, classification_id, is_active, content_hash, update_at),
+         regulations AS old
+    WHERE r.entity = v.entity
+      AND r.title = v.title
+      AND r.created_at = v.created_at
+      AND COALESCE(r.external_link, '') = v.external_link
+      AND old.id = r.id
+    RETURNING r.entity, r.created_at, old.rtype_id, r.rtype_id
+"""
+UPDATE_CHANGED_TEMPLATE = (
+    "(%s, %s, %s, %s, %s, %s::integer, %s, %s::integer, %s::boolean, %s, %s::timestamp)"
+)
+
+
+def upsert_records(db_manager, df, entity):
+    """
+    Inserta registros nuevos y actualiza los que cambiaron en la ANI.
+    Compara un hash de las columnas mutables contra el almacenado y aplica
+    todas las actualizaciones con un único UPDATE ... FROM (VALUES ...).
+    Retorna (conteos, mensaje) con conteos {'inserted', 'updated', 'unchanged'}.
+    entity puede ser una lista (una sola pasada para todas las entidades del lote).
+    """
+    entities = _entity_list(entity)
+    entity = ", ".join(entities)
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    try:
+        # 1. OBTENER CLAVES Y HASHES EXISTENTES (calculado en SQL si otro escritor lo dejó en NULL)
+        query = f"""
+            SELECT title, created_at, COALESCE(external_link, '') as external_link,
+                   COALESCE(content_hash, {CONTENT_HASH_SQL})
+            FROM regulations
+            WHERE entity = ANY(%s)
+        """
+        existing_hashes = {
+            _record_key(title, created_at, external_link): content_hash
+            for title, created_at, external_link, content_hash in db_manager.iter_query(query, (entities,))
+        }
+
+        # 2. PREPARAR DATAFRAME DE LA ENTIDAD
+        entity_df = df[df['entity'].isin(entities)].copy()
+        if entity_df.empty:
+            return counts, f"No records found for entity {entity}"
+
+        entity_df['created_at'] = entity_df['created_at'].astype(str)
+        entity_df['external_link'] = entity_df['external_link'].fillna('').astype(str)
+        entity_df['title'] = entity_df['title'].astype(str).str.strip()
+        entity_df = entity_df.drop_duplicates(subset=KEY_COLUMNS, keep='first')
+        entity_df['content_hash'] = compute_content_hash(entity_df)
+
+        # 3. DIFF POR CLAVE CONTRA LOS HASHES EXISTENTES
+        keys = entity_df['title'] + '|' + entity_df['created_at'] + '|' + entity_df['external_link']
+        merged = entity_df.assign(db_hash=keys.map(existing_hashes))
+        is_new = ~keys.isin(existing_hashes.keys())
+        is_changed = ~is_new & (merged['content_hash'] != merged['db_hash'])
+
+        new_records = merged[is_new].drop(columns=['db_hash'])
+        changed = merged[is_changed]
+        counts['unchanged'] = int((~is_new & ~is_changed).sum())
+
+        # 4. INSERTAR NUEVOS
+        component_message = "No new regulation IDs provided"
+        if not new_records.empty:
+            counts['inserted'], component_message = insert_records_with_components(
+                db_manager, new_records, entities
+            )
+
+        # 5. ACTUALIZAR MODIFICADOS EN UNA SOLA SENTENCIA
+        if not changed.empty:
+            update_cols = ['entity'] + KEY_COLUMNS + MUTABLE_COLUMNS + ['content_hash', 'update_at']
+            update_df = changed[update_cols].astype(object).where(pd.notnull(changed[update_cols]), None)
+            records = [tuple(x) for x in update_df.values]
+            # old (autojoin) conserva el rtype_id previo para mover el conteo del resumen
+            updated_rows = db_manager.bulk_update(
+                UPDATE_CHANGED_QUERY, records, template=UPDATE_CHANGED_TEMPLATE, fetch=True, commit=False
+            )
+            try:
+                apply_update_deltas(db_manager, updated_rows)
+                db_manager.connection.commit()
+            except Exception:
+                db_manager.connection.rollback()
+                raise
+            counts['updated'] = len(updated_rows)
+
+        message = (
+            f"Entity {entity}: Processed: {len(entity_df)} | "
+            f"Inserted: {counts['inserted']} | Updated: {counts['updated']} | "
+            f"Unchanged: {counts['unchanged']}. {component_message}"
+        )
+        logger.info(message)
+        return counts, message
+
+    except Exception as e:
+        if hasattr(db_manager, 'connection') and db_manager.connection:
+            db_manager.connection.rollback()
+        error_msg = f"Error processing entity {entity}: {str(e)}"
+        logger.error(f"ERROR CRÍTICO: {error_msg}")
+        return counts, error_msg
+
 # --- FUNCIÓN PRINCIPAL (Llamada por el DAG) ---
 
-def write(regulations: List[Dict], components: List[Dict]) -> Tuple[int, int]:
+EMPTY_WRITE_COUNTS = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+
+def write(regulations: List[Dict], components: List[Dict], mode: str = None) -> Dict[str, int]:
     """
     Punto de entrada para la tarea de escritura del DAG.
     Usa la lógica de idempotencia original de lambda.py.
+    Con mode='upsert' (o WRITE_MODE=upsert) también actualiza las filas modificadas.
+    Retorna los conteos {'inserted', 'updated', 'unchanged'} (ver write_dataframe).
     """
     if not regulations:
         logger.info("No hay regulaciones validadas para escribir.")
-        return 0, 0
+        return dict(EMPTY_WRITE_COUNTS)
 
     # Convertir la lista de dicts (de XCom) a DataFrame (requerido por insert_new_records)
     df_normas = pd.DataFrame(regulations)
@@ -239,25 +558,54 @@ def write(regulations: List[Dict], components: List[Dict]) -> Tuple[int, int]:
     # La lógica original (insert_new_records) no usa la lista 'components'.
     # Genera los componentes internamente usando un ID fijo (7).
     # Por lo tanto, ignoramos el argumento 'components' para ser fieles al requisito.
+    return write_dataframe(df_normas, mode)
+
+
+def write_batch(batch, mode: str = None) -> Dict[str, int]:
+    """
+    Igual que write() pero recibe un RegulationBatch (ver records.py); el
+    DataFrame se arma columna por columna sin pasar por dicts.
+    """
+    if not len(batch):
+        logger.info("No hay regulaciones validadas para escribir.")
+        return dict(EMPTY_WRITE_COUNTS)
+    return write_dataframe(batch.to_dataframe(), mode)
 
-    db_manager = DatabaseManager()
-    if not db_manager.connect():
-        raise Exception("Fallo al conectar con la base de datos")
+
+
+def write_dataframe(df_normas, mode: str = None) -> Dict[str, int]:
+    """
+    Escribe un DataFrame de regulaciones (todas sus entidades en una sola pasada).
+    Retorna {'inserted', 'updated', 'unchanged'}; en modo insert solo
+    'inserted' es distinto de cero (los componentes se insertan junto a cada regulación).
+    """
+    mode = mode or WRITE_MODE
+
+    with metrics.stage("write") as stage_metrics:
+        db_manager = DatabaseManager()
+        if not db_manager.connect():
+            raise Exception("Fallo al conectar con la base de datos")
     
-    try:
-        inserted_count, status_message = insert_new_records(
-            db_manager, df_normas, ENTITY_VALUE
-        )
-        
-        # La lógica original 'insert_regulations_component' se llama *dentro* de 'insert_new_records'
-        # por lo que no necesitamos un conteo separado aquí.
-        
-        logger.info(status_message)
-        # Devolvemos el conteo de regulaciones y 0 para componentes (ya que está incluido)
-        return inserted_count, 0 
+        try:
+            # Una sola pasada para todas las entidades del lote (ANI por defecto; varias
+            # con el scraper multi-fuente): una consulta de claves y un INSERT
+            entities = [str(e) for e in df_normas['entity'].dropna().unique()] or [ENTITY_VALUE]
+            counts = dict(EMPTY_WRITE_COUNTS)
+            if mode == 'upsert':
+                counts, status_message = upsert_records(db_manager, df_normas, entities)
+            else:
+                counts['inserted'], status_message = insert_new_records(db_manager, df_normas, entities)
 
-    except Exception as e:
-        logger.error(f"Error en la tarea de escritura: {e}")
-        raise e
-    finally:
-        db_manager.close()
\ No newline at end of file
+            # La lógica original 'insert_regulations_component' se llama *dentro* de 'insert_new_records'
+            # por lo que no necesitamos un conteo separado aquí.
+            logger.info(status_message)
+
+            stage_metrics.rows_in += len(df_normas)
+            stage_metrics.rows_out += counts['inserted'] + counts['updated']
+            return counts
+
+        except Exception as e:
+            logger.error(f"Error en la tarea de escritura: {e}")
+            raise e
+        finally:
+            db_manager.close()
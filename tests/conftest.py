@@ -0,0 +1,42 @@
+"""
+Configuración común: los módulos del pipeline viven en src/ (como en el contenedor).
+
+Las pruebas que necesitan Postgres usan el fixture db_manager y solo corren
+con TEST_POSTGRES=1 (conexión con las mismas variables POSTGRES_* del
+pipeline). Cada prueba aplica DDL.sql en un esquema temporal que se elimina
+al terminar, así que no toca las tablas reales.
+"""
+import os
+import sys
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+
+@pytest.fixture
+def db_manager():
+    if os.getenv("TEST_POSTGRES") != "1":
+        pytest.skip("requiere Postgres (TEST_POSTGRES=1)")
+    pytest.importorskip("psycopg2")
+    from write import DatabaseManager
+
+    manager = DatabaseManager()
+    if not manager.connect():
+        pytest.skip("no se pudo conectar a Postgres")
+    manager.connection.set_client_encoding("UTF8")
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    with open(os.path.join(ROOT, "DDL.sql"), encoding="utf-8") as f:
+        ddl = f.read()
+    manager.cursor.execute(f"CREATE SCHEMA {schema}; SET search_path TO {schema}")
+    manager.cursor.execute(ddl)
+    manager.connection.commit()
+    try:
+        yield manager
+    finally:
+        manager.connection.rollback()
+        manager.cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+        manager.connection.commit()
+        manager.close()
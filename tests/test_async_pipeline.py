@@ -0,0 +1,62 @@
+"""Ruta de fallo del pipeline asíncrono: un error en una etapa no debe colgar la corrida."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("asyncpg")
+
+import async_pipeline  # noqa: E402
+
+
+class FailingPool:
+    """Pool cuya conexión falla al adquirirse (p. ej. la BD se cayó)."""
+
+    def acquire(self):
+        raise ConnectionError("sin conexión")
+
+
+async def _producer(rows_queue):
+    # Productor que nunca termina: se bloquea en cuanto la cola acotada se llena
+    while True:
+        await rows_queue.put([{'title': 'x'}])
+
+
+def test_supervise_reraises_and_cancels_the_rest():
+    async def scenario():
+        blocked = asyncio.create_task(asyncio.sleep(3600))
+
+        async def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            await asyncio.wait_for(async_pipeline._supervise([asyncio.create_task(fail()), blocked]), 5)
+        return blocked
+
+    blocked = asyncio.run(scenario())
+    assert blocked.cancelled()
+
+
+def test_supervise_returns_when_all_stages_finish():
+    async def scenario():
+        async def ok():
+            await asyncio.sleep(0)
+
+        await asyncio.wait_for(async_pipeline._supervise([asyncio.create_task(ok()) for _ in range(3)]), 5)
+
+    asyncio.run(scenario())
+
+
+def test_writer_failure_does_not_hang_blocked_producers():
+    async def scenario():
+        rows_queue = asyncio.Queue(maxsize=1)
+        writer = asyncio.create_task(
+            async_pipeline.write_worker(FailingPool(), rows_queue, 10, "ANI", {})
+        )
+        producers = [asyncio.create_task(_producer(rows_queue)) for _ in range(2)]
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(async_pipeline._supervise([writer, *producers]), 5)
+        return producers
+
+    producers = asyncio.run(scenario())
+    assert all(task.cancelled() for task in producers)
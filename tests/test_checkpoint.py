@@ -0,0 +1,88 @@
+"""Checkpoints por página: escritura atómica y validación al reanudar."""
+import json
+import os
+
+import pytest
+
+import checkpoint
+
+ROWS = [
+    {'title': 'Resolución 1', 'created_at': '2024-01-31', 'external_link': None},
+    {'title': 'Decreto 2', 'created_at': '2023-12-01', 'external_link': 'https://ani.gov.co/d2.pdf'},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return checkpoint.CheckpointStore("scheduled__2024-01-01T00:00:00+00:00", str(tmp_path))
+
+
+def test_save_and_load_round_trip(store):
+    store.save_page(3, ROWS)
+    assert store.load_page(3) == ROWS
+    assert store.completed_pages() == [3]
+    assert store.load_page(4) is None
+
+
+def test_save_leaves_no_temporary_file(store):
+    store.save_page(0, ROWS)
+    assert sorted(os.listdir(store.path)) == ["page_0.json"]
+
+
+def test_failed_write_keeps_previous_checkpoint(store, monkeypatch):
+    store.save_page(1, ROWS)
+
+    def broken_dump(*args, **kwargs):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(checkpoint.json, "dump", broken_dump)
+    with pytest.raises(OSError):
+        store.save_page(1, ROWS[:1])
+    monkeypatch.undo()
+    # El os.replace no llegó a ejecutarse: el checkpoint anterior sigue intacto
+    assert store.load_page(1) == ROWS
+
+
+def test_truncated_or_tampered_checkpoint_is_ignored(store):
+    store.save_page(2, ROWS)
+    path = os.path.join(store.path, "page_2.json")
+    with open(path, encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["rows"][0]["title"] = "Otra"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    assert store.load_page(2) is None
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"page_num": 2, "rows": [')
+    assert store.load_page(2) is None
+
+
+def test_scrape_uses_checkpoint_before_downloading(store):
+    calls = []
+
+    def scrape(page_num):
+        calls.append(page_num)
+        return ROWS
+
+    assert checkpoint.scrape_page_checkpointed(5, store, scrape) == ROWS
+    assert checkpoint.scrape_page_checkpointed(5, store, scrape) == ROWS
+    assert calls == [5]
+
+
+def test_batches_are_saved_as_rows_and_restored_with_from_rows(store):
+    from records import RegulationBatch
+
+    batch = RegulationBatch.from_dicts(
+        [dict(row, entity='ANI', classification_id=13, is_active=True) for row in ROWS], '2024-02-01 00:00:00'
+    )
+    saved = checkpoint.scrape_page_checkpointed(7, store, lambda page_num: batch,
+                                                from_rows=RegulationBatch.from_dicts)
+    assert saved is batch
+    assert store.load_page(7) == batch.to_dicts()
+
+    restored = checkpoint.scrape_page_checkpointed(
+        7, store, lambda page_num: pytest.fail("no debe descargar"), from_rows=RegulationBatch.from_dicts,
+    )
+    assert isinstance(restored, RegulationBatch)
+    assert restored.to_dicts() == batch.to_dicts()
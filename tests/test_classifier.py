@@ -0,0 +1,69 @@
+"""Clasificador de rtype_id: el trie equivale a la alternancia simple."""
+import random
+import re
+
+import pytest
+
+import classifier
+
+WORDS = ['resolucion', 'resoluciones', 'decreto', 'decretos', 'circular', 'circulares',
+         'acuerdo', 'acta', 'actas', 'auto', 'a', 'ley']
+
+
+def alternation(words):
+    # Mayor longitud primero: misma preferencia que los sufijos codiciosos del trie
+    return r'\b(' + '|'.join(re.escape(w) for w in sorted(words, key=len, reverse=True)) + r')\b'
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_trie_matches_the_same_words_as_the_alternation(seed):
+    rnd = random.Random(seed)
+    trie = re.compile(r'\b(' + classifier.trie_pattern(WORDS) + r')\b')
+    plain = re.compile(alternation(WORDS))
+    for _ in range(200):
+        text = ' '.join(rnd.choice(WORDS + ['de', 'la', 'resolu', 'decretazo', 'actas.']) for _ in range(8))
+        assert [m.group(1) for m in trie.finditer(text)] == [m.group(1) for m in plain.finditer(text)]
+
+
+def test_trie_pattern_factors_common_prefixes():
+    assert classifier.trie_pattern(['decreto', 'decretos']) == 'decreto(?:s)?'
+    assert re.fullmatch(classifier.trie_pattern(['acta', 'acuerdo', 'auto']), 'acuerdo')
+
+
+def test_default_keywords_keep_original_behaviour():
+    clf = classifier.KeywordClassifier(classifier.DEFAULT_KEYWORDS)
+    assert clf.classify("RESOLUCIÓN 20243030001235") == 15
+    assert clf.classify("Decretos reglamentarios") == 14
+    assert clf.classify("Circular externa") == classifier.DEFAULT_RTYPE_ID
+    assert clf.classify(None) == classifier.DEFAULT_RTYPE_ID
+
+
+def test_title_beats_summary_then_priority_then_position():
+    clf = classifier.KeywordClassifier([('decreto', 14, 10), ('resolución', 15, 20), ('circular', 30, 20)])
+    assert clf.classify("Decreto 1079", "modifica la resolución 5") == 14
+    assert clf.classify("Decreto que modifica la resolución 5") == 15
+    assert clf.classify("Circular sobre la resolución 5") == 30
+
+
+def test_whole_words_only():
+    clf = classifier.KeywordClassifier([('acta', 40, 10)])
+    assert clf.classify("Exactamente") == classifier.DEFAULT_RTYPE_ID
+    assert clf.classify("Acta de inicio") == 40
+    assert clf.classify("Acta_12 / acta-13") == 40
+
+
+@pytest.mark.parametrize("title, baseline, expected", [
+    # Cambio intencional: la subcadena dentro de otra palabra ya no clasifica
+    ("Irresolución del contrato de concesión", 15, 14),
+    ("Decretazo", 14, 14),
+    # Sin cambio: plurales, dígitos o signos pegados a la palabra
+    ("Resoluciones de la ANI", 15, 15),
+    ("Resolución20243030001235", 15, 15),
+    ("RESOLUCION-123 de 2024", 15, 15),
+    ("Decretos 1079 y 1080", 14, 14),
+])
+def test_difference_with_baseline_substring_matching(title, baseline, expected):
+    substring = next((rtype_id for keyword, rtype_id in [('resolución', 15), ('resolucion', 15), ('decreto', 14)]
+                      if keyword in title.lower()), classifier.DEFAULT_RTYPE_ID)
+    assert substring == baseline
+    assert classifier.KeywordClassifier(classifier.DEFAULT_KEYWORDS).classify(title) == expected
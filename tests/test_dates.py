@@ -0,0 +1,44 @@
+"""Normalización de fechas de la ANI a YYYY-MM-DD."""
+from datetime import date, datetime
+
+import pytest
+
+import dates
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("2024-12-31", "2024-12-31"),
+    ("2024/1/5", "2024-01-05"),
+    ("2024-12-31T00:00:00-05:00", "2024-12-31"),
+    ("2024-12-31 10:00:00", "2024-12-31"),
+    ("31/12/2024", "2024-12-31"),
+    ("31-12-2024", "2024-12-31"),
+    ("31.12.2024", "2024-12-31"),
+    ("05/01/24", "2024-01-05"),
+    ("05/01/99", "1999-01-05"),
+    ("31 de diciembre de 2024", "2024-12-31"),
+    ("31 de Diciembre del 2024", "2024-12-31"),
+    ("31-dic-2024", "2024-12-31"),
+    ("dic. 31, 2024", "2024-12-31"),
+    ("Diciembre 31 de 2024", "2024-12-31"),
+    ("martes, 3 de enero de 2023", "2023-01-03"),
+    ("3 de setiembre de 2023", "2023-09-03"),
+    ("  1 DE FEBRERO DE 2020  ", "2020-02-01"),
+])
+def test_format_date_recognized_formats(raw, expected):
+    assert dates.format_date(raw) == expected
+
+
+@pytest.mark.parametrize("raw", [None, "", "   ", "sin fecha", "31/02/2024", "2024-13-01", "32 de enero de 2024"])
+def test_format_date_rejects_unknown_or_impossible_dates(raw):
+    assert dates.format_date(raw) is None
+
+
+def test_format_date_accepts_date_objects():
+    assert dates.format_date(date(2024, 2, 29)) == "2024-02-29"
+    assert dates.format_date(datetime(2024, 2, 29, 23, 59)) == "2024-02-29"
+
+
+def test_normalize_dates_resolves_each_distinct_value_once():
+    values = ["31/12/2024", "31/12/2024", None, "1 de enero de 2025"]
+    assert dates.normalize_dates(values) == [date(2024, 12, 31), date(2024, 12, 31), None, date(2025, 1, 1)]
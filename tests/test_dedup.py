@@ -0,0 +1,60 @@
+"""MinHash + LSH: umbrales de casi duplicados."""
+import pytest
+
+pytest.importorskip("numpy")
+
+import dedup  # noqa: E402
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+def test_shingles_ignore_accents_case_and_link_extension():
+    assert dedup.shingles("RESOLUCIÓN 123") == dedup.shingles("resolucion   123")
+    assert dedup.link_stem("https://ani.gov.co/sites/Resolucion%20123.pdf") == "resolucion 123"
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.7, 0.85, 0.95])
+def test_lsh_params_approximate_threshold(threshold):
+    bands, rows = dedup.lsh_params(threshold, 128)
+    assert bands * rows <= 128
+    assert abs((1.0 / bands) ** (1.0 / rows) - threshold) < 0.1
+
+
+def test_signature_similarity_estimates_jaccard():
+    index = dedup.NearDuplicateIndex(num_perm=256)
+    a = dedup.shingles("Resolución 20243030001235 por la cual se adopta el manual de contratación")
+    b = dedup.shingles("Resolución 20243030001235 por la cual se adopta el manual de interventoría")
+    estimate = (index.signature(a) == index.signature(b)).mean()
+    assert abs(estimate - jaccard(a, b)) < 0.1
+
+
+def test_near_duplicate_above_threshold_is_reported():
+    stored = [(1, "Resolución 20243030001235 por la cual se adopta el manual de contratación", None)]
+    rows = [
+        ("nuevo", "Resolucion 20243030001235 por la cual se adopta el manual de contratacion.", None),
+        ("otro", "Decreto 1079 de 2015 reglamentario del sector transporte", None),
+    ]
+    matches = dedup.find_near_duplicates(rows, stored, threshold=0.85)
+    assert [(m['key'], m['match_scope'], m['match_key']) for m in matches] == [("nuevo", "stored", 1)]
+    assert matches[0]['similarity'] >= 0.85
+
+
+def test_threshold_controls_what_counts_as_duplicate():
+    title = "Resolución 20243030001235 por la cual se adopta el manual de contratación"
+    variant = "Resolución 20243030001235 por la cual se adopta el manual de interventoría"
+    similarity = jaccard(dedup.shingles(title), dedup.shingles(variant))
+    assert 0.5 < similarity < 0.8
+
+    assert dedup.find_near_duplicates([("v", variant, None)], [(1, title, None)], threshold=0.95) == []
+    assert len(dedup.find_near_duplicates([("v", variant, None)], [(1, title, None)], threshold=0.4)) == 1
+
+
+def test_duplicates_inside_the_batch_are_reported_once():
+    rows = [
+        (1, "Resolución 123 de 2024", "https://ani.gov.co/r123.pdf"),
+        (2, "Resolución 123 de 2024", "https://ani.gov.co/r123.pdf"),
+    ]
+    matches = dedup.find_near_duplicates(rows, threshold=0.85)
+    assert [(m['key'], m['match_scope'], m['match_key'], m['similarity']) for m in matches] == [(2, "batch", 1, 1.0)]
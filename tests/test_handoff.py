@@ -0,0 +1,51 @@
+"""Traspaso por Parquet: ida y vuelta con checksum."""
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import handoff  # noqa: E402
+
+RECORDS = [
+    {'title': 'Resolución 1', 'created_at': '2024-01-31', 'rtype_id': 15, 'external_link': None},
+    {'title': 'Decreto 2', 'created_at': '2023-12-01', 'rtype_id': 14, 'external_link': 'https://ani.gov.co/d2.pdf'},
+]
+
+
+@pytest.fixture(autouse=True)
+def handoff_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(handoff, "HANDOFF_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_round_trip_preserves_records():
+    ref = handoff.write_handoff(RECORDS, "manual__2024-01-01T00:00:00", "extracted")
+    assert ref["rows"] == 2
+    assert handoff.read_handoff(ref) == RECORDS
+
+
+def test_xcom_value_is_a_reference_only_in_file_mode():
+    assert handoff.to_xcom_value(RECORDS, "run", "x", mode="xcom") is RECORDS
+    ref = handoff.to_xcom_value(RECORDS, "run", "x", mode="file")
+    assert set(ref) == {"path", "rows", "checksum"}
+    assert handoff.from_xcom_value(ref) == RECORDS
+    assert handoff.from_xcom_value(None) == []
+
+
+def test_tampered_file_fails_checksum():
+    ref = handoff.write_handoff(RECORDS, "run", "validated")
+    with open(ref["path"], "ab") as f:
+        f.write(b"\0")
+    with pytest.raises(ValueError, match="Checksum"):
+        handoff.read_handoff(ref)
+
+
+def test_row_count_mismatch_is_rejected():
+    ref = dict(handoff.write_handoff(RECORDS, "run", "validated"), rows=3)
+    with pytest.raises(ValueError, match="filas"):
+        handoff.read_handoff(ref)
+
+
+def test_cleanup_removes_run_directory(handoff_dir):
+    handoff.write_handoff(RECORDS, "run/1", "extracted")
+    assert handoff.cleanup_handoff("run/1") == 1
+    assert not any(handoff_dir.iterdir())
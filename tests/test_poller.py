@@ -0,0 +1,198 @@
+"""Ciclo de sondeo del servicio residente (sin red ni BD: fetch, get_db e insert simulados)."""
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("pandas")
+pytest.importorskip("psycopg2")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+import poller  # noqa: E402
+import validation  # noqa: E402
+from fake_ani_server import build_page, build_row  # noqa: E402
+
+ROWS_PER_PAGE = 5
+PAGES = {n: build_page(n, 10, ROWS_PER_PAGE).encode("utf-8") for n in range(10)}
+
+
+class StubPoller(poller.Poller):
+    """Poller con páginas en memoria; registra páginas pedidas, accesos a BD e inserciones."""
+
+    def __init__(self, pages=PAGES, **kwargs):
+        super().__init__(**kwargs)
+        self.pages = dict(pages)
+        self.known_keys = set()
+        self.fetched = []
+        self.db_calls = 0
+        self.inserted_batches = []
+        self.fail_db = False
+        self.fail_insert = False
+        self.version = 1
+
+    def fetch(self, page_num):
+        self.fetched.append(page_num)
+        if page_num == 0:
+            self.pending_etag = f'"v{self.version}"'
+        return self.pages[page_num]
+
+    def get_db(self):
+        self.db_calls += 1
+        if self.fail_db:
+            raise ConnectionError("BD caída")
+        return object()
+
+    def insert(self, db_manager, batch):
+        if self.fail_insert:
+            raise RuntimeError("fallo al insertar")
+        self.inserted_batches.append(len(batch))
+        self.known_keys.update(poller._record_key(r.title, r.created_at, r.external_link) for r in batch.records)
+        return len(batch)
+
+
+@pytest.fixture(autouse=True)
+def rules_file(monkeypatch):
+    monkeypatch.setattr(validation, "RULES_PATH", os.path.join(ROOT, "configs", "validation_rules.json"))
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(headers)
+        return self.response
+
+    def close(self):
+        pass
+
+
+def test_not_modified_skips_parsing_and_keeps_etag(monkeypatch):
+    p = poller.Poller(max_pages=3)
+    p.etag = '"v1"'
+    p.session = FakeSession(FakeResponse(304))
+
+    def fail_parse(*args, **kwargs):
+        raise AssertionError("no debe parsear una respuesta 304")
+
+    monkeypatch.setattr(poller, "parse_page_records", fail_parse)
+    result = p.poll_once()
+    assert p.session.requests == [{"If-None-Match": '"v1"'}]
+    assert (result["changed"], result["pages"], result["inserted"]) == (False, 1, 0)
+    assert p.etag == '"v1"'
+
+
+def test_unchanged_fingerprint_does_not_touch_the_db():
+    p = StubPoller(max_pages=1)
+    assert p.poll_once()["inserted"] == ROWS_PER_PAGE
+    db_calls = p.db_calls
+
+    p.version = 2
+    result = p.poll_once()
+    assert result["changed"] is False
+    assert p.db_calls == db_calls
+    # Sin cambios el nuevo ETag sí se adopta (no hay nada que reintentar)
+    assert p.etag == '"v2"'
+
+
+def test_fully_new_pages_are_followed_up_to_max_pages():
+    p = StubPoller(max_pages=3)
+    result = p.poll_once()
+    assert p.fetched == [0, 1, 2]
+    assert (result["pages"], result["inserted"]) == (3, 3 * ROWS_PER_PAGE)
+
+
+def test_page_with_known_rows_stops_the_walk():
+    p = StubPoller(max_pages=5)
+    p.poll_once()
+    p.fetched.clear()
+
+    # Una fila nueva al inicio de la página 0: el resto ya se conoce
+    p.pages[0] = build_page(0, 10, ROWS_PER_PAGE).replace("<tbody>", "<tbody>" + build_row(999), 1).encode("utf-8")
+    result = p.poll_once()
+    assert p.fetched == [0]
+    assert result["inserted"] == 1
+
+
+@pytest.mark.parametrize("failure", ["fail_db", "fail_insert"])
+def test_failure_does_not_advance_etag_or_fingerprint(failure):
+    p = StubPoller(max_pages=1)
+    setattr(p, failure, True)
+    with pytest.raises(Exception):
+        p.poll_once()
+    assert (p.etag, p.last_fingerprint) == (None, None)
+
+    # El siguiente ciclo reintenta la misma página en lugar de darla por vista
+    setattr(p, failure, False)
+    assert p.poll_once()["inserted"] == ROWS_PER_PAGE
+    assert p.etag == '"v1"' and p.last_fingerprint is not None
+
+
+def _get(server, path):
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8")
+
+
+def _run_one_cycle(p):
+    """Un ciclo de run(): se detiene desde el propio sondeo para no esperar el intervalo."""
+    poll_once = poller.Poller.poll_once
+
+    def poll_and_stop():
+        p.stop()
+        return poll_once(p)
+
+    p.stop_event.clear()
+    p.trigger_event.clear()
+    p.poll_once = poll_and_stop
+    try:
+        p.run()
+    finally:
+        del p.poll_once
+
+
+def test_health_is_503_after_an_error_and_200_after_recovery():
+    p = StubPoller(max_pages=1, interval=60)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), poller.make_handler(p))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert _get(server, "/health")[0] == 503
+
+        p.fail_insert = True
+        _run_one_cycle(p)
+        status, body = _get(server, "/health")
+        assert status == 503
+        assert json.loads(body)["last_error"] == "fallo al insertar"
+
+        p.fail_insert = False
+        _run_one_cycle(p)
+        assert _get(server, "/health")[0] == 200
+        assert "polls_failed 1" in _get(server, "/metrics")[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
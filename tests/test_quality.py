@@ -0,0 +1,55 @@
+"""Perfil de calidad: cota de error de HyperLogLog y comparación entre corridas."""
+import pytest
+
+import quality
+
+# Error estándar de HLL con 2^12 registros: 1.04 / sqrt(4096) ≈ 1.6 %
+STANDARD_ERROR = 1.04 / (1 << 6)
+
+
+@pytest.mark.parametrize("cardinality", [1000, 10000, 50000, 200000])
+def test_hll_estimate_within_error_bound(cardinality):
+    hll = quality.HyperLogLog()
+    for i in range(cardinality):
+        hll.add(f"Resolución {i}")
+    assert abs(hll.count() - cardinality) / cardinality < 3 * STANDARD_ERROR
+
+
+def test_hll_small_cardinalities_and_repeats():
+    hll = quality.HyperLogLog()
+    for _ in range(1000):
+        for value in ("a", "b", "c"):
+            hll.add(value)
+    assert hll.count() == 3
+    assert quality.HyperLogLog().count() == 0
+
+
+def test_column_profile_counts_nulls_and_lengths():
+    profile = quality.DataProfiler(['summary', 'created_at']).update_many([
+        {'summary': None, 'created_at': '2024-01-31'},
+        {'summary': float('nan'), 'created_at': '2023-05-01'},
+        {'summary': '', 'created_at': None},
+        {'summary': 'x' * 300, 'created_at': '2024-06-30'},
+    ]).to_dicts()
+    summary, created_at = profile
+    assert summary['null_rate'] == 0.5
+    assert summary['empty_count'] == 1
+    assert (summary['min_length'], summary['max_length'], summary['mean_length']) == (0, 300, 150.0)
+    assert (created_at['min_value'], created_at['max_value']) == ('2023-05-01', '2024-06-30')
+
+
+def test_compare_profiles_flags_markup_changes():
+    previous = [{'column_name': 'summary', 'row_count': 100, 'null_rate': 0.0,
+                 'distinct_estimate': 95, 'mean_length': 120.0, 'max_value': None}]
+    current = [{'column_name': 'summary', 'row_count': 100, 'null_rate': 0.6,
+                'distinct_estimate': 40, 'mean_length': 30.0, 'max_value': None}]
+    warnings = quality.compare_profiles(current, previous)
+    assert len(warnings) == 3
+    assert quality.compare_profiles(previous, previous) == []
+
+
+def test_profile_scope_is_the_sorted_entity_set():
+    rows = [{'entity': 'Agencia Nacional de Infraestructura'}, {'entity': 'Aerocivil'},
+            {'entity': 'Agencia Nacional de Infraestructura'}]
+    assert quality.profile_scope(rows) == 'Aerocivil | Agencia Nacional de Infraestructura'
+    assert quality.profile_scope(rows[:1]) != quality.profile_scope(rows)
@@ -0,0 +1,76 @@
+"""Reconciliación de is_active (requiere Postgres: TEST_POSTGRES=1)."""
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("psycopg2")
+
+import reconcile  # noqa: E402
+import write  # noqa: E402
+
+ENTITY = "Agencia Nacional de Infraestructura"
+ROWS = [
+    {
+        'created_at': f'2024-01-{i + 1:02d}', 'update_at': '2024-02-01 00:00:00', 'is_active': True,
+        'title': f'Resolución {i}', 'gtype': 'link', 'entity': ENTITY,
+        'external_link': f'https://www.ani.gov.co/r{i}.pdf' if i % 2 else None, 'rtype_id': 15,
+        'summary': f'Resumen {i}', 'classification_id': 13,
+    }
+    for i in range(10)
+]
+KEYS = [(row['title'], row['created_at'], row['external_link']) for row in ROWS]
+
+
+@pytest.fixture
+def loaded(db_manager):
+    counts, _ = write.upsert_records(db_manager, pd.DataFrame(ROWS), ENTITY)
+    assert counts['inserted'] == len(ROWS)
+    return db_manager
+
+
+def _state(db_manager):
+    """title -> (is_active, content_hash, hash esperado según compute_content_hash)."""
+    df = pd.DataFrame(db_manager.execute_query(
+        "SELECT title, is_active, content_hash, summary, rtype_id, gtype, classification_id FROM regulations"
+    ), columns=['title', 'is_active', 'content_hash', 'summary', 'rtype_id', 'gtype', 'classification_id'])
+    df['expected_hash'] = write.compute_content_hash(df)
+    return {row.title: (row.is_active, row.content_hash, row.expected_hash) for row in df.itertuples()}
+
+
+def test_short_crawl_aborts_without_changes(loaded):
+    before = _state(loaded)
+    with pytest.raises(reconcile.ReconcileAborted):
+        reconcile.reconcile_active(loaded, ENTITY, KEYS[:5], max_deactivate_pct=10)
+    assert _state(loaded) == before
+
+    with pytest.raises(reconcile.ReconcileAborted):
+        reconcile.reconcile_active(loaded, ENTITY, [], max_deactivate_pct=100)
+
+
+def test_missing_keys_are_deactivated_with_new_hash(loaded):
+    counts = reconcile.reconcile_active(loaded, ENTITY, KEYS[1:], max_deactivate_pct=10)
+    assert (counts['deactivated'], counts['reactivated']) == (1, 0)
+
+    state = _state(loaded)
+    assert state['Resolución 0'][0] is False
+    assert all(active for title, (active, _, _) in state.items() if title != 'Resolución 0')
+    assert all(stored == expected for _, stored, expected in state.values())
+
+
+def test_reappearing_keys_are_reactivated_with_new_hash(loaded):
+    original = _state(loaded)
+    reconcile.reconcile_active(loaded, ENTITY, KEYS[1:], max_deactivate_pct=10)
+
+    counts = reconcile.reconcile_active(loaded, ENTITY, KEYS, max_deactivate_pct=10)
+    assert (counts['deactivated'], counts['reactivated']) == (0, 1)
+    assert _state(loaded) == original
+
+    # El siguiente upsert no ve cambios: el hash quedó igual al de la fila rastreada
+    counts, _ = write.upsert_records(loaded, pd.DataFrame(ROWS), ENTITY)
+    assert counts == {'inserted': 0, 'updated': 0, 'unchanged': len(ROWS)}
+
+
+def test_dry_run_reports_without_changes(loaded):
+    before = _state(loaded)
+    counts = reconcile.reconcile_active(loaded, ENTITY, KEYS[1:], max_deactivate_pct=10, dry_run=True)
+    assert counts['deactivated'] == 1
+    assert _state(loaded) == before
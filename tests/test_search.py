@@ -0,0 +1,60 @@
+"""Búsqueda: armado de la consulta, cursor keyset y paginación con fechas NULL."""
+import pytest
+
+import search
+
+
+def test_cursor_round_trip():
+    for values in (['2024-01-31', 42], [0.125, 7], [None, 3]):
+        cursor = search.encode_cursor(values)
+        assert search.decode_cursor(cursor) == values
+        assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=")
+
+
+def test_invalid_cursor_raises_value_error():
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        search.decode_cursor("no es un cursor")
+
+
+def test_date_ordered_query_excludes_null_dates_and_uses_keyset():
+    cursor = search.encode_cursor(['2024-01-31', 42])
+    sql, params = search.build_search_query(date_from='2023-01-01', entity='ANI', limit=10, after=cursor)
+    assert "created_at IS NOT NULL" in sql
+    assert "(created_at, id) < (%s, %s)" in sql
+    assert "ORDER BY created_at DESC, id DESC" in sql
+    assert "OFFSET" not in sql
+    assert params == ['2023-01-01', 'ANI', '2024-01-31', 42, 11]
+
+
+def test_ranked_query_keeps_rows_without_date():
+    cursor = search.encode_cursor([0.5, 9])
+    sql, params = search.build_search_query(query='concesión vial', rtype_ids=[14, 15], limit=5, after=cursor)
+    assert "created_at IS NOT NULL" not in sql
+    assert "(rank, id) < (%s::real, %s)" in sql
+    assert "ORDER BY rank DESC, id DESC" in sql
+    assert params == ['concesión vial', 'concesión vial', [14, 15], 0.5, 9, 6]
+
+
+def test_pagination_with_null_dates_visits_every_dated_row_once(db_manager):
+    pd = pytest.importorskip("pandas")
+    rows = [
+        {'title': f'Resolución {i}', 'created_at': None if i % 4 == 0 else f'2024-01-{i % 3 + 1:02d}',
+         'entity': 'ANI', 'external_link': f'https://www.ani.gov.co/r{i}.pdf', 'summary': 'concesión vial'}
+        for i in range(20)
+    ]
+    db_manager.bulk_insert(pd.DataFrame(rows), 'regulations')
+
+    seen, after = [], None
+    while True:
+        page = search.search_regulations(db_manager, limit=4, after=after)
+        seen.extend(result['title'] for result in page['results'])
+        after = page['next_cursor']
+        if after is None:
+            break
+    dated = [row['title'] for row in rows if row['created_at']]
+    assert sorted(seen) == sorted(dated)
+    assert len(seen) == len(set(seen))
+
+    # Con texto las filas sin fecha sí aparecen
+    found = search.search_regulations(db_manager, query='concesión', limit=50)['results']
+    assert len(found) == len(rows)
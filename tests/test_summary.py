@@ -0,0 +1,84 @@
+"""Tablas de resumen: los deltas incrementales deben coincidir con una reconstrucción."""
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("psycopg2")
+
+import summary  # noqa: E402
+import write  # noqa: E402
+
+
+def make_row(i, entity, created_at, rtype_id):
+    return {
+        'created_at': created_at, 'update_at': '2024-02-01 00:00:00', 'is_active': True,
+        'title': f'Norma {entity} {i}', 'gtype': 'link', 'entity': entity,
+        'external_link': f'https://example.org/{entity}/{i}.pdf', 'rtype_id': rtype_id,
+        'summary': f'Resumen {i}', 'classification_id': 13,
+    }
+
+
+def _snapshot(db_manager):
+    yearly = db_manager.execute_query(
+        "SELECT entity, year, rtype_id, regulation_count FROM regulation_stats_yearly "
+        "WHERE regulation_count <> 0 ORDER BY 1, 2, 3"
+    )
+    entities = db_manager.execute_query(
+        "SELECT entity, regulation_count, latest_created_at FROM regulation_stats_entity ORDER BY 1"
+    )
+    return yearly, entities
+
+
+def test_insert_deltas_group_by_entity_year_and_rtype():
+    yearly, entities = summary._insert_deltas([
+        ('ANI', '2023-05-01', 15), ('ANI', '2023-12-31', 15.0), ('ANI', '2024-01-01', None),
+        ('Aerocivil', '2022-01-01', 14), (None, '2024-01-01', 14), ('ANI', None, 14),
+    ])
+    assert yearly == {('ANI', '2023', 15): 2, ('ANI', '2024', 0): 1, ('Aerocivil', '2022', 14): 1}
+    assert entities == {'ANI': (3, '2024-01-01'), 'Aerocivil': (1, '2022-01-01')}
+
+
+def test_deltas_match_rebuild(db_manager):
+    first = [make_row(i, 'ANI', f'202{i % 3}-0{i % 9 + 1}-15', 15 if i % 2 else 14) for i in range(12)]
+    first += [make_row(i, 'Aerocivil', f'2024-0{i + 1}-01', None) for i in range(3)]
+    counts, _ = write.upsert_records(db_manager, pd.DataFrame(first), ['ANI', 'Aerocivil'])
+    assert counts['inserted'] == 15
+
+    # Cambios de rtype_id (mueven el conteo entre claves) y filas nuevas en otro lote
+    second = [dict(row) for row in first]
+    for row in second[:4]:
+        row['rtype_id'] = 16
+    second[12]['rtype_id'] = 14
+    second += [make_row(i, 'ANI', '2025-03-01', 15) for i in range(100, 103)]
+    counts, _ = write.upsert_records(db_manager, pd.DataFrame(second), ['ANI', 'Aerocivil'])
+    assert (counts['inserted'], counts['updated']) == (3, 5)
+
+    incremental = _snapshot(db_manager)
+    summary.rebuild_summaries(db_manager)
+    assert incremental == _snapshot(db_manager)
+
+
+def test_async_deltas_match_rebuild(db_manager):
+    asyncpg = pytest.importorskip("asyncpg")
+    import asyncio
+
+    rows = [make_row(i, 'ANI', f'202{i % 4}-06-30', 15 if i % 3 else None) for i in range(10)]
+    db_manager.bulk_insert(pd.DataFrame(rows), 'regulations')
+    inserted = [(row['entity'], row['created_at'], row['rtype_id']) for row in rows]
+    schema = db_manager.execute_query("SHOW search_path")[0][0]
+
+    async def apply():
+        conn = await asyncpg.connect(
+            host=db_manager.host, port=db_manager.port, user=db_manager.user,
+            password=db_manager.password, database=db_manager.db_name,
+            server_settings={'search_path': schema},
+        )
+        try:
+            async with conn.transaction():
+                await summary.apply_insert_deltas_async(conn, inserted)
+        finally:
+            await conn.close()
+
+    asyncio.run(apply())
+    incremental = _snapshot(db_manager)
+    summary.rebuild_summaries(db_manager)
+    assert incremental == _snapshot(db_manager)
@@ -0,0 +1,141 @@
+"""Modo upsert (CDC) de write.py: hash de contenido, SQL y conteos."""
+import re
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("psycopg2")
+
+import write  # noqa: E402
+
+ENTITY = "Agencia Nacional de Infraestructura"
+
+
+def make_rows(n=3, **overrides):
+    rows = []
+    for i in range(n):
+        row = {
+            'created_at': f'2024-01-0{i + 1}', 'update_at': '2024-02-01 00:00:00', 'is_active': True,
+            'title': f'Resolución {i}', 'gtype': 'link', 'entity': ENTITY,
+            'external_link': f'https://www.ani.gov.co/r{i}.pdf', 'rtype_id': 15,
+            'summary': f'Resumen {i}', 'classification_id': 13,
+        }
+        row.update(overrides)
+        rows.append(row)
+    return rows
+
+
+# === Sin base de datos ===
+def test_hash_normalizes_nulls_and_integral_floats():
+    df = pd.DataFrame([
+        {'summary': None, 'rtype_id': 14, 'gtype': 'link', 'classification_id': 13, 'is_active': True},
+        {'summary': float('nan'), 'rtype_id': 14.0, 'gtype': 'link', 'classification_id': 13.0, 'is_active': True},
+    ])
+    first, second = write.compute_content_hash(df)
+    assert first == second
+
+
+def test_hash_changes_with_each_mutable_column():
+    base = make_rows(1)[0]
+    hashes = {write.compute_content_hash(pd.DataFrame([base]))[0]}
+    for column, value in [('summary', 'otro'), ('rtype_id', 14), ('gtype', 'All'),
+                          ('classification_id', 12), ('is_active', False)]:
+        hashes.add(write.compute_content_hash(pd.DataFrame([dict(base, **{column: value})]))[0])
+    assert len(hashes) == 1 + len(write.MUTABLE_COLUMNS)
+
+
+def test_hash_sql_uses_mutable_columns_in_order():
+    columns = re.findall(r"COALESCE\((\w+)|WHEN (\w+) THEN", write.CONTENT_HASH_SQL)
+    assert [a or b for a, b in columns] == write.MUTABLE_COLUMNS
+
+
+def test_update_query_values_match_template():
+    values = re.search(r"AS v\(([^)]*)\)", write.UPDATE_CHANGED_QUERY).group(1)
+    names = [name.strip() for name in values.split(',')]
+    assert names == ['entity'] + write.KEY_COLUMNS + write.MUTABLE_COLUMNS + ['content_hash', 'update_at']
+    assert write.UPDATE_CHANGED_TEMPLATE.count('%s') == len(names)
+
+
+# === Con Postgres (TEST_POSTGRES=1) ===
+def _stored(db_manager):
+    return {
+        title: (xmin, content_hash)
+        for title, xmin, content_hash in db_manager.execute_query(
+            "SELECT title, xmin::text, content_hash FROM regulations"
+        )
+    }
+
+
+def test_sql_hash_matches_python_hash(db_manager):
+    rows = [
+        make_rows(1)[0],
+        dict(make_rows(1)[0], title='b', summary=None, rtype_id=None, is_active=False),
+        dict(make_rows(1)[0], title='c', gtype=None, classification_id=None, is_active=None),
+    ]
+    df = pd.DataFrame(rows)
+    db_manager.bulk_insert(df, 'regulations')
+    sql_hashes = dict(db_manager.execute_query(f"SELECT title, {write.CONTENT_HASH_SQL} FROM regulations"))
+    assert [sql_hashes[title] for title in df['title']] == write.compute_content_hash(df)
+
+
+def test_upsert_counts_inserted_updated_unchanged(db_manager):
+    rows = make_rows(3)
+    counts, _ = write.upsert_records(db_manager, pd.DataFrame(rows), ENTITY)
+    assert counts == {'inserted': 3, 'updated': 0, 'unchanged': 0}
+    assert all(content_hash for _, content_hash in _stored(db_manager).values())
+
+    rows[1]['summary'] = 'Resumen corregido'
+    rows.append(make_rows(4)[3])
+    counts, _ = write.upsert_records(db_manager, pd.DataFrame(rows), ENTITY)
+    assert counts == {'inserted': 1, 'updated': 1, 'unchanged': 2}
+    assert db_manager.execute_query(
+        "SELECT summary FROM regulations WHERE title = 'Resolución 1'"
+    ) == [('Resumen corregido',)]
+
+
+def test_unchanged_rows_are_not_rewritten(db_manager):
+    rows = make_rows(3)
+    write.upsert_records(db_manager, pd.DataFrame(rows), ENTITY)
+    before = _stored(db_manager)
+
+    counts, _ = write.upsert_records(db_manager, pd.DataFrame(rows), ENTITY)
+    assert counts == {'inserted': 0, 'updated': 0, 'unchanged': 3}
+    assert _stored(db_manager) == before
+
+
+def test_null_stored_hash_is_not_reported_as_changed(db_manager):
+    # Filas de un escritor que no guarda content_hash (p. ej. la Lambda)
+    rows = make_rows(2)
+    db_manager.bulk_insert(pd.DataFrame(rows), 'regulations')
+    before = _stored(db_manager)
+    assert all(content_hash is None for _, content_hash in before.values())
+
+    counts, _ = write.upsert_records(db_manager, pd.DataFrame(rows), ENTITY)
+    assert counts == {'inserted': 0, 'updated': 0, 'unchanged': 2}
+    assert _stored(db_manager) == before
+
+
+def test_update_returns_previous_rtype_id(db_manager):
+    rows = make_rows(2, rtype_id=15)
+    write.upsert_records(db_manager, pd.DataFrame(rows), ENTITY)
+
+    changed = pd.DataFrame([dict(rows[0], rtype_id=14)])
+    changed['external_link'] = changed['external_link'].fillna('')
+    changed['content_hash'] = write.compute_content_hash(changed)
+    columns = ['entity'] + write.KEY_COLUMNS + write.MUTABLE_COLUMNS + ['content_hash', 'update_at']
+    returned = db_manager.bulk_update(
+        write.UPDATE_CHANGED_QUERY, [tuple(x) for x in changed[columns].values],
+        template=write.UPDATE_CHANGED_TEMPLATE, fetch=True,
+    )
+    assert [tuple(row) for row in returned] == [(ENTITY, '2024-01-01', 15, 14)]
+
+
+def test_rtype_change_moves_the_summary_count(db_manager):
+    rows = make_rows(2, rtype_id=15)
+    write.upsert_records(db_manager, pd.DataFrame(rows), ENTITY)
+    rows[0]['rtype_id'] = 14
+    counts, _ = write.upsert_records(db_manager, pd.DataFrame(rows), ENTITY)
+    assert counts['updated'] == 1
+    assert sorted(db_manager.execute_query(
+        "SELECT rtype_id, regulation_count FROM regulation_stats_yearly WHERE regulation_count <> 0"
+    )) == [(14, 1), (15, 1)]
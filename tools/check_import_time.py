@@ -0,0 +1,97 @@
+"""
+Mide el costo de importar el DAG y el camino de arranque en frío de lambda.py.
+
+Cada medición corre en un intérprete nuevo (subprocess) para que los
+módulos ya cargados no falseen el resultado. Para el DAG se descuenta el
+costo de importar Airflow y se verifica que el archivo no cargue el stack
+de datos (pandas, numpy, bs4, requests, psycopg2).
+
+Uso:
+    python tools/check_import_time.py --max-dag-seconds 0.5 --max-lambda-seconds 3
+Retorna código de salida 1 si algún umbral se supera.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "numpy", "bs4", "requests", "psycopg2"]
+
+DAG_PROBE = r"""
+import importlib.util, json, sys, time
+import airflow
+from airflow.operators.python import PythonOperator  # noqa: F401
+before = set(sys.modules)
+t0 = time.perf_counter()
+spec = importlib.util.spec_from_file_location("dags_etl", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - t0
+loaded = sorted({m.split(".")[0] for m in set(sys.modules) - before})
+print(json.dumps({"seconds": elapsed, "loaded": loaded}))
+"""
+
+LAMBDA_PROBE = r"""
+import importlib, json, sys, time
+sys.path.insert(0, sys.argv[1])
+t0 = time.perf_counter()
+importlib.import_module("lambda")
+elapsed = time.perf_counter() - t0
+print(json.dumps({"seconds": elapsed, "loaded": sorted({m.split(".")[0] for m in sys.modules})}))
+"""
+
+
+def run_probe(code, *args):
+    """Ejecuta un probe en un intérprete nuevo y retorna su salida JSON."""
+    env = dict(os.environ)
+    env.setdefault("AWS_DEFAULT_REGION", env.get("AWS_REGION", "us-east-1"))
+    result = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        capture_output=True, text=True, env=env, cwd=ROOT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check_dag(max_seconds):
+    dag_file = os.path.join(ROOT, "dags", "dags_etl.py")
+    probe = run_probe(DAG_PROBE, dag_file)
+    heavy = [m for m in HEAVY_MODULES if m in probe["loaded"]]
+    print(f"DAG import: {probe['seconds'] * 1000:.1f} ms (sin contar airflow)")
+    ok = True
+    if heavy:
+        print(f"  FALLA: el DAG carga módulos pesados al parsearse: {', '.join(heavy)}")
+        ok = False
+    if probe["seconds"] > max_seconds:
+        print(f"  FALLA: supera el umbral de {max_seconds}s")
+        ok = False
+    return ok
+
+
+def check_lambda(max_seconds):
+    probe = run_probe(LAMBDA_PROBE, ROOT)
+    print(f"lambda.py arranque en frío: {probe['seconds'] * 1000:.1f} ms")
+    if probe["seconds"] > max_seconds:
+        print(f"  FALLA: supera el umbral de {max_seconds}s")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chequeo de tiempos de import")
+    parser.add_argument("--max-dag-seconds", type=float, default=0.5)
+    parser.add_argument("--max-lambda-seconds", type=float, default=3.0)
+    parser.add_argument("--skip-dag", action="store_true", help="No medir el DAG (sin Airflow instalado)")
+    parser.add_argument("--skip-lambda", action="store_true", help="No medir lambda.py")
+    args = parser.parse_args()
+
+    results = []
+    if not args.skip_dag:
+        results.append(check_dag(args.max_dag_seconds))
+    if not args.skip_lambda:
+        results.append(check_lambda(args.max_lambda_seconds))
+    sys.exit(0 if all(results) else 1)
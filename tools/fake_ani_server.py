@@ -0,0 +1,162 @@
+"""
+Servidor HTTP local que imita el listado de normatividad de la ANI.
+
+Genera páginas con el mismo marcado que consume src/extraction.py
+(celdas views-field-title, views-field-body y views-field-field-fecha--1),
+para poder ejecutar el pipeline sin tocar ani.gov.co.
+
+También puede simular un sitio lento o inestable (latencia, tasa de errores
+503) y un marcado más parecido al real (paginador de Drupal y relleno).
+
+Uso:
+    python tools/fake_ani_server.py --port 8765 --pages 20 --rows-per-page 10
+    python tools/fake_ani_server.py --pages 1000 --latency-ms 300 --error-rate 0.05 --markup drupal
+    ANI_URL_BASE="http://localhost:8765/normatividad?x=" python src/async_pipeline.py
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger("fake_ani_server")
+
+RTYPES = ["Resolución", "Decreto", "Resolucion"]
+MARKUPS = ["plain", "drupal"]
+
+
+def build_row(index):
+    """Genera el HTML de una fila con datos deterministas."""
+    rtype = RTYPES[index % len(RTYPES)]
+    created = date(2025, 1, 1) - timedelta(days=index // 3)
+    title = f"{rtype} {index:06d} de {created.year}"
+    link = f"/sites/default/files/normatividad/{index:06d}.pdf"
+    return (
+        "<tr>"
+        f'<td class="views-field views-field-title"><a href="{link}">{title}</a></td>'
+        f'<td class="views-field views-field-body">por la cual se reglamenta el asunto {index}</td>'
+        '<td class="views-field views-field-field-fecha--1">'
+        f'<span class="date-display-single" content="{created.isoformat()}T00:00:00-05:00">'
+        f"{created.strftime('%d/%m/%Y')}</span></td>"
+        "</tr>"
+    )
+
+
+def build_pager(page_num, pages):
+    """Paginador como el de Drupal en ani.gov.co (primera, anterior, ventana de 9, siguiente, última)."""
+    items = []
+    if page_num > 0:
+        items.append('<li class="pager-first first"><a href="?page=0">« primera</a></li>')
+        items.append(f'<li class="pager-previous"><a href="?page={page_num - 1}">‹ anterior</a></li>')
+    for n in range(max(0, page_num - 4), min(pages, page_num + 5)):
+        if n == page_num:
+            items.append(f'<li class="pager-current">{n + 1}</li>')
+        else:
+            items.append(f'<li class="pager-item"><a href="?page={n}">{n + 1}</a></li>')
+    if page_num < pages - 1:
+        items.append(f'<li class="pager-next"><a href="?page={page_num + 1}">siguiente ›</a></li>')
+        items.append(f'<li class="pager-last last"><a href="?page={pages - 1}">última »</a></li>')
+    return '<h2 class="element-invisible">Páginas</h2><div class="item-list"><ul class="pager">' + "".join(items) + "</ul></div>"
+
+
+def build_page(page_num, pages, rows_per_page, markup="plain", padding_kb=0):
+    """
+    Genera el HTML completo de una página (tabla vacía fuera de rango).
+    markup='drupal' agrega encabezado, menú y paginador; padding_kb agrega
+    relleno (scripts/menús) para acercar el peso de la página al real.
+    """
+    rows = []
+    if 0 <= page_num < pages:
+        start = page_num * rows_per_page
+        rows = [build_row(i) for i in range(start, start + rows_per_page)]
+    table = (
+        "<table class=\"views-table\"><tbody>"
+        + "".join(rows)
+        + "</tbody></table>"
+    )
+    padding = f"<!-- {'x' * (padding_kb * 1024)} -->" if padding_kb else ""
+    if markup == "drupal":
+        return (
+            "<html><head><title>Normatividad | ANI</title>" + padding + "</head><body>"
+            '<div id="header"><ul class="menu"><li><a href="/">Inicio</a></li>'
+            '<li><a href="/informacion-de-la-ani">Información de la ANI</a></li></ul></div>'
+            '<div class="view view-normatividad"><div class="view-content">' + table + "</div>"
+            + (build_pager(page_num, pages) if pages > 1 else "")
+            + '</div><div id="footer">Agencia Nacional de Infraestructura</div></body></html>'
+        )
+    return "<html><body>" + padding + table + "</body></html>"
+
+
+def make_handler(pages, rows_per_page, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 markup="plain", padding_kb=0, seed=None):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class FakeANIHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            try:
+                page_num = int(query.get("page", ["0"])[0])
+            except ValueError:
+                page_num = 0
+
+            with rng_lock:
+                delay = max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000
+                failed = rng.random() < error_rate
+            if delay:
+                time.sleep(delay)
+
+            if failed:
+                body = b"Service Unavailable"
+                self.send_response(503)
+            else:
+                body = build_page(page_num, pages, rows_per_page, markup, padding_kb).encode("utf-8")
+                self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return FakeANIHandler
+
+
+def make_server(port=8765, pages=10, rows_per_page=10, host="127.0.0.1", **options):
+    """Crea el servidor sin arrancarlo (options: latency_ms, jitter_ms, error_rate, markup, padding_kb, seed)."""
+    server = ThreadingHTTPServer((host, port), make_handler(pages, rows_per_page, **options))
+    server.daemon_threads = True
+    return server
+
+
+def serve(port=8765, pages=10, rows_per_page=10, host="127.0.0.1", **options):
+    """Levanta el servidor (bloqueante)."""
+    server = make_server(port, pages, rows_per_page, host, **options)
+    logger.info(f"Servidor ANI falso en http://{host}:{port}/normatividad?x= ({pages} páginas)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Servidor ANI falso para pruebas locales")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--rows-per-page", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latencia añadida por respuesta")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Variación uniforme de la latencia (±)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 503")
+    parser.add_argument("--markup", choices=MARKUPS, default="plain")
+    parser.add_argument("--padding-kb", type=int, default=0, help="Relleno por página (KB)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    serve(args.port, args.pages, args.rows_per_page, args.host,
+          latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+          markup=args.markup, padding_kb=args.padding_kb, seed=args.seed)
@@ -0,0 +1,75 @@
+"""
+Mide la latencia de arranque en frío y de invocaciones "calientes" de lambda.py.
+
+Usa el backend de secretos 'env' (sin AWS) y un Postgres local; para no
+depender de ani.gov.co se puede apuntar a tools/fake_ani_server.py:
+
+    python tools/fake_ani_server.py --port 8765 &
+    ANI_URL_BASE="http://localhost:8765/normatividad?x=" \
+    DB_NAME=airflow DB_USERNAME=airflow DB_PASSWORD=airflow DB_HOST=localhost DB_PORT=5432 \
+    python tools/lambda_latency.py --invocations 5
+
+Cada medición corre en un intérprete nuevo para que el arranque sea realmente en frío.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import importlib, json, sys, time
+sys.path.insert(0, sys.argv[1])
+invocations = int(sys.argv[2])
+event = json.loads(sys.argv[3])
+
+t0 = time.perf_counter()
+handler_module = importlib.import_module("lambda")
+import_seconds = time.perf_counter() - t0
+
+timings = []
+for _ in range(invocations):
+    t0 = time.perf_counter()
+    result = handler_module.lambda_handler(event, None)
+    timings.append(time.perf_counter() - t0)
+    if result.get("statusCode") != 200:
+        print(json.dumps({"error": result}), file=sys.stderr)
+
+print(json.dumps({"import_seconds": import_seconds, "invocations": timings}))
+"""
+
+
+def measure(invocations, event):
+    env = dict(os.environ)
+    env.setdefault("SECRETS_BACKEND", "env")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, ROOT, str(invocations), json.dumps(event)],
+        capture_output=True, text=True, env=env, cwd=ROOT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    if result.stderr.strip():
+        print(result.stderr.strip(), file=sys.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latencia en frío/caliente de lambda_handler")
+    parser.add_argument("--invocations", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--force-scrape", action="store_true")
+    args = parser.parse_args()
+
+    event = {"num_pages_to_scrape": args.pages, "force_scrape": args.force_scrape}
+    timings = measure(args.invocations, event)
+
+    calls = timings["invocations"]
+    print(f"Import (arranque en frío): {timings['import_seconds'] * 1000:.1f} ms")
+    if calls:
+        print(f"1ª invocación (fría):      {calls[0] * 1000:.1f} ms")
+    if len(calls) > 1:
+        warm = sorted(calls[1:])
+        print(f"Invocaciones calientes:    mediana {warm[len(warm) // 2] * 1000:.1f} ms, "
+              f"mín {warm[0] * 1000:.1f} ms, máx {warm[-1] * 1000:.1f} ms")
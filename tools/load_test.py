@@ -0,0 +1,335 @@
+"""
+Prueba de carga / resistencia de punta a punta contra el servidor ANI falso.
+
+Levanta tools/fake_ani_server.py en un hilo (páginas, filas por página,
+latencia, tasa de errores y marcado configurables), ejecuta el pipeline de
+src/ (pipeline_cli.py) o lambda_handler contra un Postgres local y muestrea
+durante la corrida la memoria del proceso y las filas en la BD. Termina con
+código 1 si algún resultado cruza los umbrales indicados.
+
+    # 1000 páginas con un sitio lento e inestable
+    POSTGRES_HOST=localhost python tools/load_test.py --pages 1000 --latency-ms 200 \\
+        --error-rate 0.02 --markup drupal --reset-db --min-rows-per-sec 200 --min-row-ratio 0.95
+
+    # Resistencia: 50 invocaciones calientes de la Lambda en un mismo proceso
+    DB_HOST=localhost python tools/load_test.py --target lambda --pages 20 --iterations 50 \\
+        --max-rss-growth-mb 30 --report soak.json
+
+    # Comparar contra una corrida anterior
+    python tools/load_test.py --pages 200 --baseline baseline.json --max-regression-pct 15
+
+Usa las mismas variables POSTGRES_* que src/write.py (y DB_* para la Lambda,
+con SECRETS_BACKEND=env). Sin psycopg2 disponible no se cuentan filas en la BD.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from fake_ani_server import make_server, MARKUPS  # noqa: E402
+
+LAMBDA_PROBE = r"""
+import importlib, json, sys, time
+sys.path.insert(0, sys.argv[1])
+handler_module = importlib.import_module("lambda")
+event = json.loads(sys.argv[2])
+for i in range(int(sys.argv[3])):
+    t0 = time.perf_counter()
+    result = handler_module.lambda_handler(event, None)
+    print(json.dumps({"invocation": i, "seconds": time.perf_counter() - t0,
+                      "status_code": result.get("statusCode")}), flush=True)
+"""
+
+CLI_SUMMARY = re.compile(r"Extraídas: (\d+) \| Válidas: (\d+) \| Insertadas: (\d+)")
+
+
+def read_memory_mb(pid):
+    """(RSS actual, pico de RSS) en MB desde /proc; (None, None) fuera de Linux."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    values[key] = int(value.split()[0]) / 1024
+    except OSError:
+        return None, None
+    return values.get("VmRSS"), values.get("VmHWM")
+
+
+class RowCounter:
+    """Cuenta filas de regulations en el Postgres de la prueba."""
+
+    def __init__(self):
+        self.connection = None
+        try:
+            import psycopg2
+        except ImportError:
+            print("psycopg2 no disponible: no se contarán filas en la BD", file=sys.stderr)
+            return
+        try:
+            self.connection = psycopg2.connect(
+                dbname=os.getenv("POSTGRES_DB", "airflow"),
+                user=os.getenv("POSTGRES_USER", "airflow"),
+                password=os.getenv("POSTGRES_PASSWORD", "airflow"),
+                host=os.getenv("POSTGRES_HOST", "localhost"),
+                port=os.getenv("POSTGRES_PORT", "5432"),
+            )
+            self.connection.autocommit = True
+        except Exception as e:
+            print(f"No se pudo conectar a la BD para contar filas: {e}", file=sys.stderr)
+
+    def count(self):
+        if not self.connection:
+            return None
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM regulations")
+            return cursor.fetchone()[0]
+
+    def reset(self):
+        if not self.connection:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute("TRUNCATE regulations RESTART IDENTITY CASCADE")
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+
+
+def build_command(args, url_base, invocations):
+    env = dict(os.environ)
+    env["ANI_URL_BASE"] = url_base
+    if args.target == "lambda":
+        env.setdefault("SECRETS_BACKEND", "env")
+        for db_key, pg_key, default in (("DB_NAME", "POSTGRES_DB", "airflow"),
+                                        ("DB_USERNAME", "POSTGRES_USER", "airflow"),
+                                        ("DB_PASSWORD", "POSTGRES_PASSWORD", "airflow"),
+                                        ("DB_HOST", "POSTGRES_HOST", "localhost"),
+                                        ("DB_PORT", "POSTGRES_PORT", "5432")):
+            env.setdefault(db_key, os.getenv(pg_key, default))
+        event = {"num_pages_to_scrape": args.pages, "force_scrape": True}
+        return [sys.executable, "-c", LAMBDA_PROBE, ROOT, json.dumps(event), str(invocations)], env
+
+    env.setdefault("POSTGRES_HOST", "localhost")
+    command = [sys.executable, os.path.join(ROOT, "src", "pipeline_cli.py"),
+               "--pages", str(args.pages), "--concurrency", str(args.concurrency), "--url-base", url_base]
+    if args.dry_run:
+        command.append("--dry-run")
+    return command, env
+
+
+def run_target(command, env, counter, interval):
+    """Ejecuta el comando y muestrea memoria y filas en BD hasta que termine."""
+    samples = []
+    invocations = []
+    rows_start = counter.count()
+
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8") as log_file:
+        t0 = time.perf_counter()
+        process = subprocess.Popen(command, env=env, cwd=ROOT, stdout=subprocess.PIPE,
+                                   stderr=log_file, text=True)
+
+        def read_invocations():
+            # Una línea JSON por invocación de la Lambda; se anota la memoria en ese momento
+            for line in process.stdout:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                entry["rss_mb"] = read_memory_mb(process.pid)[0]
+                invocations.append(entry)
+
+        reader = threading.Thread(target=read_invocations, daemon=True)
+        reader.start()
+
+        peak_rss = None
+        while process.poll() is None:
+            rss, hwm = read_memory_mb(process.pid)
+            if hwm is not None:
+                peak_rss = max(peak_rss or 0, hwm)
+            samples.append({"t": round(time.perf_counter() - t0, 2), "rss_mb": rss, "db_rows": counter.count()})
+            time.sleep(interval)
+        wall = time.perf_counter() - t0
+        reader.join(timeout=5)
+
+        log_file.seek(0)
+        log = log_file.read()
+
+    rows_end = counter.count()
+    samples.append({"t": round(wall, 2), "rss_mb": None, "db_rows": rows_end})
+    result = {
+        "exit_code": process.returncode,
+        "wall_seconds": round(wall, 3),
+        "peak_rss_mb": round(peak_rss, 1) if peak_rss else None,
+        "rows_written": rows_end - rows_start if rows_start is not None and rows_end is not None else None,
+        "samples": samples,
+    }
+    match = None
+    for match in CLI_SUMMARY.finditer(log):
+        pass
+    if match:
+        result["rows_extracted"], result["rows_valid"], _ = (int(g) for g in match.groups())
+    if invocations:
+        result["invocations"] = invocations
+    if process.returncode != 0:
+        result["log_tail"] = log[-2000:]
+    return result
+
+
+def summarize(runs, args):
+    """Métricas agregadas de todas las iteraciones."""
+    expected_rows = args.pages * args.rows_per_page
+    wall = sum(run["wall_seconds"] for run in runs)
+    if args.target == "lambda":
+        invocations = runs[0].get("invocations", [])
+        rows = runs[0]["rows_written"] or 0
+        rss_values = [entry["rss_mb"] for entry in invocations if entry.get("rss_mb")]
+        failures = sum(1 for entry in invocations if entry.get("status_code") != 200)
+        # La primera invocación inserta; las siguientes (ya sin filas nuevas) miden el estado estable
+        row_ratio = rows / expected_rows if expected_rows else None
+        throughput_wall = invocations[0]["seconds"] if invocations else wall
+    else:
+        extracted = [run.get("rows_extracted") for run in runs if run.get("rows_extracted") is not None]
+        rows = sum(extracted) if extracted else sum(run["rows_written"] or 0 for run in runs)
+        rss_values = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"]]
+        failures = sum(1 for run in runs if run["exit_code"] != 0)
+        row_ratio = (min(extracted) / expected_rows) if extracted and expected_rows else None
+        throughput_wall = wall
+
+    peaks = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"]]
+    return {
+        "target": args.target,
+        "pages": args.pages,
+        "rows_per_page": args.rows_per_page,
+        "latency_ms": args.latency_ms,
+        "error_rate": args.error_rate,
+        "markup": args.markup,
+        "iterations": args.iterations,
+        "wall_seconds": round(wall, 3),
+        "rows_per_sec": round(rows / throughput_wall, 1) if throughput_wall else None,
+        "pages_per_sec": round(args.pages * (1 if args.target == "lambda" else len(runs)) / throughput_wall, 2)
+        if throughput_wall else None,
+        "row_ratio": round(row_ratio, 4) if row_ratio is not None else None,
+        "peak_rss_mb": max(peaks) if peaks else None,
+        "rss_growth_mb": round(rss_values[-1] - rss_values[0], 1) if len(rss_values) > 1 else 0.0,
+        "failures": failures,
+    }
+
+
+def check_thresholds(summary, args):
+    """Lista de umbrales incumplidos."""
+    problems = []
+    if summary["failures"]:
+        problems.append(f"{summary['failures']} ejecuciones fallidas")
+
+    def check(name, value, limit, higher_is_better):
+        if limit is None or value is None:
+            return
+        if (value < limit) if higher_is_better else (value > limit):
+            problems.append(f"{name} = {value} ({'mínimo' if higher_is_better else 'máximo'} {limit})")
+
+    check("rows_per_sec", summary["rows_per_sec"], args.min_rows_per_sec, True)
+    check("row_ratio", summary["row_ratio"], args.min_row_ratio, True)
+    check("peak_rss_mb", summary["peak_rss_mb"], args.max_peak_rss_mb, False)
+    check("rss_growth_mb", summary["rss_growth_mb"], args.max_rss_growth_mb, False)
+    check("wall_seconds", summary["wall_seconds"], args.max_wall_seconds, False)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["summary"]
+        tolerance = args.max_regression_pct / 100
+        for name, higher_is_better in (("rows_per_sec", True), ("peak_rss_mb", False), ("wall_seconds", False)):
+            old, new = baseline.get(name), summary.get(name)
+            if not old or new is None:
+                continue
+            limit = old * (1 - tolerance) if higher_is_better else old * (1 + tolerance)
+            if (new < limit) if higher_is_better else (new > limit):
+                problems.append(f"{name} empeoró: {new} vs {old} en la línea base (tolerancia {args.max_regression_pct}%)")
+    return problems
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga/resistencia con el servidor ANI falso")
+    parser.add_argument("--target", choices=["cli", "lambda"], default="cli")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--rows-per-page", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--markup", choices=MARKUPS, default="drupal")
+    parser.add_argument("--padding-kb", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=0, help="Puerto del servidor falso (0 = libre)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrencia de la CLI")
+    parser.add_argument("--iterations", type=int, default=1,
+                        help="Corridas de la CLI, o invocaciones calientes de la Lambda en un mismo proceso")
+    parser.add_argument("--dry-run", action="store_true", help="La CLI no escribe en la BD")
+    parser.add_argument("--reset-db", action="store_true", help="TRUNCATE de regulations antes de empezar")
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--report", default=None, help="Guarda el reporte JSON")
+    parser.add_argument("--min-rows-per-sec", type=float, default=None)
+    parser.add_argument("--min-row-ratio", type=float, default=None,
+                        help="Fracción mínima de filas obtenidas sobre pages * rows-per-page")
+    parser.add_argument("--max-peak-rss-mb", type=float, default=None)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=None)
+    parser.add_argument("--max-wall-seconds", type=float, default=None)
+    parser.add_argument("--baseline", default=None, help="Reporte JSON previo para comparar")
+    parser.add_argument("--max-regression-pct", type=float, default=10.0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    server = make_server(args.port, args.pages, args.rows_per_page,
+                         latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                         markup=args.markup, padding_kb=args.padding_kb, seed=args.seed)
+    host, port = server.server_address[:2]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url_base = f"http://{host}:{port}/normatividad?x="
+
+    counter = RowCounter()
+    try:
+        if args.reset_db:
+            counter.reset()
+        if args.target == "lambda":
+            command, env = build_command(args, url_base, args.iterations)
+            runs = [run_target(command, env, counter, args.sample_interval)]
+        else:
+            command, env = build_command(args, url_base, 1)
+            runs = [run_target(command, env, counter, args.sample_interval) for _ in range(args.iterations)]
+    finally:
+        counter.close()
+        server.shutdown()
+        server.server_close()
+
+    summary = summarize(runs, args)
+    problems = check_thresholds(summary, args)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "runs": runs, "problems": problems}, f, ensure_ascii=False, indent=2)
+
+    for key, value in summary.items():
+        print(f"{key:<16} {value}")
+    for run in runs:
+        if run.get("log_tail"):
+            print(run["log_tail"], file=sys.stderr)
+    if problems:
+        print("UMBRALES INCUMPLIDOS:\n  " + "\n  ".join(problems), file=sys.stderr)
+        return 1
+    print("OK: todos los umbrales se cumplen")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())